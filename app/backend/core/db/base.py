@@ -0,0 +1,82 @@
+"""
+PostgreSQL-бэкенд с пулом соединений (core.db.pool).
+
+Подключается через ENGINE = 'core.db'; параметры пула задаются в
+OPTIONS['pool'] (size, max_overflow, timeout, max_lifetime, check_after).
+Django по-прежнему «закрывает» соединение в конце каждого запроса
+(CONN_MAX_AGE = 0), но физически оно остаётся открытым и возвращается в пул,
+поэтому схема одинаково работает и в WSGI-потоках, и в контекстах ASGI.
+"""
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation as BaseDatabaseCreation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from .pool import ConnectionPool, PoolTimeout, close_pools, get_pool
+
+TRANSACTION_STATUS_IDLE = 0
+
+
+def check_connection(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except base.Database.Error:
+        return False
+    return True
+
+
+def reset_connection(connection):
+    """Готовит соединение к повторной выдаче; False — соединение нужно закрыть."""
+    if connection.closed:
+        return False
+    if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+    return True
+
+
+class DatabaseCreation(BaseDatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # DROP DATABASE не пройдёт, пока в пуле есть соединения с тестовой БД
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+    pool = None
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def get_pool(self, conn_params):
+        key = (self.alias, tuple(sorted(
+            (name, value) for name, value in conn_params.items() if name != 'cursor_factory'
+        )))
+        options = self.settings_dict['OPTIONS'].get('pool') or {}
+        return get_pool(key, lambda: ConnectionPool(
+            self.alias, conn_params.get('dbname', ''),
+            check=check_connection, reset=reset_connection, **options
+        ))
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool = self.get_pool(conn_params)
+        try:
+            connection = pool.acquire(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        except PoolTimeout as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+        # Родительский метод выставляет isolation_level только для новых соединений
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED)
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Закрытие внутри atomic(): Django продолжит ссылаться на соединение
+        # до выхода из блока, поэтому отдавать его другим потокам нельзя.
+        broken = self.in_atomic_block or (self.errors_occurred and not self.is_usable())
+        with self.wrap_database_errors:
+            self.pool.release(self.connection, broken=broken)
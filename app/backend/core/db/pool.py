@@ -0,0 +1,240 @@
+"""
+Пул соединений с БД, общий для всех потоков процесса.
+
+Django открывает соединение на поток (WSGI) или на контекст запроса (ASGI)
+и закрывает его в конце запроса. С бэкендом core.db «закрытие» возвращает
+соединение сюда, а следующий запрос забирает готовое, без TCP- и
+auth-рукопожатия с PostgreSQL.
+
+В пуле держится до size простаивающих соединений; сверх этого можно открыть
+ещё max_overflow, они закрываются при возврате. Когда занято всё, запрос
+ждёт освобождения не дольше timeout секунд, затем получает PoolTimeout.
+Соединения старше max_lifetime пересоздаются, а простоявшие дольше
+check_after перед выдачей проверяются запросом SELECT 1.
+"""
+import collections
+import os
+import threading
+import time
+
+from core.metrics import REGISTRY
+
+POOL_CHECKED_OUT = REGISTRY.gauge(
+    'db_pool_checked_out', 'Соединения пула, выданные запросам', ['alias', 'database']
+)
+POOL_IDLE = REGISTRY.gauge(
+    'db_pool_idle', 'Простаивающие соединения пула', ['alias', 'database']
+)
+POOL_WAITS = REGISTRY.counter(
+    'db_pool_waits_total', 'Запросы соединения, ждавшие освобождения пула', ['alias', 'database']
+)
+POOL_WAIT_SECONDS = REGISTRY.histogram(
+    'db_pool_wait_seconds', 'Время ожидания соединения из пула', ['alias', 'database']
+)
+POOL_TIMEOUTS = REGISTRY.counter(
+    'db_pool_timeouts_total', 'Запросы соединения, не дождавшиеся пула', ['alias', 'database']
+)
+POOL_CONNECTS = REGISTRY.counter(
+    'db_pool_connects_total', 'Открытые пулом физические соединения', ['alias', 'database']
+)
+POOL_DISCARDS = REGISTRY.counter(
+    'db_pool_discards_total', 'Закрытые пулом соединения', ['alias', 'database', 'reason']
+)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class _Entry:
+    __slots__ = ('connection', 'created_at', 'released_at')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = self.released_at = time.monotonic()
+
+
+class ConnectionPool:
+    def __init__(self, alias, database, check, reset, size=10, max_overflow=10,
+                 timeout=30.0, max_lifetime=3600.0, check_after=30.0):
+        self.labels = {'alias': alias, 'database': database}
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self._check = check
+        self._reset = reset
+        self._idle = collections.deque()
+        self._checked_out = {}
+        self._opening = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def total(self):
+        return len(self._idle) + len(self._checked_out) + self._opening
+
+    def stats(self):
+        with self._cond:
+            return {
+                'idle': len(self._idle),
+                'checked_out': len(self._checked_out),
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+            }
+
+    def acquire(self, connect):
+        """Выдаёт соединение из пула; connect() открывает новое физическое."""
+        while True:
+            entry = self._take()
+            if entry is None:
+                return self._open(connect)
+            reason = self._validate(entry)
+            if reason is None:
+                with self._cond:
+                    self._checked_out[id(entry.connection)] = entry
+                    self._update_gauges()
+                return entry.connection
+            self._discard(entry, reason)
+
+    def release(self, connection, broken=False):
+        with self._cond:
+            entry = self._checked_out.pop(id(connection), None)
+            self._update_gauges()
+        if entry is None:
+            # Соединение открыто до сброса пула (close_all или fork)
+            self._close_quietly(connection)
+            return
+        reason = 'broken' if broken else self._reset_or_reason(connection)
+        if reason is None and time.monotonic() - entry.created_at > self.max_lifetime:
+            reason = 'expired'
+        with self._cond:
+            if reason is None and self._closed:
+                reason = 'closed'
+            if reason is None and len(self._idle) >= self.size:
+                reason = 'overflow'
+            if reason is None:
+                entry.released_at = time.monotonic()
+                self._idle.append(entry)
+                self._cond.notify()
+                self._update_gauges()
+                return
+        self._discard(entry, reason)
+
+    def close(self):
+        """Закрывает простаивающие соединения; выданные закроются при возврате."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), collections.deque()
+            self._update_gauges()
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_quietly(entry.connection)
+
+    def _take(self):
+        started = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    # LIFO: последнее возвращённое соединение «теплее» остальных
+                    entry = self._idle.pop()
+                    break
+                if self.total < self.size + self.max_overflow:
+                    self._opening += 1
+                    entry = None
+                    break
+                if started is None:
+                    started = time.monotonic()
+                    POOL_WAITS.inc(**self.labels)
+                remaining = started + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    POOL_TIMEOUTS.inc(**self.labels)
+                    raise PoolTimeout(
+                        f'Нет свободного соединения с БД за {self.timeout} с '
+                        f'(size={self.size}, max_overflow={self.max_overflow})'
+                    )
+                self._cond.wait(remaining)
+        if started is not None:
+            POOL_WAIT_SECONDS.observe(time.monotonic() - started, **self.labels)
+        return entry
+
+    def _open(self, connect):
+        try:
+            connection = connect()
+        except BaseException:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        POOL_CONNECTS.inc(**self.labels)
+        entry = _Entry(connection)
+        with self._cond:
+            self._opening -= 1
+            self._checked_out[id(connection)] = entry
+            self._update_gauges()
+        return connection
+
+    def _validate(self, entry):
+        now = time.monotonic()
+        if now - entry.created_at > self.max_lifetime:
+            return 'expired'
+        if now - entry.released_at > self.check_after and not self._check(entry.connection):
+            return 'failed_check'
+        return None
+
+    def _reset_or_reason(self, connection):
+        try:
+            return None if self._reset(connection) else 'broken'
+        except Exception:
+            return 'broken'
+
+    def _discard(self, entry, reason):
+        POOL_DISCARDS.inc(reason=reason, **self.labels)
+        self._close_quietly(entry.connection)
+        with self._cond:
+            self._cond.notify()
+
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _update_gauges(self):
+        POOL_CHECKED_OUT.set(len(self._checked_out), **self.labels)
+        POOL_IDLE.set(len(self._idle), **self.labels)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, factory):
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = factory()
+    return pool
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def _forget_pools_after_fork():
+    # Сокеты родителя нельзя ни использовать, ни закрывать из дочернего
+    # процесса (gunicorn --preload): просто начинаем с пустых пулов.
+    global _pools_lock
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_pools_after_fork)
@@ -0,0 +1,202 @@
+"""
+Потоковая выгрузка таблиц в NDJSON или CSV (аналитика, резервные копии).
+
+Строки читаются через values_list().iterator(chunk_size) — на PostgreSQL
+это серверный курсор, и в памяти процесса одновременно лежит не больше
+одной пачки, сколько бы строк ни было в таблице. Каждая пачка кодируется
+в один кусок ответа StreamingHttpResponse. Под ASGI синхронный итератор
+ответа Django буферизует целиком, поэтому там пачки читаются асинхронным
+генератором: каждый шаг курсора — sync_to_async в потоке запроса.
+
+Порядок — (updated_at, id) по индексу, поэтому ?updated_since= (включительно)
+даёт инкрементальную выгрузку: следующий запуск начинается с наибольшего
+updated_at из предыдущего, строки на границе повторяются и отсеиваются по id.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime, time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.negotiation import BaseContentNegotiation
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def parse_updated_since(value):
+    """Дата и время ISO 8601 (или дата — с полуночи) в aware datetime; None — не задано."""
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime.combine(day, time.min) if day is not None else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({'updated_since': 'Ожидается дата и время в формате ISO 8601'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_output(value):
+    value = value or 'ndjson'
+    if value not in EXPORT_FORMATS:
+        raise ValidationError({'output': f'Допустимые значения: {", ".join(EXPORT_FORMATS)}'})
+    return value
+
+
+# Даты и Decimal — как в ответах API (DjangoJSONEncoder)
+_json = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+class NDJSONEncoder:
+    def __init__(self, names):
+        self.names = names
+
+    def header(self):
+        return b''
+
+    def encode(self, rows):
+        names, encode = self.names, _json.encode
+        return ''.join([encode(dict(zip(names, row))) + '\n' for row in rows]).encode()
+
+
+class CSVEncoder:
+    """Списки и словари (JSONField) пишутся как JSON, None — пустой строкой."""
+
+    def __init__(self, names):
+        self.names = names
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def header(self):
+        return self._flush([self.names])
+
+    def encode(self, rows):
+        return self._flush([[self.cell(value) for value in row] for row in rows])
+
+    @staticmethod
+    def cell(value):
+        if value is None:
+            return ''
+        if isinstance(value, (list, dict)):
+            return json.dumps(value, ensure_ascii=False)
+        if isinstance(value, date):
+            return _json.default(value)
+        return value
+
+    def _flush(self, rows):
+        self.writer.writerows(rows)
+        data = self.buffer.getvalue().encode()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+ENCODERS = {'ndjson': NDJSONEncoder, 'csv': CSVEncoder}
+
+
+class ExportNegotiation(BaseContentNegotiation):
+    """Формат выгрузки задаёт ?output=; Accept: text/csv не должен давать 406."""
+
+    def select_parser(self, request, parsers):
+        return parsers[0] if parsers else None
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def iter_chunks(queryset, chunk_size):
+    chunk = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def aiter_chunks(chunks):
+    """
+    Пачки синхронного генератора по одной через sync_to_async: курсор живёт
+    в одном потоке запроса. aiterator() в Django 5.0 для values_list()
+    выполняет запрос прямо в цикле событий.
+    """
+    step = sync_to_async(next)
+    try:
+        while (chunk := await step(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+class Export:
+    """
+    Выгрузка одной таблицы. fields — пары (имя в выгрузке, колонка
+    values_list); extra — имена колонок, которые prepare(rows) дописывает
+    в конец каждой строки пачки (например, навыки одним запросом на пачку).
+    """
+
+    def __init__(self, name, queryset, fields, extra=(), prepare=None):
+        self.name = name
+        self.queryset = queryset
+        self.names = [label for label, _ in fields] + list(extra)
+        self.columns = [column for _, column in fields]
+        self.prepare = prepare
+
+    def rows(self, updated_since=None):
+        queryset = self.queryset.all()
+        if updated_since is not None:
+            queryset = queryset.filter(updated_at__gte=updated_since)
+        return queryset.order_by('updated_at', 'id').values_list(*self.columns)
+
+    def chunks(self, updated_since=None, chunk_size=None):
+        for chunk in iter_chunks(self.rows(updated_since), chunk_size or settings.EXPORT_CHUNK_SIZE):
+            yield self.prepare(chunk) if self.prepare is not None else chunk
+
+    def stream(self, output, updated_since=None, chunk_size=None):
+        """Куски выгрузки (bytes): заголовок, затем по одному на пачку строк."""
+        encoder = ENCODERS[output](self.names)
+        header = encoder.header()
+        if header:
+            yield header
+        for chunk in self.chunks(updated_since, chunk_size):
+            yield encoder.encode(chunk)
+
+    async def astream(self, output, updated_since=None, chunk_size=None):
+        encoder = ENCODERS[output](self.names)
+        header = encoder.header()
+        if header:
+            yield header
+        async for chunk in aiter_chunks(self.chunks(updated_since, chunk_size)):
+            yield encoder.encode(chunk)
+
+    def response(self, request):
+        """Ответ на GET ?output=ndjson|csv&updated_since=... (request — DRF или Django)."""
+        params = request.GET
+        output = parse_output(params.get('output'))
+        updated_since = parse_updated_since(params.get('updated_since'))
+        if isinstance(getattr(request, '_request', request), ASGIRequest):
+            content = self.astream(output, updated_since)
+        else:
+            content = self.stream(output, updated_since)
+        response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[output])
+        response['Content-Disposition'] = f'attachment; filename="{self.name}.{output}"'
+        response['Cache-Control'] = 'no-store'
+        # nginx не должен копить выгрузку в буфере
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,219 @@
+"""
+Метрики запросов: число SQL-запросов, время в БД, время сериализации и
+общая задержка по каждому представлению.
+
+RequestMetricsMiddleware заводит на время запроса объект RequestStats в
+contextvar. Обёртка execute_wrapper, установленная на каждое соединение,
+и обёртка над Serializer.data пополняют его; contextvar копируется в потоки
+sync_to_async, поэтому учитываются и асинхронные представления. В конце
+запроса значения уходят в гистограммы core.metrics, а при превышении
+бюджета запросов (QUERY_BUDGETS) пишется предупреждение в лог.
+
+Периодическое обслуживание индексов процесса (users.revocation,
+tasks.matching) выполняется внутри maintenance(): его запросы достаются
+случайному запросу, поэтому в бюджет не входят и считаются отдельно.
+"""
+import contextvars
+import functools
+from contextlib import contextmanager
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.serializers import ListSerializer, Serializer
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Полное время обработки запроса', ['view', 'method']
+)
+REQUEST_QUERIES = REGISTRY.histogram(
+    'http_request_db_queries', 'SQL-запросов на один HTTP-запрос', ['view', 'method'],
+    buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = REGISTRY.histogram(
+    'http_request_db_seconds', 'Время выполнения SQL за запрос', ['view', 'method']
+)
+REQUEST_SERIALIZER_SECONDS = REGISTRY.histogram(
+    'http_request_serializer_seconds', 'Время в Serializer.data за запрос (вместе с его SQL)', ['view', 'method']
+)
+REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'Обработанные HTTP-запросы', ['view', 'method', 'status']
+)
+MAINTENANCE_QUERIES = REGISTRY.counter(
+    'http_request_maintenance_queries_total', 'SQL-запросы обслуживания индексов процесса вне бюджета', ['view']
+)
+QUERY_BUDGET_EXCEEDED = REGISTRY.counter(
+    'http_query_budget_exceeded_total', 'Запросы, превысившие бюджет SQL-запросов', ['view']
+)
+
+_current = contextvars.ContextVar('request_stats', default=None)
+_recorders = []
+
+
+class RequestStats:
+    __slots__ = (
+        'view', 'method', 'path', 'queries', 'db_time', 'serializer_time', 'serializing',
+        'maintenance', 'maintenance_queries',
+    )
+
+    def __init__(self, method, path):
+        self.view = None
+        self.method = method
+        self.path = path
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        self.maintenance = False
+        self.maintenance_queries = 0
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if stats.maintenance:
+            stats.maintenance_queries += 1
+        else:
+            stats.queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+@contextmanager
+def maintenance():
+    """Запросы внутри блока (или декорированной функции) не входят в бюджет запроса."""
+    stats = _current.get()
+    if stats is None or stats.maintenance:
+        yield
+        return
+    stats.maintenance = True
+    try:
+        yield
+    finally:
+        stats.maintenance = False
+
+
+def install_query_recorder(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+# При импорте, а не в middleware: соединение потока, где sync_to_async
+# выполняет запросы асинхронных представлений, могло открыться раньше
+connection_created.connect(install_query_recorder, dispatch_uid='core.instrumentation')
+
+
+def _timed_data(prop):
+    getter = prop.fget
+
+    @functools.wraps(getter)
+    def data(self):
+        stats = _current.get()
+        # Вложенные сериализаторы считаются в составе внешнего
+        if stats is None or stats.serializing:
+            return getter(self)
+        stats.serializing = True
+        started = time.perf_counter()
+        try:
+            return getter(self)
+        finally:
+            stats.serializing = False
+            stats.serializer_time += time.perf_counter() - started
+    data._timed = True
+    return property(data)
+
+
+def install_serializer_timing():
+    for cls in (Serializer, ListSerializer):
+        if not getattr(cls.data.fget, '_timed', False):
+            cls.data = _timed_data(cls.data)
+
+
+def query_budget(view, method='GET'):
+    """Бюджет из QUERY_BUDGETS: сначала ключ 'METHOD view', затем 'view'."""
+    budgets = settings.QUERY_BUDGETS
+    return budgets.get(f'{method} {view}', budgets.get(view, settings.QUERY_BUDGET_DEFAULT))
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_serializer_timing()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, started = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, started = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, started)
+        return response
+
+    def start(self, request):
+        # Соединения, открытые до подключения сигнала (например, тестовой БД)
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        stats = RequestStats(request.method, request.path)
+        return stats, _current.set(stats), time.perf_counter()
+
+    def finish(self, request, response, stats, started):
+        elapsed = time.perf_counter() - started
+        stats.view = view = view_label(request)
+        labels = {'view': view, 'method': request.method}
+        REQUEST_SECONDS.observe(elapsed, **labels)
+        REQUEST_QUERIES.observe(stats.queries, **labels)
+        REQUEST_DB_SECONDS.observe(stats.db_time, **labels)
+        REQUEST_SERIALIZER_SECONDS.observe(stats.serializer_time, **labels)
+        REQUESTS.inc(status=response.status_code, **labels)
+        if stats.maintenance_queries:
+            MAINTENANCE_QUERIES.inc(stats.maintenance_queries, view=view)
+
+        budget = query_budget(view, request.method)
+        if stats.queries > budget:
+            QUERY_BUDGET_EXCEEDED.inc(view=view)
+            logger.warning(
+                'query budget exceeded: view=%s method=%s queries=%d budget=%d db_ms=%.1f total_ms=%.1f',
+                view, request.method, stats.queries, budget, stats.db_time * 1000, elapsed * 1000,
+                extra={
+                    'view': view, 'method': request.method, 'path': stats.path,
+                    'queries': stats.queries, 'budget': budget,
+                    'db_ms': round(stats.db_time * 1000, 1), 'total_ms': round(elapsed * 1000, 1),
+                }
+            )
+        for recorder in list(_recorders):
+            recorder.append(stats)
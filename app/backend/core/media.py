@@ -0,0 +1,163 @@
+"""
+Раздача загруженных файлов (/media/).
+
+Django решает, можно ли отдавать файл (только каталоги
+MEDIA_PUBLIC_PREFIXES, без выхода за MEDIA_ROOT), и ставит заголовки
+кэширования, а передачу байтов по MEDIA_SERVE_MODE отдаёт:
+  x-accel    — nginx по X-Accel-Redirect во internal-локацию
+               MEDIA_ACCEL_PREFIX (location /protected-media/ { internal;
+               alias <MEDIA_ROOT>/; }); Range nginx обрабатывает сам;
+  x-sendfile — Apache mod_xsendfile / lighttpd по абсолютному пути;
+  django     — без прокси: FileResponse, который WSGI-сервер с
+               wsgi.file_wrapper (gunicorn, uWSGI) шлёт через sendfile;
+               Range разбирается здесь.
+
+Имена с sha256 (avatars/<digest>/<size>.<ext>, см. users.avatars) не
+меняют содержимого: ETag выводится из имени без обращения к диску, а ответ
+кэшируется навсегда (immutable). Для остальных файлов валидаторы — время
+изменения и размер.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+
+HASHED_NAME = re.compile(r'(?:^|/)(?P<digest>[0-9a-f]{64})/(?P<name>[^/]+)$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class RangeFile:
+    """
+    Окно [start, start + length) открытого файла. read() не выходит за
+    границу окна; fileno() позволяет серверу отправить окно через sendfile
+    (позиция уже выставлена, длину задаёт Content-Length).
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    (start, length) для одного диапазона bytes=; None — заголовка нет или
+    он не поддерживается (отдаётся весь файл); ValueError — диапазон вне файла.
+    """
+    match = RANGE.match(header.replace(' ', '')) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        length = min(int(last), size)
+        if not length:
+            raise ValueError(header)
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end - start + 1
+
+
+def _not_modified(request, etag, modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return if_none_match.strip() == '*' or etag in (tag.strip() for tag in if_none_match.split(','))
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and modified is not None and int(modified) <= since
+
+
+def _validators(path, full_path):
+    """(ETag, mtime или None, Cache-Control); для хэшированных имён — без stat."""
+    hashed = HASHED_NAME.search(path)
+    if hashed:
+        return '"%s-%s"' % (hashed['digest'], hashed['name']), None, IMMUTABLE
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404('Файл не найден')
+    etag = '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+    return etag, stat.st_mtime, f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+
+
+def _headers(response, etag, modified, cache_control):
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    if modified is not None:
+        response['Last-Modified'] = http_date(modified)
+    return response
+
+
+def serve_media(request, path):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponse(status=405, headers={'Allow': 'GET, HEAD'})
+    path = posixpath.normpath(path).lstrip('/')
+    if not path.startswith(tuple(settings.MEDIA_PUBLIC_PREFIXES)):
+        raise Http404('Файл не найден')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+
+    etag, modified, cache_control = _validators(path, full_path)
+    if _not_modified(request, etag, modified):
+        return _headers(HttpResponseNotModified(), etag, modified, cache_control)
+
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    mode = settings.MEDIA_SERVE_MODE
+    if mode == 'x-accel':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(path)
+        return _headers(response, etag, modified, cache_control)
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+        return _headers(response, etag, modified, cache_control)
+
+    try:
+        file = open(full_path, 'rb')
+    except OSError:
+        raise Http404('Файл не найден')
+    size = os.fstat(file.fileno()).st_size
+    if_range = request.headers.get('If-Range')
+    try:
+        # Range с устаревшим If-Range игнорируется — клиент получит весь файл
+        byte_range = None if if_range and if_range != etag else parse_range(request.headers.get('Range'), size)
+    except ValueError:
+        file.close()
+        response = HttpResponse(status=416, headers={'Content-Range': f'bytes */{size}'})
+        return _headers(response, etag, modified, cache_control)
+
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, length = byte_range
+        response = FileResponse(RangeFile(file, start, length), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{start + length - 1}/{size}'
+        response['Content-Length'] = length
+    response['Accept-Ranges'] = 'bytes'
+    return _headers(response, etag, modified, cache_control)
@@ -0,0 +1,222 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу (keyset / seek method).
+
+    Вместо OFFSET страница выбирается условием по значениям ключа сортировки
+    последней строки предыдущей страницы, поэтому страница N стоит столько же,
+    сколько первая. Последнее поле сортировки должно быть уникальным (id),
+    все поля сортировки — NOT NULL и покрыты составным индексом.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._set_page(list(self._page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset для асинхронных представлений: строки читаются через async for."""
+        return self._set_page([row async for row in self._page_queryset(queryset, request, view)])
+
+    def _page_queryset(self, queryset, request, view):
+        """Выборка страницы с условием курсора: page_size + 1 строк, без выполнения."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = tuple(self.get_ordering(request, queryset, view))
+        self.model = queryset.model
+
+        self.cursor = cursor = self.decode_cursor(request)
+        ordering = _invert(self.ordering) if cursor and cursor['r'] else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, cursor['p']))
+        return queryset[:self.page_size + 1]
+
+    def _set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if self.cursor and self.cursor['r']:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            size = int(value)
+        except ValueError:
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        """Порядок берётся у представления (keyset_ordering), если он задан."""
+        if hasattr(view, 'get_keyset_ordering'):
+            return view.get_keyset_ordering()
+        return getattr(view, 'keyset_ordering', self.ordering)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def seek_filter(self, ordering, position):
+        """
+        Условие «строго после position» для заданного порядка:
+        (a < x) OR (a = x AND b < y) OR ... Отдельное нестрогое условие по
+        первому полю позволяет планировщику начать сканирование индекса
+        сразу с нужного места.
+        """
+        fields = [_field_name(item) for item in ordering]
+        condition = Q()
+        for index, item in enumerate(ordering):
+            lookup = 'lt' if item.startswith('-') else 'gt'
+            step = Q(**{f'{fields[index]}__{lookup}': position[index]})
+            for prev in range(index):
+                step &= Q(**{fields[prev]: position[prev]})
+            condition |= step
+        first_bound = 'lte' if ordering[0].startswith('-') else 'gte'
+        return Q(**{f'{fields[0]}__{first_bound}': position[0]}) & condition
+
+    def encode_cursor(self, obj, reverse):
+        position = [self.dump_value(obj, _field_name(item)) for item in self.ordering]
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def dump_value(self, obj, name):
+        """
+        Поля модели сериализуются самим полем, аннотации (rank) — как есть.
+        Строки values() (словари) тоже поддерживаются.
+        """
+        if isinstance(obj, dict):
+            obj = SimpleNamespace(**obj)
+        field = self._model_field(name)
+        if field is None:
+            return getattr(obj, name)
+        return field.value_to_string(obj)
+
+    def load_value(self, name, value):
+        field = self._model_field(name)
+        if field is None:
+            if not isinstance(value, (int, float)):
+                raise ValueError(value)
+            return value
+        return field.to_python(value)
+
+    def _model_field(self, name):
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            position = payload['p']
+            if len(position) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.load_value(_field_name(item), value)
+                for item, value in zip(self.ordering, position)
+            ]
+            return {'p': position, 'r': bool(payload.get('r'))}
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+def _field_name(item):
+    return item.lstrip('-')
+
+
+def _invert(ordering):
+    return tuple(item[1:] if item.startswith('-') else f'-{item}' for item in ordering)
+
+
+def estimated_rows(queryset):
+    """Оценка числа строк таблицы по статистике PostgreSQL; None, если её нет."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    # До первого ANALYZE reltuples равен -1 (или 0 в старых версиях)
+    return row[0] if row and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator для админки больших таблиц: число строк нефильтрованной
+    выборки берётся из pg_class.reltuples вместо SELECT COUNT(*).
+    Отфильтрованные выборки и таблицы меньше ADMIN_ESTIMATED_COUNT_THRESHOLD
+    считаются точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.has_filters():
+            estimate = estimated_rows(queryset)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
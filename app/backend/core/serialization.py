@@ -0,0 +1,107 @@
+"""
+Быстрый read-only вывод списков из строк QuerySet.values().
+
+RowSerializer берёт поля обычного DRF-сериализатора (порядок, имена,
+to_representation), но заранее готовит для каждого функцию, извлекающую
+значение прямо из строки-словаря. Нет экземпляров моделей, обхода
+Field.get_attribute, проверок SkipField и OrderedDict на каждую строку.
+JSON совпадает с выводом исходного сериализатора.
+"""
+import decimal
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+# Поля, чей to_representation для значений из БД ничего не меняет
+# (str(str), int(int), bool(bool)) — значение берётся из строки как есть.
+_IDENTITY_REPRESENTATIONS = {
+    serializers.CharField.to_representation,
+    serializers.IntegerField.to_representation,
+    serializers.BooleanField.to_representation,
+}
+
+
+def column_extractor(column, field):
+    """Функция row -> представление значения колонки, как его выдал бы field."""
+    identity = type(field).to_representation in _IDENTITY_REPRESENTATIONS or (
+        isinstance(field, serializers.JSONField) and not field.binary
+    )
+    if identity:
+        return lambda row: row[column]
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_extractor(column, field)
+    if isinstance(field, serializers.DecimalField):
+        return _decimal_extractor(column, field)
+    to_representation = field.to_representation
+
+    def extract(row):
+        value = row[column]
+        return None if value is None else to_representation(value)
+    return extract
+
+
+def _datetime_extractor(column, field):
+    """
+    DateTimeField.to_representation ищет текущий часовой пояс на каждое
+    значение; здесь он определяется один раз на сериализатор.
+    """
+    to_representation = field.to_representation
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    zone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or zone is None:
+        return lambda row: to_representation(row[column])
+
+    def extract(row):
+        value = row[column]
+        if value is None or isinstance(value, str) or value.tzinfo is None:
+            return to_representation(value)
+        value = value.astimezone(zone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return extract
+
+
+def _decimal_extractor(column, field):
+    """Шаг и контекст округления DecimalField.quantize готовятся один раз."""
+    to_representation = field.to_representation
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.decimal_places is None:
+        return lambda row: None if row[column] is None else to_representation(row[column])
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    step = decimal.Decimal('.1') ** field.decimal_places
+    rounding = field.rounding
+
+    def extract(row):
+        value = row[column]
+        if not isinstance(value, decimal.Decimal):
+            return None if value is None else to_representation(value)
+        return '{:f}'.format(value.quantize(step, rounding=rounding, context=context))
+    return extract
+
+
+class RowSerializer:
+    """
+    serializer — экземпляр сериализатора, задающий набор и порядок полей;
+    computed — {имя поля: функция(row)} для SerializerMethodField и вложенных
+    представлений. Обычные поля читают колонку '__'.join(source_attrs).
+    """
+
+    def __init__(self, serializer, computed=None):
+        computed = computed or {}
+        self.extractors = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in computed:
+                self.extractors.append((name, computed[name]))
+            elif isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+                raise ValueError(f'Поле {name} требует функции в computed')
+            else:
+                self.extractors.append((name, column_extractor('__'.join(field.source_attrs), field)))
+
+    def to_representation(self, rows):
+        extractors = self.extractors
+        return [{name: extract(row) for name, extract in extractors} for row in rows]
@@ -19,15 +19,17 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'rest_framework_simplejwt',
     'corsheaders',
-    'users',
+    'users.apps.UsersConfig',
     'tasks',
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -40,6 +42,46 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'core.urls'
 
+# Бюджеты SQL-запросов по имени представления (core.instrumentation),
+# ключ 'METHOD view' уточняет бюджет для метода. При превышении пишется
+# предупреждение в лог и растёт счётчик метрик. Запросы обслуживания
+# индексов процесса (core.instrumentation.maintenance) в бюджет не входят.
+# Каждый бюджет закреплён тестом с assertViewQueries.
+QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', 20))
+QUERY_BUDGETS = {
+    'task-list': 3,
+    'POST task-list': 8,
+    'task-detail': 2,
+    'PUT task-detail': 10,
+    'PATCH task-detail': 10,
+    # Свежая строка пользователя, задание, связи с навыками, само задание
+    'DELETE task-detail': 4,
+    # Пакетные операции: число запросов не зависит от размера пакета
+    'POST task-bulk': 8,
+    'PATCH task-bulk': 10,
+    'task-bulk-archive': 4,
+    'task-stream': 1,
+    'task-stream-token': 1,
+    'profile': 3,
+    'PUT profile': 9,
+    'public-profile': 3,
+    'skills': 1,
+    'logout': 2,
+    'logout-all': 2,
+    'freelancer-list': 3,
+}
+# С какого числа строк админка показывает оценку из статистики PostgreSQL
+# вместо точного COUNT(*) по нефильтрованной таблице (core.pagination).
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv('ADMIN_ESTIMATED_COUNT_THRESHOLD', 100_000))
+# Доступ к /metrics: заголовок Authorization: Bearer <METRICS_TOKEN> или
+# REMOTE_ADDR из METRICS_ALLOWED_IPS (через запятую). За nginx все запросы
+# приходят с loopback, поэтому по умолчанию список адресов пуст (кроме DEBUG),
+# а Prometheus ходит с токеном.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [
+    ip for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1' if DEBUG else '').split(',') if ip
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -61,14 +103,72 @@ WSGI_APPLICATION = 'core.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'freelance',
-        'USER': 'freelance',
-        'PASSWORD': 'freelance',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'NAME': os.getenv('DB_NAME', 'freelance'),
+        'USER': os.getenv('DB_USER', 'freelance'),
+        'PASSWORD': os.getenv('DB_PASSWORD', 'freelance'),
+        'HOST': os.getenv('DB_HOST', 'localhost'),
+        'PORT': os.getenv('DB_PORT', '5432'),
     }
 }
 
+# DB_ENGINE=sqlite — одноразовая локальная БД в файле DB_NAME (нагрузочные
+# тесты, см. tasks/management/commands/bench_api.py). Полнотекстовый поиск
+# и часть индексов в этом режиме работают упрощённо.
+if os.getenv('DB_ENGINE') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+    }
+
+# Соединения с PostgreSQL (DB_CONN_MODE):
+#   'pool'       — общий пул процесса (core.db), для WSGI и ASGI;
+#   'persistent' — соединение на поток живёт DB_CONN_MAX_AGE секунд (только WSGI:
+#                  под ASGI каждый запрос идёт в своём контексте и соединения не переиспользуются);
+#   'direct'     — новое соединение на каждый запрос.
+DB_CONN_MODE = os.getenv('DB_CONN_MODE', 'pool')
+
+if DB_CONN_MODE == 'pool' and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default'].update({
+        'ENGINE': 'core.db',
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'pool': {
+                'size': int(os.getenv('DB_POOL_SIZE', 10)),
+                'max_overflow': int(os.getenv('DB_POOL_MAX_OVERFLOW', 10)),
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+                'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+                'check_after': float(os.getenv('DB_POOL_CHECK_AFTER', 30)),
+            },
+        },
+    })
+elif DB_CONN_MODE == 'persistent':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    })
+
+# Общий кэш: Redis (или совместимый по протоколу сервер) в продакшене,
+# локальная память процесса — в разработке и тестах.
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+PUBLIC_PROFILE_CACHE_TIMEOUT = int(os.getenv('PUBLIC_PROFILE_CACHE_TIMEOUT', 300))
+# Снимок справочника навыков привязан к версии, поэтому может жить долго.
+SKILL_CATALOGUE_CACHE_TIMEOUT = int(os.getenv('SKILL_CATALOGUE_CACHE_TIMEOUT', 24 * 3600))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -94,6 +194,26 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Раздача /media/ (core.media): 'django' — FileResponse (sendfile у
+# WSGI-сервера), 'x-accel' — nginx по X-Accel-Redirect на internal-локацию
+# MEDIA_ACCEL_PREFIX, 'x-sendfile' — Apache/lighttpd. Отдаются только
+# каталоги MEDIA_PUBLIC_PREFIXES; нехэшированные имена кэшируются на
+# MEDIA_CACHE_MAX_AGE секунд.
+MEDIA_SERVE_MODE = os.getenv('MEDIA_SERVE_MODE', 'django')
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
+MEDIA_PUBLIC_PREFIXES = ('avatars/',)
+MEDIA_CACHE_MAX_AGE = int(os.getenv('MEDIA_CACHE_MAX_AGE', 3600))
+
+# Аватары (users.avatars): предел размера загрузки и числа пикселей (сжатый
+# файл в 5 МБ может развернуться в сотни мегапикселей, а декодирует его фоновый
+# воркер), число фоновых воркеров, режим обработки ('thread' — в фоне,
+# 'inline' — в запросе, для тестов) и сколько секунд хранится статус
+# обработки для опроса (avatar-status).
+AVATAR_MAX_UPLOAD_SIZE = int(os.getenv('AVATAR_MAX_UPLOAD_SIZE', 5 * 1024 * 1024))
+AVATAR_MAX_PIXELS = int(os.getenv('AVATAR_MAX_PIXELS', 25_000_000))
+AVATAR_WORKERS = int(os.getenv('AVATAR_WORKERS', 2))
+AVATAR_PROCESSING = os.getenv('AVATAR_PROCESSING', 'thread')
+AVATAR_STATUS_TIMEOUT = int(os.getenv('AVATAR_STATUS_TIMEOUT', 3600))
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -111,7 +231,7 @@ CORS_ALLOW_CREDENTIALS = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.PrincipalJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -121,8 +241,65 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    'TOKEN_OBTAIN_SERIALIZER': 'users.tokens.PrincipalTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.tokens.PrincipalTokenRefreshSerializer',
 }
 
+# Отзыв токенов (users.revocation): на сколько отзывов рассчитан фильтр
+# Блума и доля его ложных срабатываний, как часто подтягивать отзывы из
+# других процессов и полностью перестраивать индекс, секунды.
+TOKEN_REVOCATION_CAPACITY = int(os.getenv('TOKEN_REVOCATION_CAPACITY', 1_000_000))
+TOKEN_REVOCATION_ERROR_RATE = float(os.getenv('TOKEN_REVOCATION_ERROR_RATE', 0.001))
+TOKEN_REVOCATION_REFRESH_INTERVAL = int(os.getenv('TOKEN_REVOCATION_REFRESH_INTERVAL', 5))
+TOKEN_REVOCATION_REBUILD_INTERVAL = int(os.getenv('TOKEN_REVOCATION_REBUILD_INTERVAL', 3600))
+
+# Пул процессов для хэширования паролей при входе и регистрации
+# (users.hashing): число процессов, предел очереди и места в ней,
+# доступные только доверенным клиентам.
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 2))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 64))
+PASSWORD_HASH_RESERVED = int(os.getenv('PASSWORD_HASH_RESERVED', 16))
+PASSWORD_HASH_TRUST_TTL = int(os.getenv('PASSWORD_HASH_TRUST_TTL', 7 * 24 * 3600))
+# Прокси перед приложением (nginx): адреса, которым верим в заголовке
+# TRUSTED_PROXY_HEADER с цепочкой адресов клиента. IP клиента для доверия
+# пулу хэширования берётся из него, только если REMOTE_ADDR — такой прокси;
+# иначе за nginx все клиенты выглядели бы как 127.0.0.1.
+TRUSTED_PROXIES = [ip for ip in os.getenv('TRUSTED_PROXIES', '').split(',') if ip]
+TRUSTED_PROXY_HEADER = os.getenv('TRUSTED_PROXY_HEADER', 'X-Forwarded-For')
+
+# Предел элементов в одном пакетном запросе /api/tasks/bulk/ (tasks.bulk)
+TASK_BULK_MAX_ITEMS = int(os.getenv('TASK_BULK_MAX_ITEMS', 100))
+
+# Поток новых заданий (tasks.stream, SSE): брокер между процессами, очередь
+# на подписчика, интервал пустых keep-alive, сколько пропущенных заданий
+# дочитывается из БД при переподключении и сколько секунд живёт токен для
+# ?token= (users.tokens.StreamToken; проверяется только при подключении).
+TASK_STREAM_BROKER = os.getenv(
+    'TASK_STREAM_BROKER', 'tasks.stream.RedisBroker' if REDIS_URL else 'tasks.stream.InMemoryBroker'
+)
+TASK_STREAM_QUEUE_SIZE = int(os.getenv('TASK_STREAM_QUEUE_SIZE', 100))
+TASK_STREAM_HEARTBEAT = int(os.getenv('TASK_STREAM_HEARTBEAT', 15))
+TASK_STREAM_REPLAY_LIMIT = int(os.getenv('TASK_STREAM_REPLAY_LIMIT', 500))
+TASK_STREAM_RETRY_MS = int(os.getenv('TASK_STREAM_RETRY_MS', 3000))
+TASK_STREAM_TOKEN_LIFETIME = int(os.getenv('TASK_STREAM_TOKEN_LIFETIME', 120))
+
+# Подбор исполнителей (tasks.matching): как часто подтягивать изменения
+# из других процессов и как часто полностью перестраивать индекс, секунды.
+MATCHING_REFRESH_INTERVAL = int(os.getenv('MATCHING_REFRESH_INTERVAL', 30))
+MATCHING_REBUILD_INTERVAL = int(os.getenv('MATCHING_REBUILD_INTERVAL', 3600))
+
+# Строк в одной пачке потоковой выгрузки (core.export): столько строк
+# читается из серверного курсора за раз и кодируется в один кусок ответа.
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+# Асинхронные GET ленты, заданий, профилей и справочника навыков
+# (tasks.async_views, users.async_views) на тех же URL. Включается в
+# core.asgi; под WSGI остаются синхронные DRF-views.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+
+# Сколько секунд строка User живёт в кэше процесса аутентификации.
+JWT_USER_CACHE_TTL = int(os.getenv('JWT_USER_CACHE_TTL', 60))
+
 CSRF_TRUSTED_ORIGINS = [
     "http://localhost:5173",
     "http://localhost:5174",
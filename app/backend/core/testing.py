@@ -0,0 +1,31 @@
+from contextlib import contextmanager
+
+from . import instrumentation
+
+
+@contextmanager
+def record_requests():
+    """Собирает RequestStats всех запросов, обработанных внутри блока."""
+    records = []
+    instrumentation._recorders.append(records)
+    try:
+        yield records
+    finally:
+        instrumentation._recorders.remove(records)
+
+
+class QueryCountAssertionsMixin:
+    """Закрепляет число SQL-запросов конкретного представления в тестах."""
+
+    @contextmanager
+    def assertViewQueries(self, view, expected):
+        with record_requests() as records:
+            yield records
+        matched = [stats for stats in records if stats.view == view]
+        self.assertTrue(matched, f'Представление {view} не вызывалось')
+        for stats in matched:
+            budget = instrumentation.query_budget(view, stats.method)
+            self.assertEqual(
+                stats.queries, expected,
+                f'{stats.method} {view}: {stats.queries} SQL-запросов вместо {expected} (бюджет {budget})'
+            )
@@ -0,0 +1,194 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from users.revocation import revocation_index
+from users.tokens import PrincipalRefreshToken
+from .db.pool import POOL_TIMEOUTS, POOL_WAITS, ConnectionPool, PoolTimeout
+from .instrumentation import MAINTENANCE_QUERIES
+from .testing import QueryCountAssertionsMixin
+
+User = get_user_model()
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.usable = True
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def make_pool(self, **options):
+        options.setdefault('size', 1)
+        options.setdefault('max_overflow', 1)
+        options.setdefault('timeout', 0.05)
+        return ConnectionPool(
+            'default', self.id(),
+            check=lambda connection: connection.usable,
+            reset=lambda connection: not connection.closed,
+            **options
+        )
+
+    def test_released_connection_is_reused(self):
+        pool = self.make_pool()
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+        self.assertIs(pool.acquire(FakeConnection), first)
+        self.assertEqual(pool.stats()['checked_out'], 1)
+
+    def test_overflow_connections_are_closed_on_release(self):
+        pool = self.make_pool()
+        first, second = pool.acquire(FakeConnection), pool.acquire(FakeConnection)
+        pool.release(first)
+        pool.release(second)
+        self.assertFalse(first.closed)
+        self.assertTrue(second.closed)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_exhausted_pool_times_out(self):
+        pool = self.make_pool(max_overflow=0)
+        pool.acquire(FakeConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+        labels = {'alias': 'default', 'database': self.id()}
+        self.assertEqual(POOL_WAITS.value(**labels), 1)
+        self.assertEqual(POOL_TIMEOUTS.value(**labels), 1)
+
+    def test_waiter_gets_released_connection(self):
+        pool = self.make_pool(max_overflow=0, timeout=5)
+        first = pool.acquire(FakeConnection)
+        threading.Timer(0.05, pool.release, [first]).start()
+        self.assertIs(pool.acquire(FakeConnection), first)
+
+    def test_unusable_idle_connection_is_replaced(self):
+        pool = self.make_pool(check_after=0)
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+        first.usable = False
+        second = pool.acquire(FakeConnection)
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+
+
+class RequestMetricsTests(QueryCountAssertionsMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass')
+        self.client.force_authenticate(self.user)
+
+    @override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_metrics_endpoint_exposes_request_histograms(self):
+        self.client.get(reverse('task-list'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('http_request_db_queries_count{view="task-list",method="GET"}', body)
+        self.assertIn('# TYPE http_request_serializer_seconds histogram', body)
+
+    @override_settings(METRICS_TOKEN='s3cret', METRICS_ALLOWED_IPS=[])
+    def test_metrics_endpoint_requires_token_behind_proxy(self):
+        # За nginx REMOTE_ADDR всегда loopback и доступа не даёт
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+    @override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_metrics_endpoint_is_restricted(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.5')
+        self.assertEqual(response.status_code, 403)
+
+    def test_index_maintenance_is_outside_the_budget(self):
+        revocation_index.reset()
+        self.client.force_authenticate(None)
+        token = PrincipalRefreshToken.for_user(self.user).access_token
+        before = MAINTENANCE_QUERIES.value(view='task-list')
+        # Первый запрос процесса строит индекс отзывов — три запроса вне бюджета
+        with self.assertViewQueries('task-list', 1):
+            self.client.get(reverse('task-list'), HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(MAINTENANCE_QUERIES.value(view='task-list') - before, 3)
+
+    def test_budget_overrun_is_logged(self):
+        with override_settings(QUERY_BUDGETS={'task-list': 0}):
+            with self.assertLogs('core.instrumentation', 'WARNING') as logs, self.assertViewQueries('task-list', 1):
+                self.client.get(reverse('task-list'))
+        self.assertEqual(logs.records[0].view, 'task-list')
+        self.assertEqual(logs.records[0].budget, 0)
+
+
+class MediaServingTests(SimpleTestCase):
+    hashed = 'avatars/' + 'a' * 64 + '/256.jpg'
+    legacy = 'avatars/legacy.png'
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        for name, content in ((self.hashed, bytes(range(256)) * 4), (self.legacy, b'png')):
+            path = os.path.join(self.media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(content)
+        settings = override_settings(MEDIA_ROOT=self.media_root, MEDIA_SERVE_MODE='django')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def get(self, name, **headers):
+        response = self.client.get('/media/' + name, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_hashed_names_are_immutable_with_strong_etag(self):
+        response, body = self.get(self.hashed)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(body), 1024)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['ETag'], '"%s-256.jpg"' % ('a' * 64))
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        revalidated, _ = self.get(self.hashed, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_other_files_use_mtime_validators(self):
+        response, body = self.get(self.legacy)
+        self.assertEqual(body, b'png')
+        self.assertIn('max-age=', response['Cache-Control'])
+        self.assertNotIn('immutable', response['Cache-Control'])
+        revalidated, _ = self.get(self.legacy, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_ranges(self):
+        response, body = self.get(self.hashed, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, bytes(range(10, 20)))
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(response['Content-Length'], '10')
+        response, body = self.get(self.hashed, HTTP_RANGE='bytes=-4')
+        self.assertEqual((response.status_code, body), (206, bytes(range(252, 256))))
+        response, _ = self.get(self.hashed, HTTP_RANGE='bytes=2000-')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */1024'))
+        # Диапазон по устаревшему If-Range не применяется
+        response, body = self.get(self.hashed, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual((response.status_code, len(body)), (200, 1024))
+
+    def test_proxy_modes_only_set_headers(self):
+        with override_settings(MEDIA_SERVE_MODE='x-accel', MEDIA_ACCEL_PREFIX='/protected-media/'):
+            response, body = self.get(self.hashed)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.hashed)
+        self.assertEqual(body, b'')
+        self.assertIn('immutable', response['Cache-Control'])
+        with override_settings(MEDIA_SERVE_MODE='x-sendfile'):
+            response, _ = self.get(self.legacy)
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, self.legacy))
+
+    def test_only_public_paths_are_served(self):
+        with open(os.path.join(self.media_root, 'secret.txt'), 'wb') as file:
+            file.write(b'secret')
+        for name in ('secret.txt', 'avatars/../secret.txt', 'avatars/missing.png'):
+            self.assertEqual(self.get(name)[0].status_code, 404, name)
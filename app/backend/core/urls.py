@@ -1,8 +1,11 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core.media import serve_media
+from core.views import metrics_view
+from users.views import FreelancerExportView, FreelancerListView
 
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -11,8 +14,12 @@ from rest_framework_simplejwt.views import (
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/auth/', include('users.urls')),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/freelancers/', FreelancerListView.as_view(), name='freelancer-list'),
+    path('api/freelancers/export/', FreelancerExportView.as_view(), name='freelancer-export'),
     path('api/', include('tasks.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+]
\ No newline at end of file
@@ -1,9 +1,112 @@
+from datetime import datetime
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth import get_user_model
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dates import MONTHS
+
+from core.pagination import EstimatedCountPaginator
+from .filters import search_tasks
 from .models import Task
 
+User = get_user_model()
+
+
+class DateDrilldownFilter(admin.SimpleListFilter):
+    """
+    Замена date_hierarchy для больших таблиц: годы берутся из MIN/MAX поля
+    (два прохода по краям индекса), а не из SELECT DISTINCT по всей таблице;
+    у выбранного года раскрываются месяцы. Фильтр — диапазон
+    field >= начало AND field < конец, который идёт по индексу.
+    """
+    field_name = None
+
+    def lookups(self, request, model_admin):
+        bounds = model_admin.model._default_manager.aggregate(first=Min(self.field_name), last=Max(self.field_name))
+        if bounds['first'] is None:
+            return []
+        first, last = timezone.localtime(bounds['first']), timezone.localtime(bounds['last'])
+        selected = self.value() or ''
+        choices = []
+        for year in range(last.year, first.year - 1, -1):
+            choices.append((str(year), str(year)))
+            if selected[:4] != str(year):
+                continue
+            for month in range(12, 0, -1):
+                if (first.year, first.month) <= (year, month) <= (last.year, last.month):
+                    choices.append((f'{year}-{month:02d}', f'— {MONTHS[month]} {year}'))
+        return choices
+
+    def bounds(self):
+        """Начало и конец выбранного года или месяца; None — значение некорректно."""
+        try:
+            year, _, month = self.value().partition('-')
+            year, month = int(year), int(month) if month else None
+            if month is None:
+                start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+            else:
+                start = datetime(year, month, 1)
+                end = datetime(year + month // 12, month % 12 + 1, 1)
+        except (TypeError, ValueError, OverflowError):
+            return None
+        return timezone.make_aware(start), timezone.make_aware(end)
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        bounds = self.bounds()
+        if bounds is None:
+            return queryset.none()
+        return queryset.filter(**{f'{self.field_name}__gte': bounds[0], f'{self.field_name}__lt': bounds[1]})
+
+
+class CreatedAtFilter(DateDrilldownFilter):
+    title = 'Дата создания'
+    parameter_name = 'created'
+    field_name = 'created_at'
+
+
+class TaskChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        # Описание и поисковый вектор в списке не нужны, а весят больше всего
+        return super().get_queryset(request, exclude_parameters).defer('description', 'search_vector')
+
+
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
-    list_display = ('title', 'author', 'budget', 'deadline', 'created_at')
-    list_filter = ('created_at', 'deadline')
+    """
+    Рассчитана на большую таблицу: число строк без фильтров — оценка
+    (EstimatedCountPaginator), второй COUNT(*) для «всего N» отключён,
+    сортировка и фильтр по дате идут по tasks_admin_created_idx, поиск —
+    по search_vector и уникальному логину.
+    """
+    list_display = ('title', 'author', 'status', 'budget', 'deadline', 'created_at')
+    list_filter = ('status', CreatedAtFilter, 'deadline')
+    list_select_related = ('author',)
     search_fields = ('title', 'description', 'author__username')
-    date_hierarchy = 'created_at'
\ No newline at end of file
+    search_help_text = 'Полнотекстовый поиск по названию и описанию или точный логин автора'
+    ordering = ('-created_at', '-id')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return TaskChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Тот же поиск, что и в API (по search_vector через полный GIN-индекс
+        tasks_search_vector_gin — в админке задания всех статусов), вместо
+        ILIKE '%q%' по search_fields; логин автора ищется точным совпадением.
+        id автора берётся отдельным запросом: с подзапросом внутри OR
+        PostgreSQL не может сложить два индекса в BitmapOr и читает всю таблицу.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        matched = search_tasks(queryset, search_term, ranked=False)
+        author_ids = list(User.objects.filter(username=search_term).values_list('id', flat=True))
+        if not author_ids:
+            return matched, False
+        return matched | queryset.filter(author_id__in=author_ids), False
@@ -0,0 +1,181 @@
+"""
+Асинхронные представления заданий для core.asgi.
+
+Лента и карточка задания (ASYNC_READ_VIEWS): GET строит выборку тем же
+TaskViewSet (фильтры, поля, сортировка), но читает её асинхронным ORM
+(async for, aget); названия навыков сопоставляются заранее через
+Skill.objects.aresolve. Изменяющие методы тех же URL обслуживает ViewSet.
+
+Поток новых заданий по Server-Sent Events.
+
+GET /api/tasks/stream/?skills=python,django — карточки новых заданий
+(в формате ленты) по мере публикации. Переподключение с заголовком
+Last-Event-ID (его шлёт EventSource) или ?since=<id> сначала дочитывает
+пропущенные открытые задания из БД, поэтому полная перезагрузка ленты не
+нужна; если пропущено больше TASK_STREAM_REPLAY_LIMIT, приходит событие
+reset. EventSource не умеет задавать заголовки, поэтому вместо заголовка
+Authorization можно передать ?token= — но только короткоживущий токен
+потока (POST /api/tasks/stream/token/, users.tokens.StreamToken): URL
+оседает в логах прокси и в Referer, и полный access-токен туда не кладём.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from users.async_views import async_read_view, json_response
+from users.authentication import PrincipalJWTAuthentication
+from users.models import Skill
+from users.revocation import revocation_index
+from users.tokens import StreamToken
+from .filters import filter_by_skills
+from .models import Task
+from .serializers import TaskListSerializer, TaskSerializer
+from .stream import TaskEvent, get_broker, hub
+from .views import TaskViewSet
+
+RESET_EVENT = b'event: reset\ndata: {}\n\n'
+HEARTBEAT = b': ping\n\n'
+
+authenticator = PrincipalJWTAuthentication()
+
+
+def authenticate(request):
+    """
+    Access-токен из заголовка или токен потока из ?token=; None — токена нет
+    или он неверен. В БД ходит только синхронизация индекса отзывов.
+    """
+    header = authenticator.get_header(request)
+    try:
+        if header is not None:
+            raw_token = authenticator.get_raw_token(header)
+            return authenticator.get_validated_token(raw_token) if raw_token is not None else None
+        raw_token = request.GET.get('token')
+        if not raw_token:
+            return None
+        token = StreamToken(raw_token)
+        return None if revocation_index.is_revoked(token) else token
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def parse_since(request):
+    raw = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    try:
+        return max(int(raw), 0) if raw else None
+    except ValueError:
+        return None
+
+
+def parse_skills(request):
+    raw = request.GET.get('skills', '')
+    return [name.strip() for name in raw.split(',') if name.strip()]
+
+
+def load_missed(since, skills):
+    """Открытые задания с id > since (не больше лимита) или None, если пропущено слишком много."""
+    limit = settings.TASK_STREAM_REPLAY_LIMIT
+    queryset = Task.objects.open().filter(pk__gt=since).select_related('author').defer('search_vector')
+    if skills:
+        queryset = filter_by_skills(queryset, skills)
+    tasks = list(queryset.order_by('pk')[:limit + 1])
+    if len(tasks) > limit:
+        return None
+    return [TaskEvent.from_task(task) for task in tasks]
+
+
+async def event_stream(subscription, missed):
+    try:
+        yield b'retry: %d\n\n' % settings.TASK_STREAM_RETRY_MS
+        replayed = set()
+        if missed is None:
+            yield RESET_EVENT
+        else:
+            for event in missed:
+                replayed.add(event.id)
+                yield event.sse()
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), settings.TASK_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+            if event is None:
+                # Клиент отстал: закрываем поток, он вернётся с Last-Event-ID
+                break
+            if event.id not in replayed:
+                yield event.sse()
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def task_stream(request):
+    if request.method != 'GET':
+        return json_response(
+            {'detail': f'Метод "{request.method}" не разрешен.'},
+            status_code=status.HTTP_405_METHOD_NOT_ALLOWED, headers={'Allow': 'GET'}
+        )
+    # Проверка отзыва иногда синхронизирует индекс с БД — вне цикла событий
+    if await sync_to_async(authenticate)(request) is None:
+        return json_response(
+            {'detail': 'Учетные данные не были предоставлены или неверны.'},
+            status_code=status.HTTP_401_UNAUTHORIZED, headers={'WWW-Authenticate': 'Bearer realm="api"'}
+        )
+
+    skills = parse_skills(request)
+    since = parse_since(request)
+    # Брокер (и слушатель Redis) создаётся при первой подписке в процессе
+    get_broker()
+    # Подписка раньше чтения из БД: задание, созданное между ними, не потеряется
+    subscription = hub.subscribe(str(name).lower() for name in skills)
+    missed = []
+    if since is not None:
+        try:
+            missed = await sync_to_async(load_missed)(since, skills)
+        except BaseException:
+            hub.unsubscribe(subscription)
+            raise
+
+    response = StreamingHttpResponse(event_stream(subscription, missed), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def task_viewset(request, action, **kwargs):
+    """TaskViewSet для построения выборки (без dispatch) с уже сопоставленными навыками."""
+    drf_request = Request(request)
+    drf_request.user, drf_request.auth = request.user, request.auth
+    view = TaskViewSet(request=drf_request, action=action, args=(), kwargs=kwargs, format_kwarg=None)
+    raw = drf_request.query_params.get('skills')
+    if raw:
+        view.resolved_skills = await Skill.objects.aresolve(raw.split(','))
+    return view
+
+
+@async_read_view(TaskViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def task_list(request):
+    view = await task_viewset(request, 'list')
+    fields = view.get_list_fields()
+    paginator = view.paginator
+    page = await paginator.apaginate_queryset(view.get_list_rows(fields), view.request, view)
+    response = paginator.get_paginated_response(TaskListSerializer.rows(fields).to_representation(page))
+    return json_response(response.data)
+
+
+@async_read_view(TaskViewSet.as_view({
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'
+}))
+async def task_detail(request, pk):
+    view = await task_viewset(request, 'retrieve', pk=pk)
+    try:
+        task = await view.filter_queryset(view.get_queryset()).aget(pk=pk)
+    except Task.DoesNotExist:
+        raise Http404('No Task matches the given query.')
+    return json_response(TaskSerializer(task).data)
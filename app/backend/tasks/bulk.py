@@ -0,0 +1,128 @@
+"""
+Пакетные операции с заданиями.
+
+Все элементы пакета сначала проверяются целиком; если хоть один с ошибкой,
+ничего не пишется и возвращаются ошибки по индексам элементов. Иначе запись
+идёт одной транзакцией через bulk_create / bulk_update / update. Эти методы
+не шлют сигналы, поэтому индекс подбора (tasks.matching) и поток новых
+заданий (tasks.stream) уведомляются явно после коммита.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .matching import matching_engine
+from .models import Task, TaskSkill
+from .serializers import TaskSerializer
+from .stream import publish_tasks
+
+NOT_FOUND = 'Задание не найдено'
+
+
+def _item_error(index, errors, task_id=None):
+    error = {'index': index, 'errors': errors}
+    if task_id is not None:
+        error['id'] = task_id
+    return error
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _mark_for_matching(task_ids):
+    transaction.on_commit(lambda: matching_engine.mark_tasks(*task_ids))
+
+
+def bulk_create_tasks(author, items):
+    """Создаёт задания из items. Возвращает (задания, ошибки по элементам)."""
+    serializers = [TaskSerializer(data=item) for item in items]
+    errors = [
+        _item_error(index, serializer.errors)
+        for index, serializer in enumerate(serializers)
+        if not serializer.is_valid()
+    ]
+    if errors:
+        return [], errors
+
+    with transaction.atomic():
+        tasks = Task.objects.bulk_create([
+            Task(author=author, **serializer.validated_data) for serializer in serializers
+        ])
+        TaskSkill.objects.sync(tasks)
+        _mark_for_matching([task.pk for task in tasks])
+        publish_tasks(tasks)
+    return tasks, []
+
+
+def bulk_update_tasks(author, items):
+    """
+    Частично обновляет задания автора: каждый элемент — {'id': ..., поля}.
+    Возвращает (задания, ошибки по элементам).
+    """
+    with transaction.atomic():
+        ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+        tasks = (
+            Task.objects.select_related('author').defer('search_vector')
+            .select_for_update(of=('self',))
+            .filter(author=author)
+            .in_bulk([task_id for task_id in ids if _is_id(task_id)])
+        )
+
+        errors, updates, seen = [], [], set()
+        for index, (task_id, item) in enumerate(zip(ids, items)):
+            if not _is_id(task_id):
+                errors.append(_item_error(index, {'id': ['Обязательное целое поле']}))
+                continue
+            if task_id not in tasks:
+                errors.append(_item_error(index, {'id': [NOT_FOUND]}, task_id))
+                continue
+            if task_id in seen:
+                errors.append(_item_error(index, {'id': ['Задание указано в пакете дважды']}, task_id))
+                continue
+            seen.add(task_id)
+            serializer = TaskSerializer(tasks[task_id], data=item, partial=True)
+            if serializer.is_valid():
+                updates.append((tasks[task_id], serializer.validated_data))
+            else:
+                errors.append(_item_error(index, serializer.errors, task_id))
+        if errors:
+            return [], errors
+
+        # bulk_update не вызывает pre_save, поэтому auto_now выставляется вручную
+        now = timezone.now()
+        fields = {'updated_at'}
+        for task, data in updates:
+            for name, value in data.items():
+                setattr(task, name, value)
+            fields.update(data)
+            task.updated_at = now
+        updated = [task for task, _ in updates]
+        Task.objects.bulk_update(updated, sorted(fields))
+        TaskSkill.objects.sync([task for task, data in updates if 'skills' in data])
+        _mark_for_matching([task.pk for task in updated])
+    return updated, []
+
+
+def archive_tasks(author, task_ids):
+    """
+    Переводит задания автора в архив. Возвращает (id заданий, ошибки по
+    элементам); уже архивные задания ошибкой не считаются.
+    """
+    with transaction.atomic():
+        found = set(
+            Task.objects.select_for_update()
+            .filter(author=author, pk__in=task_ids)
+            .values_list('pk', flat=True)
+        )
+        errors = [
+            _item_error(index, {'id': [NOT_FOUND]}, task_id)
+            for index, task_id in enumerate(task_ids)
+            if task_id not in found
+        ]
+        if errors:
+            return [], errors
+        Task.objects.filter(pk__in=found).exclude(status=Task.STATUS_ARCHIVED).update(
+            status=Task.STATUS_ARCHIVED, updated_at=timezone.now()
+        )
+        _mark_for_matching(list(found))
+    return list(dict.fromkeys(task_ids)), []
@@ -0,0 +1,16 @@
+"""Выгрузка всех заданий, включая закрытые (core.export)."""
+from core.export import Export
+from .models import Task
+
+task_export = Export('tasks', Task.objects.all(), [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('budget', 'budget'),
+    ('deadline', 'deadline'),
+    ('skills', 'skills'),
+    ('status', 'status'),
+    ('author', 'author__username'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+])
@@ -0,0 +1,216 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from users.filters import SKILL_MATCH_MODES, filter_skill_links
+from .models import TaskSkill
+
+User = get_user_model()
+
+SEARCH_CONFIGS = ('russian', 'english')
+
+# Разрешённые значения ?ordering=: ключ keyset-пагинации и индекс tasks,
+# который его обслуживает. Сортировки без индекса не принимаются.
+TASK_ORDERINGS = {
+    '-created_at': (('-created_at', '-id'), 'tasks_created_id_idx'),
+    'created_at': (('created_at', 'id'), 'tasks_created_id_idx'),
+    'budget': (('budget', 'id'), 'tasks_budget_id_idx'),
+    '-budget': (('-budget', '-id'), 'tasks_budget_id_idx'),
+    'deadline': (('deadline', 'id'), 'tasks_deadline_id_idx'),
+    '-deadline': (('-deadline', '-id'), 'tasks_deadline_id_idx'),
+}
+# Синонимы, которые переписываются на сортировку с индексом
+# (id растёт вместе с created_at).
+ORDERING_ALIASES = {
+    'id': 'created_at',
+    '-id': '-created_at',
+    'recent': '-created_at',
+    'oldest': 'created_at',
+}
+
+# Корзины фасетов: бюджет [min, max), срок — дни от сегодняшней даты [from, to).
+BUDGET_BUCKETS = (
+    (None, Decimal('100')),
+    (Decimal('100'), Decimal('500')),
+    (Decimal('500'), Decimal('1000')),
+    (Decimal('1000'), Decimal('5000')),
+    (Decimal('5000'), None),
+)
+DEADLINE_BUCKETS = (
+    ('overdue', None, 0),
+    ('week', 0, 7),
+    ('month', 7, 30),
+    ('later', 30, None),
+)
+
+
+def filter_by_skills(queryset, names, match='any', resolved=None):
+    """
+    Оставляет задания с любым (match='any') или со всеми (match='all')
+    навыками из names. Каждое условие — EXISTS по индексу tasks_skills.
+    """
+    return filter_skill_links(queryset, names, match, TaskSkill, 'task', resolved)
+
+
+def ranked_search_available():
+    """Полнотекстовый поиск с ранжированием есть только на PostgreSQL."""
+    return connection.vendor == 'postgresql'
+
+
+def search_tasks(queryset, text, ranked=True):
+    """
+    Полнотекстовый поиск по Task.search_vector (GIN-индекс) в русской и
+    английской конфигурациях. С ranked=True добавляется аннотация rank.
+    На других СУБД — простой поиск по подстроке без ранжирования.
+    """
+    text = text.strip()
+    if not text:
+        return queryset
+    if not ranked_search_available():
+        return queryset.filter(Q(title__icontains=text) | Q(description__icontains=text))
+
+    query = None
+    for config in SEARCH_CONFIGS:
+        part = SearchQuery(text, config=config, search_type='websearch')
+        query = part if query is None else query | part
+    queryset = queryset.filter(search_vector=query)
+    if ranked:
+        # float4 из ts_rank приводится к float8, чтобы значение в курсоре
+        # пагинации совпадало с вычисленным в БД без потери точности.
+        queryset = queryset.annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), output_field=FloatField())
+        )
+    return queryset
+
+
+class TaskFilterSerializer(serializers.Serializer):
+    budget_min = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    budget_max = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    deadline_after = serializers.DateField(required=False)
+    deadline_before = serializers.DateField(required=False)
+    author = serializers.CharField(required=False)
+    ordering = serializers.CharField(required=False)
+
+    def validate_ordering(self, value):
+        value = ORDERING_ALIASES.get(value, value)
+        if value not in TASK_ORDERINGS:
+            raise serializers.ValidationError(f'Допустимые значения: {", ".join(TASK_ORDERINGS)}')
+        return value
+
+    def validate(self, attrs):
+        if attrs.get('budget_min') is not None and attrs.get('budget_max') is not None:
+            if attrs['budget_min'] > attrs['budget_max']:
+                raise serializers.ValidationError({'budget_max': 'Должен быть не меньше budget_min'})
+        if attrs.get('deadline_after') and attrs.get('deadline_before'):
+            if attrs['deadline_after'] > attrs['deadline_before']:
+                raise serializers.ValidationError({'deadline_before': 'Должен быть не раньше deadline_after'})
+        return attrs
+
+
+def get_task_filters(request):
+    """Проверенные параметры фильтрации ленты; разбираются один раз на запрос."""
+    if not hasattr(request, '_task_filters'):
+        serializer = TaskFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        request._task_filters = serializer.validated_data
+    return request._task_filters
+
+
+def get_task_ordering(request):
+    """Ключ keyset-пагинации для ?ordering=, либо None, если сортировка не задана."""
+    ordering = get_task_filters(request).get('ordering')
+    return TASK_ORDERINGS[ordering][0] if ordering else None
+
+
+def task_facets(queryset):
+    """
+    Количество заданий по корзинам бюджета и срока одним агрегирующим
+    запросом (COUNT(*) FILTER (WHERE ...) на каждую корзину).
+    """
+    today = timezone.localdate()
+    aggregates = {}
+    for index, (low, high) in enumerate(BUDGET_BUCKETS):
+        condition = Q()
+        if low is not None:
+            condition &= Q(budget__gte=low)
+        if high is not None:
+            condition &= Q(budget__lt=high)
+        aggregates[f'budget_{index}'] = Count('pk', filter=condition)
+    for key, start, end in DEADLINE_BUCKETS:
+        condition = Q()
+        if start is not None:
+            condition &= Q(deadline__gte=today + timedelta(days=start))
+        if end is not None:
+            condition &= Q(deadline__lt=today + timedelta(days=end))
+        aggregates[f'deadline_{key}'] = Count('pk', filter=condition)
+
+    counts = queryset.order_by().aggregate(**aggregates)
+    return {
+        'budget': [
+            {'min': low, 'max': high, 'count': counts[f'budget_{index}']}
+            for index, (low, high) in enumerate(BUDGET_BUCKETS)
+        ],
+        'deadline': [
+            {
+                'key': key,
+                'from': today + timedelta(days=start) if start is not None else None,
+                'to': today + timedelta(days=end) if end is not None else None,
+                'count': counts[f'deadline_{key}'],
+            }
+            for key, start, end in DEADLINE_BUCKETS
+        ],
+    }
+
+
+class TaskFilterBackend(BaseFilterBackend):
+    """?budget_min=&budget_max=&deadline_after=&deadline_before=&author=username"""
+
+    def filter_queryset(self, request, queryset, view):
+        params = get_task_filters(request)
+        if params.get('budget_min') is not None:
+            queryset = queryset.filter(budget__gte=params['budget_min'])
+        if params.get('budget_max') is not None:
+            queryset = queryset.filter(budget__lte=params['budget_max'])
+        if params.get('deadline_after'):
+            queryset = queryset.filter(deadline__gte=params['deadline_after'])
+        if params.get('deadline_before'):
+            queryset = queryset.filter(deadline__lte=params['deadline_before'])
+        if params.get('author'):
+            queryset = queryset.filter(
+                author__in=User.objects.filter(username=params['author']).values('id')
+            )
+        return queryset
+
+
+class SkillFilterBackend(BaseFilterBackend):
+    """
+    ?skills=python,django&match=any|all. Асинхронные представления заранее
+    сопоставляют названия (view.resolved_skills), чтобы построение выборки
+    не ходило в БД.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        raw = request.query_params.get('skills')
+        if not raw:
+            return queryset
+        match = request.query_params.get('match', 'any')
+        if match not in SKILL_MATCH_MODES:
+            raise ValidationError({'match': f'Допустимые значения: {", ".join(SKILL_MATCH_MODES)}'})
+        return filter_by_skills(queryset, raw.split(','), match, getattr(view, 'resolved_skills', None))
+
+
+class SearchFilterBackend(BaseFilterBackend):
+    """?q=текст — полнотекстовый поиск с сортировкой по релевантности."""
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get('q', '')
+        return search_tasks(queryset, text, ranked=view.action == 'list')
@@ -0,0 +1,233 @@
+import json
+import math
+import os
+import random
+import re
+import statistics
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.management.commands.seed_data import SEED_PASSWORD, SEED_PREFIX
+
+# Сценарий -> представление и метод, по которым из /metrics берётся число SQL-запросов
+SCENARIOS = {
+    'login': ('login', 'POST'),
+    'tasks_list': ('task-list', 'GET'),
+    'tasks_create': ('task-list', 'POST'),
+    'tasks_retrieve': ('task-detail', 'GET'),
+    'profile': ('profile', 'GET'),
+    'skills': ('skills', 'GET'),
+}
+METRIC_LINE = re.compile(
+    r'^http_request_db_queries_(?P<kind>sum|count)\{view="(?P<view>[^"]*)",method="(?P<method>[^"]*)"\} (?P<value>\S+)$'
+)
+
+
+def percentile(values, fraction):
+    """Ближайший ранг: значение, не меньше которого доля fraction выборки."""
+    ordered = sorted(values)
+    # round(..., 9): 0.95 * 100 в двоичной арифметике чуть больше 95
+    rank = math.ceil(round(fraction * len(ordered), 9))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+class Client:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, data=None, token=None):
+        body = json.dumps(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        request.add_header('Accept', 'application/json')
+        if body is not None:
+            request.add_header('Content-Type', 'application/json')
+        if token:
+            request.add_header('Authorization', f'Bearer {token}')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read()
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон REST API против запущенного локально сервера '
+        '(например, DB_ENGINE=sqlite DB_NAME=/tmp/bench.sqlite3 DEBUG=True manage.py runserver '
+        'после migrate и seed_data). Сценарии выполняются по очереди с заданной '
+        'конкурентностью; результат — JSON с p50/p95/p99, пропускной способностью '
+        'и средним числом SQL-запросов (из /metrics сервера).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=500, help='Запросов на сценарий')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+        parser.add_argument('--users', type=int, default=None, help='Сколько seed-пользователей логинить (по умолчанию = concurrency)')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Файл для JSON-отчёта (по умолчанию stdout)')
+        parser.add_argument(
+            '--metrics-token', default=os.getenv('METRICS_TOKEN', ''),
+            help='METRICS_TOKEN сервера для /metrics (без DEBUG доступ только с ним)'
+        )
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Неизвестные сценарии: {", ".join(sorted(unknown))}')
+
+        self.rng = random.Random(options['seed'])
+        self.rng_lock = threading.Lock()
+        self.client = Client(options['base_url'], options['timeout'])
+        self.metrics_token = options['metrics_token']
+        self.usernames = [f'{SEED_PREFIX}user{i}' for i in range(options['users'] or options['concurrency'])]
+        try:
+            self.tokens = self.login_all(self.usernames)
+            self.task_ids = self.sample_task_ids()
+        except urllib.error.URLError as exc:
+            raise CommandError(f'Сервер {options["base_url"]} недоступен: {exc.reason}')
+
+        report = {
+            'meta': {
+                'base_url': options['base_url'],
+                'concurrency': options['concurrency'],
+                'requests_per_scenario': options['requests'],
+                'commit': self.git_commit(),
+                'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            },
+            'scenarios': {},
+        }
+        for name in scenarios:
+            report['scenarios'][name] = self.run_scenario(name, options['requests'], options['concurrency'])
+            self.stderr.write(f'{name}: {json.dumps(report["scenarios"][name]["latency_ms"])}')
+
+        payload = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(payload + '\n')
+        else:
+            self.stdout.write(payload)
+
+    # ----- Подготовка -----
+
+    def login_all(self, usernames):
+        tokens = []
+        for username in usernames:
+            status, body = self.client.request('POST', '/api/auth/login/', {
+                'username': username, 'password': SEED_PASSWORD
+            })
+            if status != 200:
+                raise CommandError(
+                    f'Не удалось войти как {username} ({status}). Заполните БД командой seed_data.'
+                )
+            tokens.append(json.loads(body)['token'])
+        return tokens
+
+    def sample_task_ids(self):
+        status, body = self.client.request('GET', '/api/tasks/?page_size=100&fields=id', token=self.tokens[0])
+        if status != 200:
+            raise CommandError(f'Список заданий недоступен ({status})')
+        ids = [item['id'] for item in json.loads(body)['results']]
+        if not ids:
+            raise CommandError('В БД нет заданий. Заполните её командой seed_data.')
+        return ids
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    # ----- Сценарии -----
+
+    def pick(self, values):
+        with self.rng_lock:
+            return self.rng.choice(values)
+
+    def call(self, name):
+        token = self.pick(self.tokens)
+        if name == 'login':
+            return self.client.request('POST', '/api/auth/login/', {
+                'username': self.pick(self.usernames), 'password': SEED_PASSWORD
+            })
+        if name == 'tasks_list':
+            return self.client.request('GET', '/api/tasks/', token=token)
+        if name == 'tasks_create':
+            return self.client.request('POST', '/api/tasks/', {
+                'title': 'Bench task',
+                'description': 'Создано нагрузочным тестом',
+                'budget': '500.00',
+                'deadline': (date.today() + timedelta(days=30)).isoformat(),
+                'skills': [f'{SEED_PREFIX}skill{self.pick(range(10))}'],
+            }, token=token)
+        if name == 'tasks_retrieve':
+            return self.client.request('GET', f'/api/tasks/{self.pick(self.task_ids)}/', token=token)
+        if name == 'profile':
+            return self.client.request('GET', '/api/auth/profile/', token=token)
+        return self.client.request('GET', '/api/auth/skills/', token=token)
+
+    def timed_call(self, name):
+        started = time.perf_counter()
+        try:
+            status, _ = self.call(name)
+        except OSError as exc:
+            status = type(exc).__name__
+        return (time.perf_counter() - started) * 1000, status
+
+    def run_scenario(self, name, count, concurrency):
+        before = self.query_counters()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda _: self.timed_call(name), range(count)))
+        elapsed = time.perf_counter() - started
+        after = self.query_counters()
+
+        latencies = [latency for latency, _ in results]
+        statuses = Counter(str(status) for _, status in results)
+        errors = sum(n for status, n in statuses.items() if not (status.isdigit() and int(status) < 400))
+        queries = None
+        key = SCENARIOS[name]
+        if before is not None and after is not None and after[key]['count'] > before[key]['count']:
+            queries = round(
+                (after[key]['sum'] - before[key]['sum']) / (after[key]['count'] - before[key]['count']), 2
+            )
+        return {
+            'requests': count,
+            'errors': errors,
+            'status': dict(statuses),
+            'throughput_rps': round(count / elapsed, 1),
+            'latency_ms': {
+                'mean': round(statistics.fmean(latencies), 2),
+                'p50': round(percentile(latencies, 0.50), 2),
+                'p95': round(percentile(latencies, 0.95), 2),
+                'p99': round(percentile(latencies, 0.99), 2),
+                'max': round(max(latencies), 2),
+            },
+            'queries_per_request': queries,
+        }
+
+    def query_counters(self):
+        """Суммы и количества http_request_db_queries по (view, method) или None."""
+        status, body = self.client.request('GET', '/metrics', token=self.metrics_token)
+        if status != 200:
+            return None
+        counters = defaultdict(lambda: {'sum': 0.0, 'count': 0.0})
+        for line in body.decode().splitlines():
+            match = METRIC_LINE.match(line)
+            if match:
+                counters[match['view'], match['method']][match['kind']] = float(match['value'])
+        return counters
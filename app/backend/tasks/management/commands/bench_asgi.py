@@ -0,0 +1,213 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import path
+
+from tasks.async_views import task_detail, task_list
+from tasks.models import Task, TaskSkill
+from tasks.views import TaskViewSet
+from users import async_views as user_async_views
+from users.models import Profile, User
+from users.tokens import PrincipalRefreshToken
+from users.views import public_profile_view
+
+BENCH_USERNAME = 'bench-asgi'
+MODES = ('wsgi', 'asgi-sync', 'asgi-native')
+
+
+class SyncURLs:
+    urlpatterns = [
+        path('api/tasks/', TaskViewSet.as_view({'get': 'list'}), name='task-list'),
+        path('api/tasks/<int:pk>/', TaskViewSet.as_view({'get': 'retrieve'}), name='task-detail'),
+        path('api/auth/profile/<str:username>/', public_profile_view, name='public-profile'),
+    ]
+
+
+class AsyncURLs:
+    urlpatterns = [
+        path('api/tasks/', task_list, name='task-list'),
+        path('api/tasks/<int:pk>/', task_detail, name='task-detail'),
+        path('api/auth/profile/<str:username>/', user_async_views.public_profile, name='public-profile'),
+    ]
+
+
+class ThreadSampler(threading.Thread):
+    """Максимум живых потоков процесса за время прогона."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = threading.active_count()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+
+class Command(BaseCommand):
+    help = (
+        'Чтение ленты, задания и публичного профиля при --clients одновременных '
+        'медленных клиентах (отправка каждого ответа занимает --client-delay '
+        'секунд) в трёх режимах: wsgi — WSGIHandler в пуле из --threads потоков, '
+        'как gunicorn gthread (поток занят, пока клиент читает ответ); asgi-sync — '
+        'ASGIHandler с синхронными DRF-views; asgi-native — ASGIHandler с '
+        'асинхронными представлениями (ASYNC_READ_VIEWS). Обработчики вызываются '
+        'в процессе, без сетевого сервера; результат — пропускная способность, '
+        'p50/p99 задержки с учётом ожидания в очереди и пик числа потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--threads', type=int, default=32, help='Потоков WSGI-сервера')
+        parser.add_argument('--client-delay', type=float, default=0.2)
+        parser.add_argument('--tasks', type=int, default=200)
+        parser.add_argument('--modes', default=','.join(MODES))
+
+    def handle(self, *args, **options):
+        user, token, task_ids = self.prepare(options['tasks'])
+        paths = []
+        for index in range(options['requests']):
+            kind = index % 3
+            if kind == 0:
+                paths.append('/api/tasks/?page_size=20')
+            elif kind == 1:
+                paths.append(f'/api/tasks/{task_ids[index % len(task_ids)]}/')
+            else:
+                paths.append(f'/api/auth/profile/{user.username}/')
+
+        for mode in options['modes'].split(','):
+            mode = mode.strip()
+            urls = AsyncURLs if mode == 'asgi-native' else SyncURLs
+            with override_settings(ALLOWED_HOSTS=['testserver'], ROOT_URLCONF=urls):
+                if mode == 'wsgi':
+                    result = self.run_wsgi(paths, token, options)
+                else:
+                    result = asyncio.run(self.run_asgi(paths, token, options))
+            self.report(mode, *result)
+
+    def prepare(self, count):
+        user, created = User.objects.get_or_create(
+            username=BENCH_USERNAME, defaults={'email': f'{BENCH_USERNAME}@example.com'}
+        )
+        if created:
+            Profile.objects.create(user=user, bio='Benchmark profile')
+        existing = Task.objects.filter(author=user).count()
+        if existing < count:
+            tasks = Task.objects.bulk_create([
+                Task(
+                    author=user, title=f'Bench task {index}', description='Описание ' * 40,
+                    budget='100.00', deadline=date.today() + timedelta(days=30), skills=['Python', 'Django'],
+                )
+                for index in range(existing, count)
+            ])
+            TaskSkill.objects.sync(tasks)
+        token = str(PrincipalRefreshToken.for_user(user).access_token)
+        task_ids = list(Task.objects.filter(author=user).values_list('id', flat=True)[:count])
+        return user, token, task_ids
+
+    # ----- Режимы -----
+
+    def run_wsgi(self, paths, token, options):
+        handler = WSGIHandler()
+        factory = RequestFactory()
+        environs = [factory.get(path, HTTP_AUTHORIZATION=f'Bearer {token}').environ for path in paths]
+        delay = options['client_delay']
+
+        def serve(environ):
+            statuses = []
+            response = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            try:
+                for _ in response:
+                    pass
+                # Медленный клиент держит поток, пока не дочитает ответ
+                time.sleep(delay)
+            finally:
+                response.close()
+            return int(statuses[0].split()[0])
+
+        serve(environs[0])
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            async def call(environ):
+                return await asyncio.get_running_loop().run_in_executor(pool, serve, environ)
+            return asyncio.run(self.drive(call, environs, options['clients']))
+
+    async def run_asgi(self, paths, token, options):
+        handler = ASGIHandler()
+        delay = options['client_delay']
+        scopes = [self.scope(path, token) for path in paths]
+
+        async def call(scope):
+            statuses = []
+            requested = False
+            disconnected = asyncio.Event()
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+                elif not message.get('more_body'):
+                    # Медленный клиент: соединение ждёт, поток не занят
+                    await asyncio.sleep(delay)
+
+            await handler(scope, receive, send)
+            return statuses[0]
+
+        await call(scopes[0])
+        return await self.drive(call, scopes, options['clients'])
+
+    def scope(self, path, token):
+        path, _, query = path.partition('?')
+        return {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query.encode(), 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode())],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+
+    async def drive(self, call, requests, clients):
+        """--clients клиентов по очереди разбирают запросы; задержка — от начала прогона клиента."""
+        queue = list(reversed(requests))
+        latencies, statuses = [], {}
+
+        async def client():
+            while queue:
+                request = queue.pop()
+                started = time.perf_counter()
+                status = await call(request)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        sampler = ThreadSampler()
+        sampler.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+        sampler.stopped.set()
+        return latencies, statuses, elapsed, sampler.peak
+
+    def report(self, mode, latencies, statuses, elapsed, threads):
+        latencies.sort()
+        self.stdout.write(
+            f'{mode:>12}: {len(latencies) / elapsed:8.0f} req/s  '
+            f'p50={statistics.median(latencies):8.1f}ms  '
+            f'p99={latencies[int(len(latencies) * 0.99) - 1]:8.1f}ms  '
+            f'threads={threads:<4} status={statuses}'
+        )
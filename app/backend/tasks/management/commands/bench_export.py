@@ -0,0 +1,100 @@
+import gc
+import json
+import os
+import resource
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.export import EXPORT_FORMATS
+from tasks.export import task_export
+from tasks.models import Task
+
+User = get_user_model()
+
+BENCH_USERNAME = 'bench-export'
+
+
+def current_rss():
+    """Текущий RSS процесса в МиБ (Linux); иначе — пиковый."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return peak_rss()
+
+
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая выгрузка заданий (core.export) на --tasks строках: время, '
+        'строк в секунду и RSS процесса до, во время (после каждой пачки) и '
+        'после выгрузки. С --naive для сравнения строится один JSON-документ '
+        'из list(values()), как делает обычный список API. Недостающие '
+        'задания досоздаются через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1_000_000)
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--naive', action='store_true')
+
+    def handle(self, *args, **options):
+        self.ensure_tasks(options['tasks'], options['batch_size'])
+        gc.collect()
+
+        before = current_rss()
+        samples = []
+        rows = size = 0
+        started = time.perf_counter()
+        for index, chunk in enumerate(task_export.stream(options['format'], chunk_size=options['chunk_size'])):
+            size += len(chunk)
+            rows += chunk.count(b'\n')
+            if index % 10 == 0:
+                samples.append(current_rss())
+        elapsed = time.perf_counter() - started
+        if options['format'] == 'csv':
+            rows -= 1
+        self.stdout.write(
+            f'streamed {rows} rows ({size / 2 ** 20:.0f} MiB {options["format"]}) in {elapsed:.1f}s, '
+            f'{rows / elapsed:.0f} rows/s'
+        )
+        self.stdout.write(
+            f'RSS: before {before:.0f} MiB, during min {min(samples):.0f} / max {max(samples):.0f} MiB '
+            f'({len(samples)} samples), after {current_rss():.0f} MiB, peak {peak_rss():.0f} MiB'
+        )
+
+        if options['naive']:
+            started = time.perf_counter()
+            document = json.dumps(list(task_export.rows()), default=str)
+            self.stdout.write(
+                f'naive list + json.dumps: {len(document) / 2 ** 20:.0f} MiB in '
+                f'{time.perf_counter() - started:.1f}s, peak RSS {peak_rss():.0f} MiB'
+            )
+
+    def ensure_tasks(self, count, batch_size):
+        author, _ = User.objects.get_or_create(
+            username=BENCH_USERNAME, defaults={'email': f'{BENCH_USERNAME}@example.com'}
+        )
+        created = Task.objects.count()
+        deadline = date.today() + timedelta(days=30)
+        while created < count:
+            size = min(batch_size, count - created)
+            Task.objects.bulk_create([
+                Task(
+                    title=f'Export task {created + i}', description='Описание задания ' * 8,
+                    budget=100 + (created + i) % 5000, deadline=deadline,
+                    skills=['Python', 'Django'], author=author,
+                )
+                for i in range(size)
+            ])
+            created += size
+            if created % 100_000 < batch_size:
+                self.stderr.write(f'seeded {created}/{count} tasks')
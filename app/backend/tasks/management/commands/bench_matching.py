@@ -0,0 +1,89 @@
+import itertools
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from tasks.matching import MatchingEngine
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет подбор исполнителей (tasks.matching) на синтетических данных '
+        'в памяти: построение индекса, запросы в обе стороны и точечные обновления. '
+        'Популярность навыков распределена по закону Ципфа.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=100_000)
+        parser.add_argument('--tasks', type=int, default=100_000)
+        parser.add_argument('--skills', type=int, default=2_000)
+        parser.add_argument('--min-skills', type=int, default=2)
+        parser.add_argument('--max-skills', type=int, default=8)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--runs', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--memory', action='store_true', help='Измерить память индекса (медленнее)')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        skill_ids = list(range(1, options['skills'] + 1))
+        cum_weights = list(itertools.accumulate(1 / rank for rank in skill_ids))
+
+        def pick_skills():
+            count = rng.randint(options['min_skills'], options['max_skills'])
+            return set(rng.choices(skill_ids, cum_weights=cum_weights, k=count))
+
+        today = date.today()
+        profile_rows, profile_skills, task_rows, task_skills = [], [], [], []
+        for user_id in range(1, options['profiles'] + 1):
+            profile_rows.append((user_id, rng.randint(5, 150), round(rng.uniform(0, 5), 2)))
+            profile_skills.extend((user_id, skill_id) for skill_id in pick_skills())
+        for task_id in range(1, options['tasks'] + 1):
+            author_id = rng.randint(1, options['profiles'])
+            task_rows.append((task_id, rng.randint(50, 20_000), author_id, today + timedelta(days=rng.randint(0, 60))))
+            task_skills.extend((task_id, skill_id) for skill_id in pick_skills())
+
+        engine = MatchingEngine()
+        if options['memory']:
+            tracemalloc.start()
+        started = time.perf_counter()
+        engine.build(profile_rows, profile_skills, task_rows, task_skills)
+        built = time.perf_counter() - started
+        line = f'build: {built:.2f}s for {len(engine.profiles)} profiles x {len(engine.tasks)} tasks'
+        if options['memory']:
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            line += f', ~{current / 2 ** 20:.0f} MiB'
+        self.stdout.write(line)
+
+        limit, runs = options['limit'], options['runs']
+        self.report('freelancers_for_task', [
+            self.timed(engine.freelancers_for_task, rng.randint(1, options['tasks']), limit, refresh=False)
+            for _ in range(runs)
+        ])
+        self.report('tasks_for_freelancer', [
+            self.timed(engine.tasks_for_freelancer, rng.randint(1, options['profiles']), limit, refresh=False)
+            for _ in range(runs)
+        ])
+
+        def update_profile():
+            user_id = rng.randint(1, options['profiles'])
+            engine.profiles.upsert(user_id, engine.skill_bits.encode(pick_skills()), 40.0, 4.5)
+
+        self.report('profile upsert', [self.timed(update_profile) for _ in range(runs)])
+
+    def timed(self, func, *args, **kwargs):
+        started = time.perf_counter()
+        func(*args, **kwargs)
+        return (time.perf_counter() - started) * 1000
+
+    def report(self, name, timings):
+        timings.sort()
+        self.stdout.write(
+            f'{name}: p50={statistics.median(timings):.2f}ms '
+            f'p95={timings[int(len(timings) * 0.95) - 1]:.2f}ms max={timings[-1]:.2f}ms ({len(timings)} runs)'
+        )
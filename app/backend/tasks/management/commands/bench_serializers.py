@@ -0,0 +1,114 @@
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models.functions import Substr
+from rest_framework.renderers import JSONRenderer
+
+from tasks.models import Task
+from tasks.serializers import TaskListSerializer
+from tasks.views import LIST_FIELD_COLUMNS
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает вывод ленты заданий обычным TaskListSerializer (экземпляры '
+        'моделей) и быстрым режимом TaskListSerializer.rows (строки values()) '
+        'на синтетических данных в памяти: время сериализации и рендеринга JSON, '
+        'плюс проверка побайтового совпадения. С --db оба пути замеряются вместе '
+        'с выборкой первых --rows заданий из БД (например, после seed_data).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000)
+        parser.add_argument('--runs', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--db', action='store_true', help='Брать строки из БД, включая время запроса')
+
+    def handle(self, *args, **options):
+        fields = tuple(LIST_FIELD_COLUMNS)
+        if options['db']:
+            serializer_path, rows_path = self.db_paths(fields, options['rows'])
+        else:
+            serializer_path, rows_path = self.memory_paths(fields, options)
+
+        if serializer_path() != rows_path():
+            raise CommandError('Вывод быстрого режима отличается от TaskListSerializer')
+
+        baseline = self.measure(serializer_path, options['runs'])
+        fast = self.measure(rows_path, options['runs'])
+        self.stdout.write(f'{options["rows"]} rows{" from DB" if options["db"] else ""}, JSON identical')
+        self.stdout.write(f'TaskListSerializer:      p50={baseline:.2f}ms')
+        self.stdout.write(f'TaskListSerializer.rows: p50={fast:.2f}ms ({baseline / fast:.1f}x)')
+
+    def db_paths(self, fields, count):
+        excerpt = Substr('description', 1, TaskListSerializer.EXCERPT_LENGTH + 1)
+        queryset = Task.objects.order_by('-created_at', '-id').annotate(description_excerpt=excerpt)
+        columns = {'description_excerpt'}
+        for name in fields:
+            columns.update(LIST_FIELD_COLUMNS[name])
+        renderer = JSONRenderer()
+
+        def serializer_path():
+            tasks = queryset.select_related('author').defer('search_vector')[:count]
+            return renderer.render(TaskListSerializer(tasks, many=True, fields=fields).data)
+
+        def rows_path():
+            rows = queryset.values(*columns)[:count]
+            return renderer.render(TaskListSerializer.rows(fields).to_representation(rows))
+
+        return serializer_path, rows_path
+
+    def memory_paths(self, fields, options):
+        rng = random.Random(options['seed'])
+        authors = [
+            User(
+                id=i, username=f'user{i}',
+                avatar=f'avatars/{rng.getrandbits(256):064x}/512.jpg' if i % 3 else ''
+            )
+            for i in range(1, 101)
+        ]
+        created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        tasks, rows = [], []
+        for i in range(options['rows']):
+            author = rng.choice(authors)
+            description = 'Описание задания. ' * rng.randint(1, 40)
+            task = Task(
+                id=i + 1, title=f'Задание {i}', description=description,
+                budget=Decimal(rng.randint(5_000, 2_000_000)) / 100,
+                deadline=date(2024, 6, 1) + timedelta(days=rng.randint(0, 90)),
+                skills=rng.sample(['Python', 'Django', 'React', 'SQL', 'Go', 'Figma'], 3),
+                created_at=created + timedelta(seconds=i), author=author,
+            )
+            task.description_excerpt = description[:TaskListSerializer.EXCERPT_LENGTH + 1]
+            tasks.append(task)
+            rows.append({
+                'id': task.id, 'title': task.title, 'description_excerpt': task.description_excerpt,
+                'budget': task.budget, 'deadline': task.deadline, 'skills': task.skills,
+                'created_at': task.created_at, 'author__username': author.username,
+                'author__avatar': author.avatar.name,
+            })
+
+        renderer = JSONRenderer()
+
+        def serializer_path():
+            return renderer.render(TaskListSerializer(tasks, many=True, fields=fields).data)
+
+        def rows_path():
+            return renderer.render(TaskListSerializer.rows(fields).to_representation(rows))
+
+        return serializer_path, rows_path
+
+    def measure(self, func, runs):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,89 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from users.models import Skill
+from tasks.filters import filter_by_skills
+from tasks.models import Task, TaskSkill
+
+User = get_user_model()
+
+BENCH_PREFIX = 'bench-skill-'
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку фильтра ?skills= на большом числе заданий. '
+        'Недостающие задания и навыки досоздаются через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1_000_000)
+        parser.add_argument('--skills', type=int, default=200)
+        parser.add_argument('--per-task', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        skills = self.ensure_skills(options['skills'])
+        self.ensure_tasks(rng, skills, options['tasks'], options['per_task'], options['batch_size'])
+
+        names = [skill.name for skill in skills]
+        queryset = Task.objects.order_by('-created_at', '-id')
+        for match in ('any', 'all'):
+            timings = []
+            for _ in range(options['runs']):
+                query = rng.sample(names, 2)
+                started = time.perf_counter()
+                list(filter_by_skills(queryset, query, match).values_list('id', flat=True)[:20])
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'match={match}: p50={statistics.median(timings):.2f}ms '
+                f'p95={timings[int(len(timings) * 0.95) - 1]:.2f}ms '
+                f'max={timings[-1]:.2f}ms ({options["runs"]} runs, first page of 20)'
+            )
+
+    def ensure_skills(self, count):
+        existing = list(Skill.objects.filter(name__startswith=BENCH_PREFIX))
+        missing = [Skill(name=f'{BENCH_PREFIX}{i}') for i in range(len(existing), count)]
+        return existing + Skill.objects.bulk_create(missing)
+
+    def ensure_tasks(self, rng, skills, count, per_task, batch_size):
+        author, _ = User.objects.get_or_create(
+            username=f'{BENCH_PREFIX}author',
+            defaults={'email': f'{BENCH_PREFIX}author@example.com'}
+        )
+        created = Task.objects.filter(author=author).count()
+        deadline = date.today() + timedelta(days=30)
+        by_name = {skill.name: skill.id for skill in skills}
+        while created < count:
+            size = min(batch_size, count - created)
+            batch = []
+            for i in range(size):
+                chosen = rng.sample(skills, per_task)
+                batch.append(Task(
+                    title=f'Bench task {created + i}',
+                    description='',
+                    budget=rng.randint(10, 5000),
+                    deadline=deadline,
+                    skills=[skill.name for skill in chosen],
+                    author=author
+                ))
+            batch = Task.objects.bulk_create(batch)
+            TaskSkill.objects.bulk_create(
+                [TaskSkill(task_id=task.id, skill_id=by_name[name]) for task in batch for name in task.skills],
+                ignore_conflicts=True
+            )
+            created += size
+            self.stdout.write(f'seeded {created}/{count} tasks')
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE tasks; ANALYZE tasks_skills;')
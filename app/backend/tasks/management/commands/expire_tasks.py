@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        'Переводит открытые задания с прошедшим сроком в статус expired '
+        'пачками по --batch-size, каждая в своей короткой транзакции. '
+        'Рассчитана на периодический запуск (cron, systemd timer); повторный '
+        'и параллельный запуск безопасны — занятые строки пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1_000)
+        parser.add_argument('--pause', type=float, default=0, help='Пауза между пачками, секунды')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        total = 0
+        while True:
+            with transaction.atomic():
+                # Выборка идёт по частичному индексу tasks_deadline_id_idx (status = 'open')
+                batch = list(
+                    Task.objects.overdue(today)
+                    .order_by('deadline', 'id')
+                    .select_for_update(skip_locked=True)
+                    .values_list('id', flat=True)[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                total += Task.objects.filter(pk__in=batch, status=Task.STATUS_OPEN).update(
+                    status=Task.STATUS_EXPIRED, updated_at=timezone.now()
+                )
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(f'expired {total} tasks')
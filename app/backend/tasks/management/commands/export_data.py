@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from core.export import EXPORT_FORMATS, parse_updated_since
+from tasks.export import task_export
+from users.export import profile_export
+
+EXPORTS = {'tasks': task_export, 'profiles': profile_export}
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает задания или профили в NDJSON или CSV тем же потоком, что '
+        '/api/tasks/export/ и /api/freelancers/export/ (core.export): строки '
+        'читаются серверным курсором пачками по --chunk-size, память не зависит '
+        'от размера таблицы. --updated-since — только изменённые с этого момента.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=list(EXPORTS))
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--updated-since')
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--file', help='Файл для выгрузки (по умолчанию stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            updated_since = parse_updated_since(options['updated_since'])
+        except ValidationError as exc:
+            raise CommandError(exc.detail['updated_since'][0])
+        chunks = EXPORTS[options['table']].stream(options['format'], updated_since, options['chunk_size'])
+        if not options['file']:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending='')
+            return
+        with open(options['file'], 'wb') as handle:
+            for chunk in chunks:
+                handle.write(chunk)
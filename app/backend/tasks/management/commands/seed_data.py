@@ -0,0 +1,123 @@
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from users.cache import bump_skill_catalogue
+from users.models import Profile, Skill
+from tasks.models import Task, TaskSkill
+
+User = get_user_model()
+
+SEED_PREFIX = 'seed-'
+SEED_PASSWORD = 'seed-pass-42'
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет БД синтетическими пользователями, профилями, навыками и '
+        'заданиями (bulk_create пачками) для нагрузочных тестов bench_api. '
+        f'Логины {SEED_PREFIX}user<N>, общий пароль {SEED_PASSWORD}. '
+        'Повторный запуск досоздаёт только недостающее.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--tasks', type=int, default=100_000)
+        parser.add_argument('--skills', type=int, default=300)
+        parser.add_argument('--skills-per-item', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        skills = self.ensure_skills(options['skills'])
+        users = self.ensure_users(rng, skills, options)
+        self.ensure_tasks(rng, skills, users, options)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(users)} users, {len(skills)} skills, '
+            f'{Task.objects.filter(author__username__startswith=SEED_PREFIX).count()} tasks'
+        ))
+
+    def ensure_skills(self, count):
+        existing = list(Skill.objects.filter(name__startswith=SEED_PREFIX).order_by('id'))
+        missing = [Skill(name=f'{SEED_PREFIX}skill{i}') for i in range(len(existing), count)]
+        if missing:
+            existing += Skill.objects.bulk_create(missing)
+            # bulk_create не шлёт сигналы — кэш справочника сбрасываем сами
+            bump_skill_catalogue()
+        return existing
+
+    def ensure_users(self, rng, skills, options):
+        # Один хэш на всех: PBKDF2 на каждого пользователя занял бы минуты
+        password = make_password(SEED_PASSWORD)
+        levels = [value for value, _ in Profile.EXPERIENCE_LEVELS]
+        created = User.objects.filter(username__startswith=SEED_PREFIX).count()
+        batch_size = options['batch_size']
+        while created < options['users']:
+            size = min(batch_size, options['users'] - created)
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(
+                        username=f'{SEED_PREFIX}user{created + i}',
+                        email=f'{SEED_PREFIX}user{created + i}@example.com',
+                        password=password
+                    )
+                    for i in range(size)
+                ])
+                profiles = Profile.objects.bulk_create([
+                    Profile(
+                        user=user,
+                        bio='Синтетический профиль',
+                        experience_level=rng.choice(levels),
+                        hourly_rate=rng.randint(5, 150),
+                        rating=round(rng.uniform(0, 5), 2),
+                        completed_projects=rng.randint(0, 200),
+                        specialization=rng.choice(['backend', 'frontend', 'design', 'mobile', 'data']),
+                        available_for_hire=rng.random() < 0.7,
+                    )
+                    for user in users
+                ])
+                Profile.skills.through.objects.bulk_create([
+                    Profile.skills.through(profile_id=profile.id, skill_id=skill.id)
+                    for profile in profiles
+                    for skill in rng.sample(skills, min(options['skills_per_item'], len(skills)))
+                ])
+            created += size
+            self.stdout.write(f'seeded {created}/{options["users"]} users')
+        return list(User.objects.filter(username__startswith=SEED_PREFIX).values_list('id', flat=True))
+
+    def ensure_tasks(self, rng, skills, user_ids, options):
+        created = Task.objects.filter(author__username__startswith=SEED_PREFIX).count()
+        batch_size = options['batch_size']
+        today = date.today()
+        while created < options['tasks']:
+            size = min(batch_size, options['tasks'] - created)
+            with transaction.atomic():
+                chosen = [
+                    rng.sample(skills, min(options['skills_per_item'], len(skills))) for _ in range(size)
+                ]
+                tasks = Task.objects.bulk_create([
+                    Task(
+                        title=f'Seed task {created + i}',
+                        description='Синтетическое задание для нагрузочного теста. ' * rng.randint(1, 20),
+                        budget=rng.randint(50, 20_000),
+                        deadline=today + timedelta(days=rng.randint(-10, 90)),
+                        skills=[skill.name for skill in task_skills],
+                        author_id=rng.choice(user_ids),
+                    )
+                    for i, task_skills in enumerate(chosen)
+                ])
+                TaskSkill.objects.bulk_create([
+                    TaskSkill(task_id=task.id, skill_id=skill.id)
+                    for task, task_skills in zip(tasks, chosen)
+                    for skill in task_skills
+                ], ignore_conflicts=True)
+            created += size
+            self.stdout.write(f'seeded {created}/{options["tasks"]} tasks')
@@ -0,0 +1,426 @@
+"""
+Подбор исполнителей к заданиям и заданий к исполнителям.
+
+Навыки каждого задания и каждого доступного исполнителя хранятся в памяти
+процесса битовой маской (int): бит — навык справочника, частым навыкам при
+перестроении достаются младшие биты, поэтому маски остаются короткими.
+Обратный индекс «бит → ключи» отбирает кандидатов с общими навыками, а
+пересечение считается одной операцией (a & b).bit_count(), без JOIN через ORM.
+
+Оценка пары — взвешенная сумма (MATCH_WEIGHTS):
+  skills — доля навыков задания, которыми владеет исполнитель;
+  rate   — хватает ли бюджета на REFERENCE_HOURS часов по ставке исполнителя;
+  rating — рейтинг исполнителя, нормированный к 1.
+
+Индекс обновляется инкрементально: сигналы помечают изменённые задания и
+профили, а раз в MATCHING_REFRESH_INTERVAL секунд подтягиваются строки с
+новым updated_at — так видны изменения из других процессов. Удаления и
+прочий дрейф убирает полное перестроение раз в MATCHING_REBUILD_INTERVAL.
+Обслуживание делает один поток, и в БД он ходит без блокировки индекса:
+остальные запросы тем временем отвечают по текущему состоянию.
+"""
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from core.instrumentation import maintenance
+from users.models import Profile
+from .models import Task, TaskSkill
+
+MATCH_WEIGHTS = {'skills': 0.6, 'rate': 0.25, 'rating': 0.15}
+REFERENCE_HOURS = 40
+MAX_RATING = 5.0
+BATCH_SIZE = 1000
+
+ProfileSkill = Profile.skills.through
+
+
+def rate_fit(budget, hourly_rate):
+    if hourly_rate <= 0:
+        return 1.0
+    return min(1.0, budget / (hourly_rate * REFERENCE_HOURS))
+
+
+def rating_part(rating):
+    return MATCH_WEIGHTS['rating'] * float(rating) / MAX_RATING
+
+
+def match_score(task_bits, task_size, budget, profile_bits, hourly_rate, rating):
+    """Эталонная формула оценки; в запросах движка она развёрнута в цикл."""
+    coverage = (task_bits & profile_bits).bit_count() / task_size if task_size else 0.0
+    return (
+        MATCH_WEIGHTS['skills'] * coverage
+        + MATCH_WEIGHTS['rate'] * rate_fit(budget, hourly_rate)
+        + rating_part(rating)
+    )
+
+
+def bit_positions(bits):
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+class SkillBits:
+    """Номера битов для id навыков."""
+
+    def __init__(self, frequencies=None):
+        self._bits = {}
+        for skill_id, _ in (frequencies or Counter()).most_common():
+            self._bits[skill_id] = len(self._bits)
+
+    def encode(self, skill_ids):
+        bits = 0
+        for skill_id in skill_ids:
+            bit = self._bits.get(skill_id)
+            if bit is None:
+                bit = self._bits[skill_id] = len(self._bits)
+            bits |= 1 << bit
+        return bits
+
+
+class VectorIndex:
+    """
+    Векторы одной стороны: key -> (маска, число навыков, *атрибуты) и
+    обратный индекс бит -> множество ключей.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.postings = defaultdict(set)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def upsert(self, key, bits, *attrs):
+        self.remove(key)
+        self.entries[key] = (bits, bits.bit_count()) + attrs
+        for bit in bit_positions(bits):
+            self.postings[bit].add(key)
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for bit in bit_positions(entry[0]):
+            keys = self.postings.get(bit)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[bit]
+
+    def candidates(self, bits):
+        """Ключи хотя бы с одним общим битом; для пустой маски — все."""
+        if not bits:
+            return self.entries.keys()
+        keys = set()
+        for bit in bit_positions(bits):
+            keys.update(self.postings.get(bit, ()))
+        return keys
+
+
+def _group_skills(pairs):
+    grouped = defaultdict(list)
+    for key, skill_id in pairs:
+        grouped[key].append(skill_id)
+    return grouped
+
+
+def _batches(keys):
+    keys = list(keys)
+    for start in range(0, len(keys), BATCH_SIZE):
+        yield keys[start:start + BATCH_SIZE]
+
+
+class MatchingEngine:
+    """
+    Индексы исполнителей (ключ — user_id, только available_for_hire) и
+    открытых заданий (ключ — id, статус open, срок не прошёл). Записи
+    исполнителей: (маска, число навыков, ставка, вклад рейтинга в оценку); заданий:
+    (маска, число навыков, бюджет, author_id, срок).
+    """
+
+    def __init__(self, refresh_interval=30, rebuild_interval=3600):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._loaded = False
+        self._built_at = self._synced_at = 0.0
+        self._watermarks = {}
+        self._dirty_profiles = set()
+        self._dirty_tasks = set()
+        self.skill_bits = SkillBits()
+        self.profiles = VectorIndex()
+        self.tasks = VectorIndex()
+
+    # ----- Построение и обновление -----
+
+    def build(self, profile_rows, profile_skills, task_rows, task_skills):
+        """
+        Строит индексы из строк: профили (user_id, hourly_rate, rating),
+        задания (id, budget, author_id, deadline) и пары (ключ, skill_id).
+        """
+        profile_skills = _group_skills(profile_skills)
+        task_skills = _group_skills(task_skills)
+        frequencies = Counter()
+        for skill_ids in (*profile_skills.values(), *task_skills.values()):
+            frequencies.update(skill_ids)
+
+        skill_bits = SkillBits(frequencies)
+        profiles, tasks = VectorIndex(), VectorIndex()
+        for user_id, hourly_rate, rating in profile_rows:
+            bits = skill_bits.encode(profile_skills.get(user_id, ()))
+            profiles.upsert(user_id, bits, float(hourly_rate), rating_part(rating))
+        for task_id, budget, author_id, deadline in task_rows:
+            bits = skill_bits.encode(task_skills.get(task_id, ()))
+            tasks.upsert(task_id, bits, float(budget), author_id, deadline)
+
+        with self._lock:
+            self.skill_bits, self.profiles, self.tasks = skill_bits, profiles, tasks
+            self._loaded = True
+            self._built_at = self._synced_at = time.monotonic()
+
+    def rebuild(self):
+        """Полная загрузка из БД."""
+        today = timezone.localdate()
+        watermarks = {
+            'profiles': Profile.objects.aggregate(value=Max('updated_at'))['value'],
+            'tasks': Task.objects.aggregate(value=Max('updated_at'))['value'],
+        }
+        self.build(
+            Profile.objects.filter(available_for_hire=True).values_list('user_id', 'hourly_rate', 'rating').iterator(),
+            ProfileSkill.objects.filter(profile__available_for_hire=True)
+            .values_list('profile__user_id', 'skill_id').iterator(),
+            Task.objects.open().filter(deadline__gte=today)
+            .values_list('id', 'budget', 'author_id', 'deadline').iterator(),
+            TaskSkill.objects.filter(task__status=Task.STATUS_OPEN, task__deadline__gte=today)
+            .values_list('task_id', 'skill_id').iterator(),
+        )
+        with self._lock:
+            self._watermarks = watermarks
+
+    def reset(self):
+        """Забывает индекс; следующий запрос перестроит его из БД."""
+        with self._rebuild_lock, self._lock:
+            self._loaded = False
+            self._watermarks = {}
+            self._dirty_profiles.clear()
+            self._dirty_tasks.clear()
+
+    def mark_profiles(self, *user_ids):
+        with self._lock:
+            self._dirty_profiles.update(user_ids)
+
+    def mark_tasks(self, *task_ids):
+        with self._lock:
+            self._dirty_tasks.update(task_ids)
+
+    @maintenance()
+    def ensure_fresh(self):
+        if not self._loaded:
+            with self._rebuild_lock:
+                if not self._loaded:
+                    self._rebuild()
+            return
+        # Обслуживание (перестроение или догрузка изменений) делает один поток
+        # и ходит в БД без _lock; остальные пока читают текущий индекс.
+        if not self._rebuild_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self._built_at > self.rebuild_interval:
+                self._rebuild()
+            else:
+                self._sync()
+        finally:
+            self._rebuild_lock.release()
+
+    def _rebuild(self):
+        # Пометки, сделанные во время загрузки, останутся на следующий запрос
+        with self._lock:
+            self._dirty_profiles.clear()
+            self._dirty_tasks.clear()
+        self.rebuild()
+
+    def _sync(self):
+        """Догружает изменения и помеченные строки; под _lock только обмен данными."""
+        with self._lock:
+            pull = time.monotonic() - self._synced_at > self.refresh_interval
+            watermarks = dict(self._watermarks)
+        if pull:
+            changed, watermarks = self._pull_changes(watermarks)
+        with self._lock:
+            if pull:
+                self._dirty_profiles.update(changed['profiles'])
+                self._dirty_tasks.update(changed['tasks'])
+                self._watermarks = watermarks
+                self._synced_at = time.monotonic()
+            user_ids, self._dirty_profiles = self._dirty_profiles, set()
+            task_ids, self._dirty_tasks = self._dirty_tasks, set()
+        try:
+            profiles = self._load_profiles(user_ids) if user_ids else None
+            tasks = self._load_tasks(task_ids) if task_ids else None
+        except Exception:
+            # Не потерять пометки: повторим на следующем запросе
+            self.mark_profiles(*user_ids)
+            self.mark_tasks(*task_ids)
+            raise
+        with self._lock:
+            if profiles is not None:
+                found, gone = profiles
+                for user_id, skill_ids, hourly_rate, rating_score in found:
+                    self.profiles.upsert(user_id, self.skill_bits.encode(skill_ids), hourly_rate, rating_score)
+                for user_id in gone:
+                    self.profiles.remove(user_id)
+            if tasks is not None:
+                found, gone = tasks
+                for task_id, skill_ids, budget, author_id, deadline in found:
+                    self.tasks.upsert(task_id, self.skill_bits.encode(skill_ids), budget, author_id, deadline)
+                for task_id in gone:
+                    self.tasks.remove(task_id)
+
+    def _pull_changes(self, watermarks):
+        """
+        Ключи, изменённые другими процессами, по updated_at (с запасом на долгие
+        транзакции), и новые отметки: ({'profiles': ..., 'tasks': ...}, watermarks).
+        """
+        slack = timedelta(seconds=self.refresh_interval)
+        changed = {}
+        for name, model, key in (('profiles', Profile, 'user_id'), ('tasks', Task, 'id')):
+            watermark = watermarks.get(name)
+            queryset = model.objects.all()
+            if watermark is not None:
+                queryset = queryset.filter(updated_at__gte=watermark - slack)
+            changed[name] = set()
+            for pk, updated_at in queryset.values_list(key, 'updated_at').iterator():
+                changed[name].add(pk)
+                if watermark is None or updated_at > watermark:
+                    watermark = updated_at
+            watermarks[name] = watermark
+        return changed, watermarks
+
+    def _load_profiles(self, user_ids):
+        """(найденные строки с навыками, ключи для удаления из индекса)."""
+        found, gone = [], set()
+        for batch in _batches(user_ids):
+            rows = Profile.objects.filter(user_id__in=batch, available_for_hire=True).values_list(
+                'user_id', 'hourly_rate', 'rating'
+            )
+            skills = _group_skills(
+                ProfileSkill.objects.filter(profile__user_id__in=batch).values_list('profile__user_id', 'skill_id')
+            )
+            seen = set()
+            for user_id, hourly_rate, rating in rows:
+                seen.add(user_id)
+                found.append((user_id, skills.get(user_id, ()), float(hourly_rate), rating_part(rating)))
+            gone.update(set(batch) - seen)
+        return found, gone
+
+    def _load_tasks(self, task_ids):
+        today = timezone.localdate()
+        found, gone = [], set()
+        for batch in _batches(task_ids):
+            rows = Task.objects.open().filter(pk__in=batch, deadline__gte=today).values_list(
+                'id', 'budget', 'author_id', 'deadline'
+            )
+            skills = _group_skills(TaskSkill.objects.filter(task_id__in=batch).values_list('task_id', 'skill_id'))
+            seen = set()
+            for task_id, budget, author_id, deadline in rows:
+                seen.add(task_id)
+                found.append((task_id, skills.get(task_id, ()), float(budget), author_id, deadline))
+            gone.update(set(batch) - seen)
+        return found, gone
+
+    # ----- Запросы -----
+
+    def freelancers_for_task(self, task_id, limit=10, refresh=True):
+        """[(оценка, user_id), ...] лучших доступных исполнителей для задания."""
+        if refresh:
+            self.ensure_fresh()
+        with self._lock:
+            task = self.tasks.entries.get(task_id)
+            if task is None:
+                return []
+            task_bits, task_size, budget, author_id, _ = task
+            skill_weight = MATCH_WEIGHTS['skills'] / task_size if task_size else 0.0
+            rate_weight = MATCH_WEIGHTS['rate']
+            affordable_rate = budget / REFERENCE_HOURS
+            entries = self.profiles.entries
+            top = []
+            # Оценка (match_score) развёрнута в цикле: на 100k кандидатов
+            # вызов функции на каждого заметно дороже самой арифметики.
+            for user_id in self.profiles.candidates(task_bits):
+                if user_id == author_id:
+                    continue
+                bits, _, hourly_rate, rating_score = entries[user_id]
+                score = skill_weight * (task_bits & bits).bit_count() + rating_score + (
+                    rate_weight if hourly_rate <= affordable_rate else rate_weight * affordable_rate / hourly_rate
+                )
+                if len(top) < limit:
+                    heapq.heappush(top, (score, user_id))
+                elif score > top[0][0]:
+                    heapq.heapreplace(top, (score, user_id))
+            return sorted(top, reverse=True)
+
+    def tasks_for_freelancer(self, user_id, limit=10, refresh=True):
+        """[(оценка, task_id), ...] лучших открытых заданий для исполнителя."""
+        if refresh:
+            self.ensure_fresh()
+        with self._lock:
+            profile = self.profiles.entries.get(user_id)
+        unindexed = None
+        if profile is None:
+            # Запросы к БД — без блокировки, как и синхронизация индекса
+            unindexed = self._load_profile(user_id)
+            if unindexed is None:
+                return []
+        with self._lock:
+            if unindexed is not None:
+                # Кодируем под блокировкой: перестроение могло сменить skill_bits
+                skill_ids, hourly_rate, rating_score = unindexed
+                bits = self.skill_bits.encode(skill_ids)
+                profile = (bits, bits.bit_count(), hourly_rate, rating_score)
+            profile_bits, _, hourly_rate, rating_score = profile
+            skill_weight, rate_weight = MATCH_WEIGHTS['skills'], MATCH_WEIGHTS['rate']
+            full_budget = hourly_rate * REFERENCE_HOURS
+            today = timezone.localdate()
+            entries = self.tasks.entries
+            top = []
+            for task_id in self.tasks.candidates(profile_bits):
+                bits, size, budget, author_id, deadline = entries[task_id]
+                if author_id == user_id or deadline < today:
+                    continue
+                score = rating_score + (
+                    rate_weight if budget >= full_budget else rate_weight * budget / full_budget
+                )
+                if size:
+                    score += skill_weight * (bits & profile_bits).bit_count() / size
+                if len(top) < limit:
+                    heapq.heappush(top, (score, task_id))
+                elif score > top[0][0]:
+                    heapq.heapreplace(top, (score, task_id))
+            return sorted(top, reverse=True)
+
+    def _load_profile(self, user_id):
+        """
+        (skill_ids, ставка, вклад рейтинга) профиля, которого нет в индексе
+        (исполнитель не доступен для найма); None — профиля нет.
+        """
+        row = Profile.objects.filter(user_id=user_id).values_list('hourly_rate', 'rating').first()
+        if row is None:
+            return None
+        skill_ids = list(ProfileSkill.objects.filter(profile__user_id=user_id).values_list('skill_id', flat=True))
+        return skill_ids, float(row[0]), rating_part(row[1])
+
+
+matching_engine = MatchingEngine(
+    refresh_interval=settings.MATCHING_REFRESH_INTERVAL,
+    rebuild_interval=settings.MATCHING_REBUILD_INTERVAL,
+)
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_feed_index'),
+        ('users', '0003_skill_name_lower_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('skill', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='task_links', to='users.skill')),
+                ('task', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='skill_links', to='tasks.task')),
+            ],
+            options={
+                'db_table': 'tasks_skills',
+            },
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='skill_tags',
+            field=models.ManyToManyField(blank=True, related_name='tasks', through='tasks.TaskSkill', to='users.skill', verbose_name='Навыки (справочник)'),
+        ),
+        migrations.AddIndex(
+            model_name='taskskill',
+            index=models.Index(fields=['skill', 'task'], name='tasks_skills_skill_task_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskskill',
+            constraint=models.UniqueConstraint(fields=('task', 'skill'), name='tasks_skills_task_skill_uniq'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:11
+
+from django.db import migrations
+from django.db.models.functions import Lower
+
+BATCH_SIZE = 2000
+
+
+def backfill_task_skills(apps, schema_editor):
+    """
+    Связывает задания со справочником Skill по названиям из Task.skills (без
+    учёта регистра, как TaskSkill.objects.sync). Справочник общий с профилями,
+    поэтому неизвестные названия в него не добавляются и остаются только в
+    Task.skills.
+    """
+    Task = apps.get_model('tasks', 'Task')
+    TaskSkill = apps.get_model('tasks', 'TaskSkill')
+    Skill = apps.get_model('users', 'Skill')
+
+    skill_ids = {}
+    for key, skill_id in Skill.objects.annotate(name_lower=Lower('name')).values_list('name_lower', 'id'):
+        skill_ids.setdefault(key, []).append(skill_id)
+    links = []
+    for task_id, names in Task.objects.values_list('id', 'skills').iterator(chunk_size=BATCH_SIZE):
+        if not isinstance(names, list):
+            continue
+        for key in {str(name).strip().lower() for name in names}:
+            for skill_id in skill_ids.get(key, ()):
+                links.append(TaskSkill(task_id=task_id, skill_id=skill_id))
+        if len(links) >= BATCH_SIZE:
+            TaskSkill.objects.bulk_create(links, ignore_conflicts=True)
+            links = []
+    TaskSkill.objects.bulk_create(links, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_task_skill_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_task_skills, migrations.RunPython.noop),
+    ]
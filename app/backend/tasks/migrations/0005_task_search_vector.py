@@ -0,0 +1,80 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:13
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+BATCH_SIZE = 5000
+
+# Контент двуязычный, поэтому вектор собирается из русской и английской
+# конфигураций; заголовок весит больше описания.
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('russian', coalesce({table}title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({table}title, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce({table}description, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({table}description, '')), 'B')
+"""
+
+CREATE_TRIGGER_SQL = f"""
+CREATE OR REPLACE FUNCTION tasks_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {SEARCH_VECTOR_SQL.format(table='NEW.')};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tasks_search_vector_trigger ON tasks;
+CREATE TRIGGER tasks_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON tasks
+    FOR EACH ROW EXECUTE FUNCTION tasks_search_vector_update();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS tasks_search_vector_trigger ON tasks;
+DROP FUNCTION IF EXISTS tasks_search_vector_update();
+"""
+
+
+def create_search_vector(apps, schema_editor):
+    """Триггер, заполнение существующих строк пачками и GIN-индекс (только PostgreSQL)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_TRIGGER_SQL)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT coalesce(max(id), 0) FROM tasks')
+        max_id = cursor.fetchone()[0]
+        for start in range(0, max_id, BATCH_SIZE):
+            cursor.execute(
+                f'UPDATE tasks SET search_vector = {SEARCH_VECTOR_SQL.format(table="")} '
+                'WHERE id > %s AND id <= %s',
+                [start, start + BATCH_SIZE]
+            )
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_search_vector_gin '
+        'ON tasks USING gin (search_vector)'
+    )
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS tasks_search_vector_gin')
+    schema_editor.execute(DROP_TRIGGER_SQL)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY и пакетное заполнение не должны держать
+    # одну длинную транзакцию на горячей таблице.
+    atomic = False
+
+    dependencies = [
+        ('tasks', '0004_backfill_task_skills'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_vector, drop_search_vector),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_task_filter_indexes'),
+        ('users', '0004_profile_ranking_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # DEFAULT-константа в PostgreSQL 11+ добавляется без перезаписи таблицы.
+        migrations.AddField(
+            model_name='task',
+            name='status',
+            field=models.CharField(choices=[('open', 'Открыто'), ('archived', 'В архиве')], default='open', max_length=20, verbose_name='Статус'),
+        ),
+        # Индексы ленты пересоздаются частичными (WHERE status = 'open').
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_created_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_budget_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_deadline_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['-created_at', '-id'], name='tasks_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['budget', 'id'], include=('deadline', 'author'), name='tasks_budget_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['deadline', 'id'], include=('budget', 'author'), name='tasks_deadline_id_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:52
+
+from django.db import migrations, models
+
+
+def make_search_index_partial(apps, schema_editor):
+    """GIN-индекс поиска — только по открытым заданиям (поиск идёт по ленте)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_search_vector_open_gin '
+        "ON tasks USING gin (search_vector) WHERE status = 'open'"
+    )
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS tasks_search_vector_gin')
+
+
+def make_search_index_full(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_search_vector_gin '
+        'ON tasks USING gin (search_vector)'
+    )
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS tasks_search_vector_open_gin')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY нельзя выполнять в транзакции.
+    atomic = False
+
+    dependencies = [
+        ('tasks', '0007_task_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='status',
+            field=models.CharField(choices=[('open', 'Открыто'), ('in_progress', 'В работе'), ('completed', 'Выполнено'), ('expired', 'Просрочено'), ('archived', 'В архиве')], default='open', max_length=20, verbose_name='Статус'),
+        ),
+        migrations.RunPython(make_search_index_partial, make_search_index_full),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+INDEX = models.Index(fields=['-created_at', '-id'], name='tasks_admin_created_idx')
+
+
+def create_index(apps, schema_editor):
+    model = apps.get_model('tasks', 'Task')
+    if schema_editor.connection.vendor == 'postgresql':
+        # Таблица большая: строим без блокировки записи
+        schema_editor.execute(INDEX.create_sql(model, schema_editor, concurrently=True))
+    else:
+        schema_editor.add_index(model, INDEX)
+
+
+def drop_index(apps, schema_editor):
+    model = apps.get_model('tasks', 'Task')
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(INDEX.remove_sql(model, schema_editor, concurrently=True))
+    else:
+        schema_editor.remove_index(model, INDEX)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY нельзя выполнять в транзакции.
+    atomic = False
+
+    dependencies = [
+        ('tasks', '0008_task_status_lifecycle'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='task', index=INDEX)],
+            database_operations=[migrations.RunPython(create_index, drop_index)],
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def create_full_search_index(apps, schema_editor):
+    """
+    Полный GIN-индекс поиска рядом с частичным tasks_search_vector_open_gin:
+    поиск в админке (TaskAdmin.get_search_results) идёт по всем статусам.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS tasks_search_vector_gin '
+        'ON tasks USING gin (search_vector)'
+    )
+
+
+def drop_full_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS tasks_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY нельзя выполнять в транзакции.
+    atomic = False
+
+    dependencies = [
+        ('tasks', '0010_task_updated_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_full_search_index, drop_full_search_index),
+    ]
@@ -1,26 +1,157 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
 
+from users.models import Skill
+
+class TaskQuerySet(models.QuerySet):
+    def open(self):
+        """Задания ленты; индексы ленты и поиска частичные и покрывают только их."""
+        return self.filter(status=Task.STATUS_OPEN)
+
+    def overdue(self, today):
+        """Открытые задания с прошедшим сроком — кандидаты в expired."""
+        return self.open().filter(deadline__lt=today)
+
+
 class Task(models.Model):
+    STATUS_OPEN = 'open'
+    STATUS_IN_PROGRESS = 'in_progress'
+    STATUS_COMPLETED = 'completed'
+    STATUS_EXPIRED = 'expired'
+    STATUS_ARCHIVED = 'archived'
+    STATUSES = [
+        (STATUS_OPEN, 'Открыто'),
+        (STATUS_IN_PROGRESS, 'В работе'),
+        (STATUS_COMPLETED, 'Выполнено'),
+        (STATUS_EXPIRED, 'Просрочено'),
+        (STATUS_ARCHIVED, 'В архиве'),
+    ]
+    # Допустимые переходы по API. В expired задания переводит только
+    # команда expire_tasks; в open задание возвращается, только если срок
+    # не прошёл — просроченное нужно продлить (TaskSerializer.validate).
+    STATUS_TRANSITIONS = {
+        STATUS_OPEN: {STATUS_IN_PROGRESS, STATUS_ARCHIVED},
+        STATUS_IN_PROGRESS: {STATUS_OPEN, STATUS_COMPLETED, STATUS_ARCHIVED},
+        STATUS_COMPLETED: {STATUS_ARCHIVED},
+        STATUS_EXPIRED: {STATUS_OPEN, STATUS_ARCHIVED},
+        STATUS_ARCHIVED: {STATUS_OPEN},
+    }
+
     title = models.CharField('Название', max_length=200)
     description = models.TextField('Описание')
     budget = models.DecimalField('Бюджет', max_digits=10, decimal_places=2)
     deadline = models.DateField('Срок выполнения')
     skills = models.JSONField('Навыки', default=list)
+    # Закрытые задания не удаляются: смена статуса выводит их из частичных
+    # индексов ленты, и стоимость ленты зависит только от числа открытых.
+    status = models.CharField('Статус', max_length=20, choices=STATUSES, default=STATUS_OPEN)
+    skill_tags = models.ManyToManyField(
+        Skill,
+        through='TaskSkill',
+        related_name='tasks',
+        blank=True,
+        verbose_name='Навыки (справочник)'
+    )
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
+    # Заполняется триггером PostgreSQL (russian + english) при INSERT/UPDATE.
+    # GIN-индексы создаются миграциями: частичный tasks_search_vector_open_gin
+    # (0008) — для поиска по ленте, полный tasks_search_vector_gin (0011) —
+    # для поиска в админке по всем статусам.
+    search_vector = SearchVectorField('Поисковый вектор', null=True, editable=False)
+    # Отдельный индекс по author_id не нужен: его покрывает tasks_author_created_idx.
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name='tasks',
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False
     )
 
+    objects = TaskQuerySet.as_manager()
+
     class Meta:
         db_table = 'tasks'
         ordering = ['-created_at']
+        # Индексы ленты частичные (только открытые задания, Task.objects.open()):
+        # архив не раздувает их и не мешает сканированию.
+        indexes = [
+            # Ключ keyset-пагинации ленты: ORDER BY created_at DESC, id DESC
+            models.Index(fields=['-created_at', '-id'], name='tasks_created_id_idx', condition=Q(status='open')),
+            # Сортировки ?ordering=budget|deadline (см. tasks.filters.TASK_ORDERINGS);
+            # INCLUDE позволяет считать фасеты только по индексу.
+            models.Index(
+                fields=['budget', 'id'], name='tasks_budget_id_idx',
+                include=['deadline', 'author'], condition=Q(status='open')
+            ),
+            models.Index(
+                fields=['deadline', 'id'], name='tasks_deadline_id_idx',
+                include=['budget', 'author'], condition=Q(status='open')
+            ),
+            # Полный, не частичный: он же обслуживает каскадное удаление по author_id.
+            models.Index(fields=['author', '-created_at', '-id'], name='tasks_author_created_idx'),
+            # Админка (tasks.admin): сортировка и фильтр по дате среди всех статусов
+            models.Index(fields=['-created_at', '-id'], name='tasks_admin_created_idx'),
+            # Инкрементальная выгрузка (core.export) и синхронизация tasks.matching
+            models.Index(fields=['updated_at', 'id'], name='tasks_updated_id_idx'),
+        ]
         verbose_name = 'Задание'
         verbose_name_plural = 'Задания'
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+class TaskSkillManager(models.Manager):
+    def sync(self, tasks):
+        """
+        Приводит связи заданий со справочником навыков в соответствие с
+        Task.skills: добавляет недостающие и удаляет лишние строки.
+        Справочник общий с профилями и подбором (tasks.matching), поэтому
+        свободный текст заказчика в него не попадает: названия, которых там
+        нет, остаются только в Task.skills.
+        """
+        tasks = [task for task in tasks if task.pk]
+        if not tasks:
+            return
+        skill_ids = Skill.objects.resolve(name for task in tasks for name in task.skills)
+        wanted = set()
+        for task in tasks:
+            for name in task.skills:
+                for skill_id in skill_ids.get(str(name).strip().lower(), ()):
+                    wanted.add((task.pk, skill_id))
+
+        current = set(self.filter(task__in=tasks).values_list('task_id', 'skill_id'))
+        stale = current - wanted
+        if stale:
+            condition = Q()
+            for task_id, skill_id in stale:
+                condition |= Q(task_id=task_id, skill_id=skill_id)
+            self.filter(condition).delete()
+        self.bulk_create(
+            [self.model(task_id=task_id, skill_id=skill_id) for task_id, skill_id in wanted - current],
+            ignore_conflicts=True
+        )
+
+
+class TaskSkill(models.Model):
+    """Нормализованная копия Task.skills для индексного поиска по навыкам."""
+    # Одиночные индексы по FK не нужны: их покрывают составные ниже.
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='skill_links', db_index=False)
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='task_links', db_index=False)
+
+    objects = TaskSkillManager()
+
+    class Meta:
+        db_table = 'tasks_skills'
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'skill'], name='tasks_skills_task_skill_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['skill', 'task'], name='tasks_skills_skill_task_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.task_id}:{self.skill_id}'
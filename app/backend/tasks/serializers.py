@@ -1,6 +1,10 @@
 import json
 
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
+from core.serialization import RowSerializer
+from users.avatars import FEED_AVATAR_SIZE, avatar_url, avatar_url_builder
 from .models import Task
 
 class TaskSerializer(serializers.ModelSerializer):
@@ -8,11 +12,96 @@ class TaskSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Task
-        fields = ('id', 'title', 'description', 'budget', 'deadline', 'skills', 'created_at', 'author')
+        fields = ('id', 'title', 'description', 'budget', 'deadline', 'skills', 'status', 'created_at', 'author')
         read_only_fields = ('author',)
 
     def get_author(self, obj):
         return {
             "username": obj.author.username,
-            "avatar": obj.author.avatar.url if obj.author.avatar else None
+            "avatar": avatar_url(obj.author.avatar, FEED_AVATAR_SIZE, 'webp')
         }
+
+    def validate_status(self, value):
+        current = self.instance.status if self.instance is not None else None
+        if current is None:
+            if value != Task.STATUS_OPEN:
+                raise serializers.ValidationError('Новое задание может быть только открытым')
+        elif value != current and value not in Task.STATUS_TRANSITIONS[current]:
+            raise serializers.ValidationError(f'Недопустимый переход: {current} → {value}')
+        return value
+
+    def validate(self, attrs):
+        # Задание с прошедшим сроком вернулось бы в ленту до следующего expire_tasks
+        reopened = (
+            self.instance is not None and self.instance.status != Task.STATUS_OPEN
+            and attrs.get('status') == Task.STATUS_OPEN
+        )
+        if reopened and attrs.get('deadline', self.instance.deadline) < timezone.localdate():
+            raise serializers.ValidationError({'deadline': 'Чтобы открыть задание снова, продлите срок'})
+        return attrs
+
+
+class TaskListSerializer(TaskSerializer):
+    """
+    Компактное представление задания для ленты.
+
+    Вместо полного описания отдаётся отрывок (аннотация description_excerpt,
+    см. TaskViewSet), а параметр ?fields=id,title,... оставляет в ответе только
+    перечисленные поля.
+    """
+    EXCERPT_LENGTH = 300
+
+    description = serializers.SerializerMethodField()
+
+    class Meta(TaskSerializer.Meta):
+        # В ленте только открытые задания, статус не нужен
+        fields = ('id', 'title', 'description', 'budget', 'deadline', 'skills', 'created_at', 'author')
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def get_description(self, obj):
+        excerpt = getattr(obj, 'description_excerpt', None)
+        if excerpt is None:
+            excerpt = obj.description[:self.EXCERPT_LENGTH + 1]
+        return self.shorten(excerpt)
+
+    @classmethod
+    def shorten(cls, excerpt):
+        if len(excerpt) > cls.EXCERPT_LENGTH:
+            return excerpt[:cls.EXCERPT_LENGTH].rstrip() + '…'
+        return excerpt
+
+    @classmethod
+    def rows(cls, fields):
+        """
+        Быстрый режим ленты (core.serialization.RowSerializer) для строк
+        values() с колонками tasks.views.LIST_FIELD_COLUMNS и
+        description_excerpt. Вывод совпадает с обычным to_representation.
+        """
+        author_avatar = avatar_url_builder(FEED_AVATAR_SIZE, 'webp')
+        return RowSerializer(cls(fields=fields), computed={
+            'description': lambda row: cls.shorten(row['description_excerpt']),
+            'author': lambda row: {
+                'username': row['author__username'],
+                'avatar': author_avatar(row['author__avatar']),
+            },
+        })
+
+
+class TaskBulkSerializer(serializers.Serializer):
+    """Тело пакетного создания и обновления: {"tasks": [{...}, ...]}."""
+    tasks = serializers.ListField(
+        child=serializers.DictField(), min_length=1, max_length=settings.TASK_BULK_MAX_ITEMS
+    )
+
+
+class TaskArchiveSerializer(serializers.Serializer):
+    """Тело пакетной архивации: {"ids": [1, 2, ...]}."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), min_length=1, max_length=settings.TASK_BULK_MAX_ITEMS
+    )
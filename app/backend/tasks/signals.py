@@ -0,0 +1,30 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import Profile
+from .matching import matching_engine
+from .models import Task
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def mark_task_for_matching(sender, instance, **kwargs):
+    matching_engine.mark_tasks(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def mark_profile_for_matching(sender, instance, **kwargs):
+    matching_engine.mark_profiles(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Profile.skills.through)
+def mark_profile_skills_for_matching(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        matching_engine.mark_profiles(instance.user_id)
+    elif action == 'pre_clear':
+        matching_engine.mark_profiles(*instance.profiles.values_list('user_id', flat=True))
+    elif pk_set:
+        matching_engine.mark_profiles(*Profile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True))
@@ -0,0 +1,204 @@
+"""
+Поток новых заданий для клиентов (SSE, см. tasks.async_views).
+
+Новое задание после коммита превращается в TaskEvent: JSON карточки
+ленты кодируется один раз и рассылается всем подписчикам как есть. Брокер
+(TASK_STREAM_BROKER) доставляет события во все процессы: InMemoryBroker —
+в пределах процесса (разработка, тесты), RedisBroker — через Redis pub/sub.
+В каждом процессе TaskFeedHub раздаёт событие очередям подписчиков,
+отфильтрованным по навыкам. Подписчик, не успевающий читать, отключается:
+клиент переподключится с курсором (Last-Event-ID) и дочитает пропущенное
+из БД.
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework.renderers import JSONRenderer
+
+from core.metrics import REGISTRY
+from .serializers import TaskListSerializer
+
+logger = logging.getLogger(__name__)
+
+STREAM_SUBSCRIBERS = REGISTRY.gauge('task_stream_subscribers', 'Открытые подписки на поток заданий')
+STREAM_EVENTS = REGISTRY.counter('task_stream_events_total', 'События, полученные хабом потока заданий')
+STREAM_OVERFLOWS = REGISTRY.counter('task_stream_overflows_total', 'Подписчики, отключённые из-за переполнения очереди')
+
+
+class TaskEvent:
+    __slots__ = ('id', 'skills', 'payload')
+
+    def __init__(self, id, skills, payload):
+        self.id = id
+        self.skills = frozenset(skills)
+        self.payload = payload
+
+    @classmethod
+    def from_task(cls, task):
+        return cls(
+            task.pk,
+            (str(name).strip().lower() for name in task.skills),
+            JSONRenderer().render(TaskListSerializer(task).data),
+        )
+
+    def encode(self):
+        """Представление для внешнего брокера."""
+        return json.dumps({'id': self.id, 'skills': sorted(self.skills), 'payload': self.payload.decode()})
+
+    @classmethod
+    def decode(cls, raw):
+        data = json.loads(raw)
+        return cls(data['id'], data['skills'], data['payload'].encode())
+
+    def sse(self):
+        return b'id: %d\nevent: task\ndata: %s\n\n' % (self.id, self.payload)
+
+
+class Subscription:
+    """Очередь одного клиента; живёт в цикле событий, который её создал."""
+
+    def __init__(self, skills, maxsize):
+        self.skills = frozenset(skills)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, event):
+        if self.overflowed or (self.skills and not self.skills & event.skills):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            STREAM_OVERFLOWS.inc()
+
+    async def get(self):
+        """Следующее событие или None, если подписчик отстал и должен переподключиться."""
+        if self.overflowed:
+            return None
+        event = await self.queue.get()
+        return None if self.overflowed else event
+
+
+class TaskFeedHub:
+    """Раздача событий подписчикам одного процесса; dispatch можно звать из любого потока."""
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, skills=(), maxsize=None):
+        subscription = Subscription(skills, maxsize or settings.TASK_STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        STREAM_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription not in self._subscriptions:
+                return
+            self._subscriptions.discard(subscription)
+        STREAM_SUBSCRIBERS.dec()
+
+    def dispatch(self, event):
+        STREAM_EVENTS.inc()
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # Цикл событий уже закрыт — подписка осиротела
+                self.unsubscribe(subscription)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+
+hub = TaskFeedHub()
+
+
+class InMemoryBroker:
+    """Брокер одного процесса: публикация сразу уходит в локальный хаб."""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, event):
+        self.hub.dispatch(event)
+
+    def close(self):
+        pass
+
+
+class RedisBroker:
+    """
+    Брокер через Redis pub/sub (REDIS_URL): события видят подписчики всех
+    процессов. Слушатель канала — фоновый поток, запускается при создании.
+    """
+    channel = 'tasks:stream'
+
+    def __init__(self, hub, url=None):
+        import redis
+
+        self.hub = hub
+        self.client = redis.Redis.from_url(url or settings.REDIS_URL)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(**{self.channel: self._on_message})
+        self.thread = self.pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def _on_message(self, message):
+        try:
+            self.hub.dispatch(TaskEvent.decode(message['data']))
+        except (ValueError, KeyError):
+            logger.warning('malformed task stream message', exc_info=True)
+
+    def publish(self, event):
+        self.client.publish(self.channel, event.encode())
+
+    def close(self):
+        self.thread.stop()
+        self.pubsub.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.TASK_STREAM_BROKER)(hub)
+    return _broker
+
+
+def reset_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is not None:
+            _broker.close()
+        _broker = None
+
+
+def publish_tasks(tasks):
+    """Публикует новые задания после коммита текущей транзакции."""
+    events = [TaskEvent.from_task(task) for task in tasks]
+
+    def publish():
+        broker = get_broker()
+        for event in events:
+            try:
+                broker.publish(event)
+            except Exception:
+                # Поток — лишь ускоритель ленты: сбой брокера не ломает создание задания
+                logger.exception('task stream publish failed: task=%s', event.id)
+
+    transaction.on_commit(publish)
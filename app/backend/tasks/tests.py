@@ -1,3 +1,871 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from importlib import import_module
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.contrib.admin import site
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Substr
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from core.testing import QueryCountAssertionsMixin
+from users.models import Profile, Skill
+from users.revocation import revocation_index
+from users.tokens import PrincipalRefreshToken, StreamToken
+from .admin import TaskAdmin
+from .async_views import task_detail, task_list
+from .export import task_export
+from .management.commands.bench_api import percentile
+from .matching import matching_engine
+from .models import Task, TaskSkill
+from .serializers import TaskListSerializer
+from .stream import TaskEvent, get_broker, hub
+
+User = get_user_model()
+
+
+class TaskTestMixin:
+    def make_user(self, username='author'):
+        return User.objects.create_user(username=username, email=f'{username}@example.com', password='pass')
+
+    def make_task(self, author, **kwargs):
+        data = {
+            'title': 'Задание',
+            'description': 'Описание',
+            'budget': '100.00',
+            'deadline': date.today() + timedelta(days=7),
+            'skills': [],
+        }
+        data.update(kwargs)
+        return Task.objects.create(author=author, **data)
+
+    def make_skills(self, *names):
+        """Справочник навыков: задания только ссылаются на него, но не пополняют."""
+        return Skill.objects.bulk_create([Skill(name=name) for name in names])
+
+
+class TaskFeedPaginationTests(QueryCountAssertionsMixin, TaskTestMixin, APITestCase):
+    def setUp(self):
+        self.user = self.make_user()
+        self.client.force_authenticate(self.user)
+        self.tasks = [self.make_task(self.user, title=f'Task {i}') for i in range(7)]
+        self.url = reverse('task-list')
+
+    def test_walks_feed_with_cursor(self):
+        seen = []
+        url = f'{self.url}?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        expected = [task.id for task in sorted(self.tasks, key=lambda t: (t.created_at, t.id), reverse=True)]
+        self.assertEqual(seen, expected)
+
+    def test_previous_link_returns_preceding_page(self):
+        first = self.client.get(f'{self.url}?page_size=3').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual([t['id'] for t in back['results']], [t['id'] for t in first['results']])
+        self.assertIsNone(first['previous'])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(f'{self.url}?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_query_count_is_constant(self):
+        first = self.client.get(f'{self.url}?page_size=2').data
+        with self.assertNumQueries(1):
+            self.client.get(first['next'])
+
+    def test_list_query_count_is_pinned(self):
+        for index in range(3):
+            self.make_task(self.make_user(f'author{index}'))
+        with self.assertViewQueries('task-list', 1):
+            self.client.get(self.url)
+
+
+class TaskListRepresentationTests(TaskTestMixin, APITestCase):
+    def setUp(self):
+        self.user = self.make_user()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('task-list')
+
+    def test_list_truncates_description(self):
+        task = self.make_task(self.user, description='x' * 1000)
+        item = self.client.get(self.url).data['results'][0]
+        self.assertEqual(item['description'], 'x' * 300 + '…')
+        detail = self.client.get(reverse('task-detail', args=[task.id])).data
+        self.assertEqual(detail['description'], 'x' * 1000)
+
+    def test_sparse_fieldset(self):
+        self.make_task(self.user)
+        item = self.client.get(f'{self.url}?fields=id,title,unknown').data['results'][0]
+        self.assertEqual(set(item), {'id', 'title'})
+
+    def test_fast_rows_match_serializer(self):
+        digest = 'ab' * 32
+        User.objects.filter(pk=self.user.pk).update(avatar=f'avatars/{digest}/512.jpg')
+        legacy = self.make_user('legacy')
+        User.objects.filter(pk=legacy.pk).update(avatar='avatars/старый аватар.png')
+        self.make_task(self.user, description='y' * 500, budget='12.50', skills=['Python', 'Django'])
+        self.make_task(legacy, description='Короткое  ')
+        self.make_task(self.make_user('plain'), title='Без аватара')
+
+        queryset = (
+            Task.objects.select_related('author')
+            .annotate(description_excerpt=Substr('description', 1, TaskListSerializer.EXCERPT_LENGTH + 1))
+            .order_by('-created_at', '-id')
+        )
+        expected = JSONRenderer().render(TaskListSerializer(queryset, many=True).data)
+        actual = JSONRenderer().render(self.client.get(self.url).data['results'])
+        self.assertEqual(actual, expected)
+        self.assertIn(f'/media/avatars/{digest}/128.webp'.encode(), actual)
+
+
+class TaskSkillFilterTests(TaskTestMixin, APITestCase):
+    def setUp(self):
+        self.make_skills('Python', 'Django', 'Go')
+        self.user = self.make_user()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('task-list')
+
+    def create_via_api(self, skills):
+        response = self.client.post(self.url, {
+            'title': 'Задание',
+            'description': 'Описание',
+            'budget': '100.00',
+            'deadline': str(date.today()),
+            'skills': skills,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def ids(self, query):
+        return {item['id'] for item in self.client.get(f'{self.url}?{query}').data['results']}
+
+    def test_create_links_skills_case_insensitively(self):
+        first = self.create_via_api(['Python', 'Django'])
+        second = self.create_via_api(['python'])
+        task = Task.objects.get(id=second)
+        self.assertEqual(list(task.skill_tags.values_list('name', flat=True)), ['Python'])
+        self.assertEqual(self.ids('skills=PYTHON'), {first, second})
+
+    def test_match_all_and_any(self):
+        both = self.create_via_api(['Python', 'Django'])
+        python = self.create_via_api(['Python'])
+        self.create_via_api(['Go'])
+        self.assertEqual(self.ids('skills=python,django&match=all'), {both})
+        self.assertEqual(self.ids('skills=python,django&match=any'), {both, python})
+        self.assertEqual(self.ids('skills=python,rust&match=all'), set())
+
+    def test_update_replaces_links(self):
+        task_id = self.create_via_api(['Python'])
+        self.client.patch(reverse('task-detail', args=[task_id]), {'skills': ['Go']}, format='json')
+        self.assertEqual(self.ids('skills=python'), set())
+        self.assertEqual(self.ids('skills=go'), {task_id})
+
+    def test_unknown_skills_stay_out_of_catalogue(self):
+        task_id = self.create_via_api(['Python', 'Мой фреймворк'])
+        self.assertFalse(Skill.objects.filter(name='Мой фреймворк').exists())
+        task = Task.objects.get(id=task_id)
+        self.assertEqual(task.skills, ['Python', 'Мой фреймворк'])
+        self.assertEqual(list(task.skill_tags.values_list('name', flat=True)), ['Python'])
+        self.assertEqual(self.ids('skills=мой фреймворк'), set())
+
+    def test_backfill_links_only_catalogue_skills(self):
+        backfill = import_module('tasks.migrations.0004_backfill_task_skills').backfill_task_skills
+        task = self.make_task(self.user, skills=['python', 'Опечатка'])
+        TaskSkill.objects.all().delete()
+        skills_before = Skill.objects.count()
+        backfill(apps, None)
+        self.assertEqual(Skill.objects.count(), skills_before)
+        self.assertEqual(list(task.skill_tags.values_list('name', flat=True)), ['Python'])
+
+    def test_rejects_unknown_match_mode(self):
+        response = self.client.get(f'{self.url}?skills=python&match=some')
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskSearchTests(TaskTestMixin, APITestCase):
+    def setUp(self):
+        self.user = self.make_user()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('task-list')
+
+    def test_search_matches_title_and_description(self):
+        by_title = self.make_task(self.user, title='Сайт на Django')
+        by_description = self.make_task(self.user, title='Бэкенд', description='Нужен опыт с django')
+        self.make_task(self.user, title='Мобильное приложение')
+        results = self.client.get(f'{self.url}?q=django').data['results']
+        self.assertEqual({item['id'] for item in results}, {by_title.id, by_description.id})
+
+    def test_search_pages_do_not_overlap(self):
+        for i in range(5):
+            self.make_task(self.user, title=f'Django {i}')
+        first = self.client.get(f'{self.url}?q=django&page_size=3').data
+        second = self.client.get(first['next']).data
+        ids = [item['id'] for item in first['results'] + second['results']]
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+
+
+class TaskFacetFilterTests(TaskTestMixin, APITestCase):
+    def setUp(self):
+        self.user = self.make_user()
+        self.other = self.make_user('other')
+        self.client.force_authenticate(self.user)
+        self.url = reverse('task-list')
+        today = date.today()
+        self.cheap = self.make_task(self.user, budget='50.00', deadline=today + timedelta(days=3))
+        self.middle = self.make_task(self.other, budget='700.00', deadline=today + timedelta(days=20))
+        self.expensive = self.make_task(self.user, budget='9000.00', deadline=today - timedelta(days=1))
+
+    def ids(self, query):
+        response = self.client.get(f'{self.url}?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [item['id'] for item in response.data['results']]
+
+    def test_budget_deadline_and_author_filters(self):
+        self.assertEqual(set(self.ids('budget_min=100&budget_max=1000')), {self.middle.id})
+        self.assertEqual(set(self.ids(f'deadline_after={date.today()}')), {self.cheap.id, self.middle.id})
+        self.assertEqual(set(self.ids('author=other')), {self.middle.id})
+
+    def test_ordering_by_budget_pages_through_all_rows(self):
+        first = self.client.get(f'{self.url}?ordering=-budget&page_size=2').data
+        second = self.client.get(first['next']).data
+        ids = [item['id'] for item in first['results'] + second['results']]
+        self.assertEqual(ids, [self.expensive.id, self.middle.id, self.cheap.id])
+
+    def test_ordering_alias_is_rewritten(self):
+        self.assertEqual(self.ids('ordering=oldest'), [self.cheap.id, self.middle.id, self.expensive.id])
+
+    def test_rejects_ordering_without_index(self):
+        self.assertEqual(self.client.get(f'{self.url}?ordering=title').status_code, 400)
+        self.assertEqual(self.client.get(f'{self.url}?budget_min=10&budget_max=1').status_code, 400)
+
+    def test_every_ordering_has_a_supporting_index(self):
+        from .filters import TASK_ORDERINGS
+        indexes = {index.name: [f.lstrip('-') for f in index.fields] for index in Task._meta.indexes}
+        for key, index_name in TASK_ORDERINGS.values():
+            self.assertEqual(indexes[index_name], [f.lstrip('-') for f in key])
+
+    def test_facets_use_a_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('task-facets'))
+        counts = [bucket['count'] for bucket in response.data['budget']]
+        self.assertEqual(counts, [1, 0, 1, 0, 1])
+        deadline = {bucket['key']: bucket['count'] for bucket in response.data['deadline']}
+        self.assertEqual(deadline, {'overdue': 1, 'week': 1, 'month': 1, 'later': 0})
+
+
+class TaskBulkTests(QueryCountAssertionsMixin, TaskTestMixin, APITestCase):
+    def setUp(self):
+        self.make_skills('Python', 'Django', 'Go')
+        self.user = self.make_user()
+        self.other = self.make_user('other')
+        self.client.force_authenticate(self.user)
+        self.url = reverse('task-bulk')
+
+    def item(self, **kwargs):
+        data = {
+            'title': 'Импорт', 'description': 'Описание', 'budget': '250.00',
+            'deadline': str(date.today() + timedelta(days=14)), 'skills': ['Python'],
+        }
+        data.update(kwargs)
+        return data
+
+    def test_create_is_all_or_nothing(self):
+        response = self.client.post(self.url, {'tasks': [self.item(), self.item(budget='x')]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+        self.assertIn('budget', response.data['errors'][0]['errors'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_create_writes_tasks_and_skill_links(self):
+        items = [self.item(title=f'Импорт {i}', skills=['Python', 'Django']) for i in range(5)]
+        with self.assertViewQueries('task-bulk', 6):
+            response = self.client.post(self.url, {'tasks': items}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual([task['title'] for task in response.data], [item['title'] for item in items])
+        self.assertEqual(Task.objects.filter(author=self.user).count(), 5)
+        self.assertEqual(TaskSkill.objects.count(), 10)
+
+    def test_rejects_oversized_batch(self):
+        response = self.client.post(self.url, {'tasks': [self.item()] * 101}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tasks', response.data)
+
+    def test_update_touches_only_own_tasks(self):
+        own = self.make_task(self.user, skills=['Python'])
+        foreign = self.make_task(self.other)
+        response = self.client.patch(self.url, {'tasks': [
+            {'id': own.id, 'budget': '999.00'}, {'id': foreign.id, 'budget': '1.00'}
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['id'], foreign.id)
+        own.refresh_from_db()
+        self.assertEqual(str(own.budget), '100.00')
+
+        before = own.updated_at
+        with self.assertViewQueries('task-bulk', 7):
+            response = self.client.patch(self.url, {'tasks': [
+                {'id': own.id, 'budget': '999.00', 'skills': ['Go']}
+            ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        own.refresh_from_db()
+        self.assertEqual(str(own.budget), '999.00')
+        self.assertGreater(own.updated_at, before)
+        self.assertEqual(list(own.skill_tags.values_list('name', flat=True)), ['Go'])
+
+    def test_archived_tasks_leave_the_feed(self):
+        kept = self.make_task(self.user)
+        archived = self.make_task(self.user, budget='50.00')
+        with self.assertViewQueries('task-bulk-archive', 4):
+            response = self.client.post(reverse('task-bulk-archive'), {'ids': [archived.id]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'archived': [archived.id]})
+
+        feed = self.client.get(reverse('task-list')).data['results']
+        self.assertEqual([task['id'] for task in feed], [kept.id])
+        facets = self.client.get(reverse('task-facets')).data
+        self.assertEqual(sum(bucket['count'] for bucket in facets['budget']), 1)
+        detail = self.client.get(reverse('task-detail', args=[archived.id])).data
+        self.assertEqual(detail['status'], 'archived')
+
+    def test_archive_reports_foreign_ids(self):
+        foreign = self.make_task(self.other)
+        response = self.client.post(reverse('task-bulk-archive'), {'ids': [foreign.id]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.status, Task.STATUS_OPEN)
+
+
+class TaskWriteQueryTests(QueryCountAssertionsMixin, TaskTestMixin, APITestCase):
+    """Запросы изменяющих методов через настоящий JWT: свежая строка пользователя входит в бюджет."""
+
+    def setUp(self):
+        self.make_skills('Python', 'Go')
+        self.user = self.make_user()
+        token = PrincipalRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_write_query_counts_are_pinned(self):
+        data = {
+            'title': 'Задание', 'description': 'Описание', 'budget': '100.00',
+            'deadline': str(date.today() + timedelta(days=7)), 'skills': ['Python'],
+        }
+        with self.assertViewQueries('task-list', 5):
+            response = self.client.post(reverse('task-list'), data, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        url = reverse('task-detail', args=[response.data['id']])
+        with self.assertViewQueries('task-detail', 7):
+            response = self.client.put(url, {**data, 'skills': ['Go']}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        with self.assertViewQueries('task-detail', 3):
+            response = self.client.patch(url, {'budget': '150.00'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        # Со сменой навыков — ещё синхронизация связей, как у PUT
+        with self.assertViewQueries('task-detail', 7):
+            response = self.client.patch(url, {'skills': ['Python']}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+
+class TaskStatusLifecycleTests(TaskTestMixin, APITestCase):
+    def setUp(self):
+        self.user = self.make_user()
+        self.client.force_authenticate(self.user)
+
+    def test_expire_command_moves_overdue_open_tasks(self):
+        yesterday = date.today() - timedelta(days=1)
+        overdue = [self.make_task(self.user, deadline=yesterday) for _ in range(3)]
+        current = self.make_task(self.user)
+        busy = self.make_task(self.user, deadline=yesterday, status=Task.STATUS_IN_PROGRESS)
+
+        out = StringIO()
+        call_command('expire_tasks', batch_size=2, stdout=out)
+        self.assertIn('expired 3 tasks', out.getvalue())
+        statuses = dict(Task.objects.values_list('id', 'status'))
+        self.assertEqual({statuses[task.id] for task in overdue}, {Task.STATUS_EXPIRED})
+        self.assertEqual(statuses[current.id], Task.STATUS_OPEN)
+        self.assertEqual(statuses[busy.id], Task.STATUS_IN_PROGRESS)
+
+        feed = self.client.get(reverse('task-list')).data['results']
+        self.assertEqual([task['id'] for task in feed], [current.id])
+
+    def test_status_transitions_are_validated(self):
+        task = self.make_task(self.user)
+        url = reverse('task-detail', args=[task.id])
+        self.assertEqual(self.client.patch(url, {'status': 'completed'}).status_code, 400)
+        self.assertEqual(self.client.patch(url, {'status': 'in_progress'}).status_code, 200)
+        self.assertEqual(self.client.patch(url, {'status': 'completed'}).status_code, 200)
+        self.assertEqual(self.client.patch(url, {'status': 'open'}).status_code, 400)
+
+        response = self.client.post(reverse('task-list'), {
+            'title': 'Новое', 'description': 'Описание', 'budget': '10.00',
+            'deadline': str(date.today()), 'skills': [], 'status': 'completed',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.data)
+
+    def test_reopening_requires_current_deadline(self):
+        yesterday = date.today() - timedelta(days=1)
+        for status in (Task.STATUS_EXPIRED, Task.STATUS_ARCHIVED, Task.STATUS_IN_PROGRESS):
+            task = self.make_task(self.user, deadline=yesterday, status=status)
+            url = reverse('task-detail', args=[task.id])
+            response = self.client.patch(url, {'status': 'open'})
+            self.assertEqual(response.status_code, 400, status)
+            self.assertIn('deadline', response.data)
+            self.assertEqual(self.client.patch(url, {'status': 'open', 'deadline': str(date.today())}).status_code, 200)
+            task.refresh_from_db()
+            self.assertEqual(task.status, Task.STATUS_OPEN)
+
+    def test_feed_indexes_cover_only_open_tasks(self):
+        from .filters import TASK_ORDERINGS
+        indexes = {index.name: index for index in Task._meta.indexes}
+        for _, index_name in TASK_ORDERINGS.values():
+            self.assertEqual(indexes[index_name].condition, Q(status=Task.STATUS_OPEN))
+
+
+class TaskAdminTests(TaskTestMixin, TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:tasks_task_changelist')
+        author = self.make_user()
+        self.old = self.make_task(author, title='Старое')
+        Task.objects.filter(pk=self.old.pk).update(created_at=datetime(2023, 5, 10, tzinfo=dt_timezone.utc))
+        self.new = self.make_task(author, title='Новое')
+
+    def test_changelist_avoids_full_scans(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        sql = [query['sql'].upper() for query in queries]
+        self.assertEqual(sum('COUNT(' in query for query in sql), 1)
+        self.assertFalse([query for query in sql if 'DISTINCT' in query])
+        listing = next(query for query in sql if 'ORDER BY' in query and 'FROM "TASKS"' in query)
+        self.assertNotIn('"DESCRIPTION"', listing.split(' FROM ')[0])
+
+    def test_date_drilldown_filters_by_range(self):
+        response = self.client.get(self.url, {'created': '2023'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.old])
+        self.assertContains(response, '?created=2023-05')
+        response = self.client.get(self.url, {'created': '2023-05'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.old])
+        response = self.client.get(self.url, {'created': 'nonsense'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+
+    def test_search_matches_text_or_exact_author(self):
+        other = self.make_task(self.make_user('writer'), title='Вёрстка лендинга')
+        response = self.client.get(self.url, {'q': 'writer'})
+        self.assertEqual(list(response.context['cl'].result_list), [other])
+        response = self.client.get(self.url, {'q': 'Старое'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.old])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'q': 'writer'})
+        listing = next(query['sql'] for query in queries if 'ORDER BY' in query['sql'] and 'FROM "tasks"' in query['sql'])
+        # Логин автора разрешается заранее, а не подзапросом внутри OR
+        self.assertEqual(listing.upper().count('SELECT'), 1)
+        self.assertIn(f'"author_id" IN ({other.author_id})', listing)
+
+    @skipUnless(connection.vendor == 'postgresql', 'GIN-индексы есть только на PostgreSQL')
+    def test_search_uses_full_gin_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        admin_site = TaskAdmin(Task, site)
+        for term in ('лендинг', self.admin.username):
+            with self.subTest(term=term):
+                queryset, _ = admin_site.get_search_results(None, Task.objects.all(), term)
+                self.assertIn('tasks_search_vector_gin', queryset.explain())
+
+    def test_unfiltered_count_uses_estimate(self):
+        with mock.patch('core.pagination.estimated_rows', return_value=5_000_000):
+            response = self.client.get(self.url)
+            self.assertEqual(response.context['cl'].result_count, 5_000_000)
+            response = self.client.get(self.url, {'status__exact': Task.STATUS_OPEN})
+            self.assertEqual(response.context['cl'].result_count, 2)
+
+
+class TaskMatchingTests(TaskTestMixin, APITestCase):
+    def setUp(self):
+        matching_engine.reset()
+        self.addCleanup(matching_engine.reset)
+        self.python = Skill.objects.create(name='Python')
+        self.django = Skill.objects.create(name='Django')
+        self.client_user = self.make_user('client')
+        Profile.objects.create(user=self.client_user, available_for_hire=False)
+        self.client.force_authenticate(self.client_user)
+        self.task = self.make_task(self.client_user, skills=['Python', 'Django'], budget='4000.00')
+        TaskSkill.objects.sync([self.task])
+
+    def make_freelancer(self, username, skills, **profile):
+        profile.setdefault('hourly_rate', '50.00')
+        user = self.make_user(username)
+        Profile.objects.create(user=user, **profile).skills.set(skills)
+        return user
+
+    def matched(self):
+        response = self.client.get(reverse('task-matches', args=[self.task.pk]))
+        self.assertEqual(response.status_code, 200)
+        return [item['freelancer']['username'] for item in response.data]
+
+    def test_ranks_by_skill_overlap_rate_and_rating(self):
+        self.make_freelancer('partial', [self.python], rating='5.00')
+        self.make_freelancer('full', [self.python, self.django], rating='4.00')
+        self.make_freelancer('expensive', [self.python, self.django], rating='4.00', hourly_rate='500.00')
+        self.make_freelancer('busy', [self.python, self.django], available_for_hire=False)
+        self.make_freelancer('designer', [])
+        self.assertEqual(self.matched(), ['full', 'expensive', 'partial'])
+
+    def test_profile_changes_are_applied_incrementally(self):
+        freelancer = self.make_freelancer('late', [])
+        self.assertEqual(self.matched(), [])
+        built_at = matching_engine._built_at
+        freelancer.profile.skills.add(self.python)
+        self.assertEqual(self.matched(), ['late'])
+        freelancer.profile.available_for_hire = False
+        freelancer.profile.save()
+        self.assertEqual(self.matched(), [])
+        self.assertEqual(matching_engine._built_at, built_at)
+
+    def test_readers_do_not_wait_for_sync_queries(self):
+        freelancer = self.make_freelancer('dev', [self.python])
+        self.assertEqual(self.matched(), ['dev'])
+        entered, release = threading.Event(), threading.Event()
+
+        def slow_load(user_ids):
+            entered.set()
+            release.wait(10)
+            return [], set(user_ids)
+
+        matching_engine.mark_profiles(freelancer.pk)
+        with mock.patch.object(matching_engine, '_load_profiles', slow_load):
+            syncing = threading.Thread(target=matching_engine.freelancers_for_task, args=(self.task.pk,))
+            syncing.start()
+            self.assertTrue(entered.wait(10))
+            try:
+                # Пока поток обслуживания в БД, ответ строится по текущему индексу
+                started = time.monotonic()
+                self.assertEqual(len(matching_engine.freelancers_for_task(self.task.pk)), 1)
+                self.assertLess(time.monotonic() - started, 1)
+            finally:
+                release.set()
+                syncing.join()
+        self.assertEqual(matching_engine.freelancers_for_task(self.task.pk), [])
+
+    def test_unindexed_profile_is_loaded_outside_the_lock(self):
+        freelancer = self.make_freelancer('busy', [self.python], available_for_hire=False)
+        matching_engine.ensure_fresh()
+        locked_queries = []
+
+        def record(execute, sql, params, many, context):
+            # RLock не сообщает владельца: проверяем, свободна ли блокировка для другого потока
+            free = []
+
+            def probe():
+                if matching_engine._lock.acquire(blocking=False):
+                    matching_engine._lock.release()
+                    free.append(True)
+
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+            if not free:
+                locked_queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            self.assertEqual([task_id for _, task_id in matching_engine.tasks_for_freelancer(freelancer.pk)], [self.task.pk])
+        self.assertEqual(locked_queries, [])
+
+    def test_recommended_tasks_skip_own_and_expired(self):
+        freelancer = self.make_freelancer('dev', [self.python])
+        own = self.make_task(freelancer, skills=['Python'])
+        expired = self.make_task(self.client_user, skills=['Python'], deadline=date.today() - timedelta(days=1))
+        TaskSkill.objects.sync([own, expired])
+        self.client.force_authenticate(freelancer)
+        response = self.client.get(reverse('task-recommended'))
+        self.assertEqual([item['task']['id'] for item in response.data], [self.task.pk])
+
+
+class TaskStreamTests(QueryCountAssertionsMixin, TaskTestMixin, TestCase):
+    def setUp(self):
+        self.user = self.make_user()
+        self.token = str(PrincipalRefreshToken.for_user(self.user).access_token)
+        self.url = reverse('task-stream')
+
+    async def open_stream(self, query='', **headers):
+        response = await self.async_client.get(
+            f'{self.url}?{query}', headers={'Authorization': f'Bearer {self.token}', **headers}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        return stream
+
+    async def test_requires_token(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_query_token_accepts_only_stream_tokens(self):
+        # Полный access-токен в URL осел бы в логах прокси и Referer
+        response = await self.async_client.get(f'{self.url}?token={self.token}')
+        self.assertEqual(response.status_code, 401)
+
+        with self.assertViewQueries('task-stream-token', 1):
+            issued = await self.async_client.post(
+                reverse('task-stream-token'), headers={'Authorization': f'Bearer {self.token}'}
+            )
+        self.assertEqual(issued.status_code, 200)
+        self.assertEqual(issued.json()['expires_in'], StreamToken.lifetime.total_seconds())
+        stream_token = issued.json()['token']
+        response = await self.async_client.get(f'{self.url}?token={stream_token}')
+        self.assertEqual(response.status_code, 200)
+        await response.streaming_content.aclose()
+
+        # Токен потока не годится вместо access-токена
+        response = await self.async_client.get(
+            reverse('task-list'), headers={'Authorization': f'Bearer {stream_token}'}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_stream_token_follows_session_revocation(self):
+        access = PrincipalRefreshToken.for_user(self.user).access_token
+        stream_token = StreamToken.for_user_id(self.user.pk, access)
+        self.assertEqual(stream_token['sid'], access['sid'])
+        revocation_index.add(jti=access['sid'])
+        self.addCleanup(revocation_index.reset)
+        response = await self.async_client.get(f'{self.url}?token={stream_token}')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_expired_stream_token_is_rejected(self):
+        stream_token = StreamToken.for_user_id(self.user.pk)
+        stream_token.set_exp(lifetime=-timedelta(seconds=1))
+        response = await self.async_client.get(f'{self.url}?token={stream_token}')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_streams_new_tasks_filtered_by_skill(self):
+        stream = await self.open_stream('skills=Python')
+        try:
+            get_broker().publish(TaskEvent(101, ['go'], b'{"id":101}'))
+            get_broker().publish(TaskEvent(102, ['python', 'django'], b'{"id":102}'))
+            self.assertEqual(await anext(stream), b'id: 102\nevent: task\ndata: {"id":102}\n\n')
+        finally:
+            await stream.aclose()
+
+    async def test_resume_replays_missed_tasks(self):
+        seen = await self.async_make_task(skills=['Python'])
+        missed = await self.async_make_task(skills=['Python'])
+        with self.assertViewQueries('task-stream', 1):
+            stream = await self.open_stream(**{'Last-Event-ID': str(seen.id)})
+        try:
+            event = await anext(stream)
+            self.assertTrue(event.startswith(f'id: {missed.id}\nevent: task\n'.encode()))
+            # Живое событие для уже дочитанного задания не дублируется
+            get_broker().publish(TaskEvent(missed.id, ['python'], b'{}'))
+            get_broker().publish(TaskEvent(missed.id + 1, ['python'], b'{}'))
+            self.assertTrue((await anext(stream)).startswith(f'id: {missed.id + 1}\n'.encode()))
+        finally:
+            await stream.aclose()
+
+    async def test_too_many_missed_tasks_send_reset(self):
+        for _ in range(3):
+            await self.async_make_task()
+        with self.settings(TASK_STREAM_REPLAY_LIMIT=2):
+            stream = await self.open_stream('since=0')
+            try:
+                self.assertEqual(await anext(stream), b'event: reset\ndata: {}\n\n')
+            finally:
+                await stream.aclose()
+
+    async def test_slow_subscriber_is_disconnected(self):
+        subscription = hub.subscribe(maxsize=1)
+        try:
+            hub.dispatch(TaskEvent(1, [], b'{}'))
+            hub.dispatch(TaskEvent(2, [], b'{}'))
+            await asyncio.sleep(0)
+            self.assertIsNone(await subscription.get())
+        finally:
+            hub.unsubscribe(subscription)
+
+    async def async_make_task(self, **kwargs):
+        return await sync_to_async(self.make_task)(self.user, **kwargs)
+
+
+class AsyncReadURLs:
+    """Те же URL, что в tasks.urls при ASYNC_READ_VIEWS (под core.asgi)."""
+    urlpatterns = [
+        path('api/tasks/', task_list, name='task-list'),
+        path('api/tasks/<int:pk>/', task_detail, name='task-detail'),
+    ]
+
+
+class TaskAsyncReadViewTests(QueryCountAssertionsMixin, TaskTestMixin, TestCase):
+    def setUp(self):
+        self.make_skills('Python', 'Django', 'CSS')
+        self.user = self.make_user()
+        self.headers = {'Authorization': f'Bearer {PrincipalRefreshToken.for_user(self.user).access_token}'}
+        self.tasks = [
+            self.make_task(self.user, title='Бэкенд', skills=['Python', 'Django'], description='z' * 400),
+            self.make_task(self.make_user('other'), title='Скрипт', skills=['Python'], budget='50.00'),
+            self.make_task(self.user, title='Вёрстка', skills=['CSS']),
+        ]
+        TaskSkill.objects.sync(self.tasks)
+
+    async def get_both(self, path):
+        """Ответы TaskViewSet и асинхронного представления на один GET."""
+        expected = await sync_to_async(self.client.get)(path, headers=self.headers)
+        with override_settings(ROOT_URLCONF=AsyncReadURLs):
+            actual = await self.async_client.get(path, headers=self.headers)
+        self.assertEqual(actual.status_code, expected.status_code, path)
+        self.assertEqual(actual.content, expected.content, path)
+        return actual
+
+    async def test_responses_match_viewset(self):
+        task_id = self.tasks[0].id
+        for path in (
+            '/api/tasks/', '/api/tasks/?skills=python,django&match=all',
+            '/api/tasks/?skills=Python&fields=id,title,author&ordering=budget',
+            '/api/tasks/?skills=unknown', '/api/tasks/?skills=python&match=bogus',
+            '/api/tasks/?budget_min=abc', '/api/tasks/?cursor=garbage', '/api/tasks/?q=Скрипт',
+            f'/api/tasks/{task_id}/', f'/api/tasks/{task_id}/?author=other', '/api/tasks/999999/',
+        ):
+            with self.subTest(path=path):
+                await self.get_both(path)
+
+    async def test_cursor_pages_match_viewset(self):
+        url, seen = '/api/tasks/?page_size=1', []
+        while url:
+            page = (await self.get_both(url)).json()
+            seen.extend(item['id'] for item in page['results'])
+            url = page['next']
+        self.assertEqual(seen, [task.id for task in reversed(self.tasks)])
+        previous = (await self.get_both(page['previous'])).json()
+        self.assertEqual([item['id'] for item in previous['results']], [self.tasks[1].id])
+
+    async def test_query_counts_are_pinned(self):
+        with override_settings(ROOT_URLCONF=AsyncReadURLs):
+            with self.assertViewQueries('task-list', 1):
+                await self.async_client.get('/api/tasks/', headers=self.headers)
+            # Сопоставление навыков — отдельный запрос до построения выборки
+            with self.assertViewQueries('task-list', 2):
+                await self.async_client.get('/api/tasks/?skills=python', headers=self.headers)
+            with self.assertViewQueries('task-detail', 1):
+                await self.async_client.get(f'/api/tasks/{self.tasks[0].id}/', headers=self.headers)
+
+    async def test_writes_go_to_viewset(self):
+        with override_settings(ROOT_URLCONF=AsyncReadURLs):
+            response = await self.async_client.post('/api/tasks/', {
+                'title': 'Новое', 'description': 'Описание', 'budget': '10.00',
+                'deadline': (date.today() + timedelta(days=3)).isoformat(), 'skills': ['Go'],
+            }, content_type='application/json', headers=self.headers)
+            self.assertEqual(response.status_code, 201)
+            with self.assertViewQueries('task-detail', 4):
+                response = await self.async_client.delete(f'/api/tasks/{response.json()["id"]}/', headers=self.headers)
+        self.assertEqual(response.status_code, 204)
+
+
+class TaskExportTests(TaskTestMixin, TestCase):
+    def setUp(self):
+        self.admin = self.make_user('analyst')
+        User.objects.filter(pk=self.admin.pk).update(is_staff=True)
+        self.headers = {'Authorization': f'Bearer {PrincipalRefreshToken.for_user(self.admin).access_token}'}
+        self.tasks = [
+            self.make_task(self.admin, title='Первое', skills=['Python']),
+            self.make_task(self.admin, title='Закрытое', status=Task.STATUS_COMPLETED),
+            self.make_task(self.admin, title='Третье, "с кавычками"', budget='12.50'),
+        ]
+        self.url = reverse('task-export')
+
+    def export(self, query='', **headers):
+        response = self.client.get(f'{self.url}?{query}', headers={**self.headers, **headers})
+        self.assertTrue(response.streaming, response.status_code)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_includes_all_statuses_in_update_order(self):
+        Task.objects.filter(pk=self.tasks[0].pk).update(updated_at=timezone.now() + timedelta(minutes=1))
+        response, content = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [task.id for task in self.tasks[1:] + self.tasks[:1]])
+        self.assertEqual(rows[-1]['skills'], ['Python'])
+        self.assertEqual(rows[0]['status'], Task.STATUS_COMPLETED)
+        self.assertEqual(rows[1]['budget'], '12.50')
+        self.assertEqual(rows[1]['author'], 'analyst')
+
+    def test_csv_and_updated_since(self):
+        Task.objects.filter(pk=self.tasks[2].pk).update(updated_at=timezone.now() + timedelta(days=1))
+        since = (timezone.now() + timedelta(hours=1)).isoformat()
+        response, content = self.export(urlencode({'output': 'csv', 'updated_since': since}), Accept='text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="tasks.csv"')
+        header, *rows = list(csv.reader(StringIO(content)))
+        self.assertEqual(header[:3], ['id', 'title', 'description'])
+        self.assertEqual([row[:2] for row in rows], [[str(self.tasks[2].id), 'Третье, "с кавычками"']])
+
+        for query in ('updated_since=yesterday', 'output=xml'):
+            response = self.client.get(f'{self.url}?{query}', headers=self.headers)
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_requires_staff(self):
+        token = PrincipalRefreshToken.for_user(self.make_user('viewer')).access_token
+        response = self.client.get(self.url, headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 403)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        response = await self.async_client.get(self.url, headers=self.headers)
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.splitlines()), len(self.tasks))
+
+    def test_memory_does_not_grow_with_table_size(self):
+        def peak(count):
+            Task.objects.bulk_create([
+                Task(author=self.admin, title=f'T{i}', description='x' * 200, budget='1.00', deadline=date.today())
+                for i in range(count - Task.objects.count())
+            ])
+            tracemalloc.start()
+            try:
+                for _ in task_export.stream('ndjson', chunk_size=100):
+                    pass
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        small, large = peak(500), peak(5000)
+        # Десятикратно больше строк — тот же пик: в памяти только одна пачка
+        self.assertLess(large, small * 1.5)
+
+    def test_command_writes_same_stream(self):
+        out = StringIO()
+        call_command('export_data', 'tasks', '--format', 'csv', '--chunk-size', '2', stdout=out)
+        self.assertEqual(len(list(csv.reader(StringIO(out.getvalue())))), len(self.tasks) + 1)
+
+
+class BenchPercentileTests(SimpleTestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 11))
+        self.assertEqual(percentile(values, 0.5), 5)
+        self.assertEqual(percentile(values, 0.95), 10)
+        self.assertEqual(percentile(list(range(1, 101)), 0.95), 95)
+        self.assertEqual(percentile(list(range(1, 101)), 0.99), 99)
+        self.assertEqual(percentile([7], 0.5), 7)
+        self.assertEqual(percentile(values, 0), 1)
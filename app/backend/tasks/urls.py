@@ -1,10 +1,20 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .async_views import task_detail, task_list, task_stream
 from .views import TaskViewSet
 
 router = DefaultRouter()
 router.register(r'tasks', TaskViewSet, basename='task')
 
 urlpatterns = [
-    path('', include(router.urls)),
-]
\ No newline at end of file
+    # До маршрутов роутера, иначе 'stream' совпадёт с tasks/{pk}/
+    path('tasks/stream/', task_stream, name='task-stream'),
+]
+if settings.ASYNC_READ_VIEWS:
+    # Под core.asgi GET ленты и задания асинхронные, остальные методы — у ViewSet
+    urlpatterns += [
+        path('tasks/', task_list, name='task-list'),
+        path('tasks/<int:pk>/', task_detail, name='task-detail'),
+    ]
+urlpatterns.append(path('', include(router.urls)))
\ No newline at end of file
@@ -1,14 +1,205 @@
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
-from .models import Task
-from .serializers import TaskSerializer
+from django.db.models import Prefetch
+from django.db.models.functions import Substr
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from core.export import ExportNegotiation
+from core.pagination import KeysetPagination
+from users.models import Profile, Skill
+from users.serializers import FreelancerSerializer
+from users.tokens import StreamToken
+from .bulk import archive_tasks, bulk_create_tasks, bulk_update_tasks
+from .export import task_export
+from .filters import (
+    SearchFilterBackend, SkillFilterBackend, TaskFilterBackend,
+    get_task_ordering, ranked_search_available, task_facets
+)
+from .matching import matching_engine
+from .models import Task, TaskSkill
+from .serializers import TaskArchiveSerializer, TaskBulkSerializer, TaskSerializer, TaskListSerializer
+from .stream import publish_tasks
+
+# Колонки, которые нужны каждому полю компактного представления ленты.
+LIST_FIELD_COLUMNS = {
+    'id': ('id',),
+    'title': ('title',),
+    'description': (),
+    'budget': ('budget',),
+    'deadline': ('deadline',),
+    'skills': ('skills',),
+    'created_at': ('created_at',),
+    'author': ('author__username', 'author__avatar'),
+}
+
+MATCH_LIMIT = 10
+MAX_MATCH_LIMIT = 50
+
+
+def get_match_limit(request):
+    try:
+        limit = int(request.query_params.get('limit', MATCH_LIMIT))
+    except ValueError:
+        return MATCH_LIMIT
+    return min(max(limit, 1), MAX_MATCH_LIMIT)
+
 
 class TaskViewSet(viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_backends = [TaskFilterBackend, SkillFilterBackend, SearchFilterBackend]
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
-        return Task.objects.select_related('author').all()
+        if self.action == 'facets':
+            return Task.objects.open()
+        if self.action != 'list':
+            return Task.objects.select_related('author').defer('search_vector')
+
+        fields = self.get_list_fields()
+        queryset = Task.objects.open()
+        if 'author' in fields:
+            queryset = queryset.select_related('author')
+        columns = {'id', 'created_at'}
+        for name in fields:
+            columns.update(LIST_FIELD_COLUMNS[name])
+        queryset = queryset.only(*columns)
+        if 'description' in fields:
+            queryset = queryset.annotate(
+                description_excerpt=Substr('description', 1, TaskListSerializer.EXCERPT_LENGTH + 1)
+            )
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        Лента строится из строк values() быстрым режимом
+        TaskListSerializer.rows: без экземпляров моделей и обхода полей DRF.
+        """
+        fields = self.get_list_fields()
+        page = self.paginate_queryset(self.get_list_rows(fields))
+        return self.get_paginated_response(TaskListSerializer.rows(fields).to_representation(page))
+
+    def get_list_rows(self, fields):
+        """Отфильтрованная лента строками values(): колонки полей fields и ключа сортировки."""
+        columns = {'id', 'created_at'}
+        columns.update(item.lstrip('-') for item in self.get_keyset_ordering())
+        for name in fields:
+            columns.update(LIST_FIELD_COLUMNS[name])
+        if 'description' in fields:
+            columns.add('description_excerpt')
+        return self.filter_queryset(self.get_queryset()).values(*columns)
+
+    def get_keyset_ordering(self):
+        ordering = get_task_ordering(self.request)
+        if ordering:
+            return ordering
+        if self.request.query_params.get('q', '').strip() and ranked_search_available():
+            return ('-rank',) + self.keyset_ordering
+        return self.keyset_ordering
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return TaskListSerializer
+        return TaskSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'list':
+            kwargs.setdefault('fields', self.get_list_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_list_fields(self):
+        """Поля из ?fields=, неизвестные имена игнорируются."""
+        requested = self.request.query_params.get('fields')
+        if not requested:
+            return tuple(LIST_FIELD_COLUMNS)
+        fields = tuple(name for name in requested.split(',') if name in LIST_FIELD_COLUMNS)
+        return fields or tuple(LIST_FIELD_COLUMNS)
+
+    @action(detail=False)
+    def facets(self, request):
+        """Счётчики по корзинам бюджета и срока для текущих фильтров."""
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(task_facets(queryset))
+
+    @action(detail=False, permission_classes=[IsAdminUser], content_negotiation_class=ExportNegotiation)
+    def export(self, request):
+        """
+        Все задания, включая закрытые, потоком NDJSON или CSV
+        (?output=ndjson|csv, ?updated_since=) — см. core.export.
+        """
+        return task_export.response(request)
+
+    @action(detail=True)
+    def matches(self, request, pk=None):
+        """Лучшие доступные исполнители для задания (tasks.matching)."""
+        task = self.get_object()
+        scored = matching_engine.freelancers_for_task(task.pk, get_match_limit(request))
+        profiles = (
+            Profile.objects.select_related('user')
+            .prefetch_related(Prefetch('skills', queryset=Skill.objects.only('id', 'name')))
+            .in_bulk([user_id for _, user_id in scored], field_name='user_id')
+        )
+        return Response([
+            {'score': round(score, 4), 'freelancer': FreelancerSerializer(profiles[user_id]).data}
+            for score, user_id in scored if user_id in profiles
+        ])
+
+    @action(detail=False)
+    def recommended(self, request):
+        """Открытые задания, лучше всего подходящие текущему пользователю."""
+        scored = matching_engine.tasks_for_freelancer(request.user.pk, get_match_limit(request))
+        tasks = Task.objects.select_related('author').defer('search_vector').in_bulk(
+            [task_id for _, task_id in scored]
+        )
+        return Response([
+            {'score': round(score, 4), 'task': TaskSerializer(tasks[task_id]).data}
+            for score, task_id in scored if task_id in tasks
+        ])
+
+    @action(detail=False, methods=['post'], url_path='stream/token', url_name='stream-token')
+    def stream_token(self, request):
+        """Короткоживущий токен для ?token= потока заданий (tasks.async_views)."""
+        token = StreamToken.for_user_id(request.user.pk, request.auth)
+        return Response({'token': str(token), 'expires_in': int(StreamToken.lifetime.total_seconds())})
+
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk')
+    def bulk(self, request):
+        """
+        POST — создать до TASK_BULK_MAX_ITEMS заданий, PATCH — частично
+        обновить свои задания ({"id": ..., поля}). Всё или ничего: при ошибке
+        в любом элементе ответ 400 с ошибками по индексам.
+        """
+        payload = TaskBulkSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        items = payload.validated_data['tasks']
+        if request.method == 'POST':
+            tasks, errors = bulk_create_tasks(request.user, items)
+        else:
+            tasks, errors = bulk_update_tasks(request.user, items)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            TaskSerializer(tasks, many=True).data,
+            status=status.HTTP_201_CREATED if request.method == 'POST' else status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['post'], url_path='bulk/archive', url_name='bulk-archive')
+    def bulk_archive(self, request):
+        """Переводит свои задания в архив: они пропадают из ленты, но не удаляются."""
+        payload = TaskArchiveSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        archived, errors = archive_tasks(request.user, payload.validated_data['ids'])
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'archived': archived})
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
\ No newline at end of file
+        task = serializer.save(author=self.request.user)
+        TaskSkill.objects.sync([task])
+        publish_tasks([task])
+
+    def perform_update(self, serializer):
+        task = serializer.save()
+        if 'skills' in serializer.validated_data:
+            TaskSkill.objects.sync([task])
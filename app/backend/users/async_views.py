@@ -0,0 +1,248 @@
+"""
+Асинхронные представления для core.asgi.
+
+Вход и регистрация: хэширование пароля уходит в пул процессов
+users.hashing, поэтому всплеск входов не занимает потоки сервера.
+
+Чтение (ASYNC_READ_VIEWS): GET профиля, публичного профиля и справочника
+навыков через асинхронный ORM и кэш, без потока на весь запрос; остальные
+методы тех же URL обслуживают прежние DRF-views. Ответы совпадают с ними.
+"""
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.signals import user_login_failed
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from . import views
+from .authentication import PrincipalJWTAuthentication
+from .cache import aget_public_profile, aget_skill_catalogue, aset_public_profile
+from .hashing import (
+    PoolSaturated, check_password_job, hashing_pool, make_password_job, trusted_clients
+)
+from .models import User
+from .serializers import LoginSerializer, RegisterSerializer, UserSerializer
+from .tokens import PrincipalRefreshToken
+
+authenticator = PrincipalJWTAuthentication()
+
+
+def json_response(data, status_code=status.HTTP_200_OK, headers=None):
+    return HttpResponse(
+        JSONRenderer().render(data), status=status_code,
+        content_type='application/json', headers=headers
+    )
+
+
+def parse_body(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+    return request.POST
+
+
+def saturated_response(exc):
+    return json_response(
+        {"message": "Слишком много запросов, повторите позже"},
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={'Retry-After': str(exc.retry_after)}
+    )
+
+
+def client_ip(request):
+    """
+    IP клиента: REMOTE_ADDR, а за доверенным прокси (TRUSTED_PROXIES) —
+    ближайший к нам адрес из TRUSTED_PROXY_HEADER, не принадлежащий прокси.
+    Пустая строка — адрес неизвестен.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    if remote_addr not in settings.TRUSTED_PROXIES:
+        return remote_addr
+    # Левые адреса цепочки клиент может подделать, поэтому идём справа
+    chain = [ip.strip() for ip in request.headers.get(settings.TRUSTED_PROXY_HEADER, '').split(',')]
+    for ip in reversed(chain):
+        if ip and ip not in settings.TRUSTED_PROXIES:
+            return ip
+    return ''
+
+
+def client_key(request, username):
+    """
+    Ключ доверия пула хэширования — аккаунт вместе с IP: вход с одного
+    аккаунта не делает доверенным ни адрес для чужих аккаунтов, ни аккаунт
+    для чужих адресов.
+    """
+    ip = client_ip(request)
+    return f'{username}@{ip}' if ip else None
+
+
+def method_not_allowed(request):
+    return json_response(
+        {'detail': f'Метод "{request.method}" не разрешен.'},
+        status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
+        headers={'Allow': 'POST, OPTIONS'}
+    )
+
+
+@csrf_exempt
+async def login_user(request):
+    if request.method != 'POST':
+        return method_not_allowed(request)
+    data = parse_body(request)
+    if data is None:
+        return json_response({'detail': 'JSON parse error'}, status_code=status.HTTP_400_BAD_REQUEST)
+    serializer = LoginSerializer(data=data)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status_code=status.HTTP_400_BAD_REQUEST)
+
+    username = serializer.validated_data['username']
+    password = serializer.validated_data['password']
+    key = client_key(request, username)
+    trusted = trusted_clients.is_trusted(key)
+
+    try:
+        user = await User.objects.aget(username=username)
+    except User.DoesNotExist:
+        user = None
+
+    try:
+        if user is None or not user.is_active:
+            # Как и ModelBackend, считаем хэш впустую, чтобы время ответа
+            # не выдавало существование аккаунта.
+            await hashing_pool.run('make', make_password_job, password, trusted=trusted)
+            valid = False
+        else:
+            valid, must_update = await hashing_pool.run(
+                'check', check_password_job, password, user.password, trusted=trusted
+            )
+            if valid and must_update:
+                user.password = await hashing_pool.run('make', make_password_job, password, trusted=True)
+                await user.asave(update_fields=['password'])
+    except PoolSaturated as exc:
+        return saturated_response(exc)
+
+    if not valid:
+        await sync_to_async(user_login_failed.send)(
+            sender=__name__, credentials={'username': username}, request=request
+        )
+        return json_response({
+            "message": "Неверные учетные данные"
+        }, status_code=status.HTTP_401_UNAUTHORIZED)
+
+    trusted_clients.remember(key)
+    refresh = PrincipalRefreshToken.for_user(user)
+    user_data = await sync_to_async(
+        lambda: UserSerializer(user, context={'request': request}).data
+    )()
+    return json_response({
+        'token': str(refresh.access_token),
+        'user': user_data
+    })
+
+
+@csrf_exempt
+async def register_user(request):
+    if request.method != 'POST':
+        return method_not_allowed(request)
+    data = parse_body(request)
+    if data is None:
+        return json_response({'detail': 'JSON parse error'}, status_code=status.HTTP_400_BAD_REQUEST)
+    serializer = RegisterSerializer(data=data)
+    # Проверка уникальности и валидаторы пароля обращаются к БД
+    if not await sync_to_async(serializer.is_valid)():
+        return json_response(serializer.errors, status_code=status.HTTP_400_BAD_REQUEST)
+
+    key = client_key(request, serializer.validated_data['username'])
+    try:
+        password_hash = await hashing_pool.run(
+            'make', make_password_job, serializer.validated_data['password'],
+            trusted=trusted_clients.is_trusted(key)
+        )
+    except PoolSaturated as exc:
+        return saturated_response(exc)
+
+    user = await sync_to_async(serializer.save)(password_hash=password_hash)
+    trusted_clients.remember(key)
+    return json_response({
+        "message": "Регистрация успешна",
+        "user": await sync_to_async(lambda: UserSerializer(user).data)()
+    }, status_code=status.HTTP_201_CREATED)
+
+
+def error_response(exc):
+    """Ответ на исключение в том же виде, что у DRF-views (обработчик EXCEPTION_HANDLER)."""
+    if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+        exc.auth_header = authenticator.authenticate_header(None)
+    response = api_settings.EXCEPTION_HANDLER(exc, {})
+    if response is None:
+        raise exc
+    headers = {name: response[name] for name in ('WWW-Authenticate', 'Retry-After') if response.has_header(name)}
+    return json_response(response.data, status_code=response.status_code, headers=headers)
+
+
+def async_read_view(sync_view):
+    """
+    Асинхронный GET/HEAD для URL представления sync_view, которому уходят
+    остальные методы. Доступ — как IsAuthenticated; в request.user —
+    пользователь из кэша процесса или UserPrincipal (без БД).
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+            try:
+                authenticated = await authenticator.aauthenticate(request)
+                if authenticated is None:
+                    raise NotAuthenticated()
+                request.user, request.auth = authenticated
+                return await handler(request, *args, **kwargs)
+            except (APIException, Http404) as exc:
+                return error_response(exc)
+        # CSRF, как и у DRF-views, проверяет сама аутентификация
+        return csrf_exempt(view)
+    return decorator
+
+
+def profile_queryset():
+    return User.objects.select_related('profile').prefetch_related('profile__skills')
+
+
+@async_read_view(views.profile_view)
+async def profile(request):
+    try:
+        user = await profile_queryset().aget(pk=request.user.pk)
+    except User.DoesNotExist:
+        raise AuthenticationFailed('Пользователь не найден', code='user_not_found')
+    if not user.is_active:
+        raise AuthenticationFailed('Пользователь неактивен', code='user_inactive')
+    return json_response(UserSerializer(user, context={'request': request}).data)
+
+
+@async_read_view(views.public_profile_view)
+async def public_profile(request, username):
+    entry = await aget_public_profile(username)
+    if entry is None:
+        try:
+            user = await profile_queryset().aget(username=username)
+        except User.DoesNotExist:
+            raise Http404('No User matches the given query.')
+        entry = await aset_public_profile(username, UserSerializer(user).data)
+    status_code, data, headers = views.public_profile_payload(request, entry)
+    return json_response(data, status_code=status_code, headers=headers)
+
+
+@async_read_view(views.get_skills)
+async def skills(request):
+    catalogue = await aget_skill_catalogue(views.load_skill_catalogue)
+    status_code, data, headers = views.skill_catalogue_payload(request, catalogue)
+    return json_response(data, status_code=status_code, headers=headers)
@@ -0,0 +1,209 @@
+import copy
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .revocation import revocation_index
+
+User = get_user_model()
+
+# Claims, которые кладутся в токен (см. users.tokens) и доступны без БД.
+PRINCIPAL_CLAIMS = ('username', 'avatar')
+
+_INACTIVE = object()
+_EXPIRED = object()
+
+
+class UserCache:
+    """
+    Короткоживущий кэш строк User в памяти процесса.
+
+    Отдаёт копии, чтобы запросы не делили один экземпляр модели. Записи
+    сбрасываются сигналом при сохранении пользователя (users.signals);
+    истёкшая запись возвращается как _EXPIRED, и PrincipalJWTAuthentication
+    перечитывает строку из БД, поэтому другие процессы увидят изменение не
+    позже, чем через ttl секунд.
+    """
+
+    def __init__(self, ttl, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            return _EXPIRED
+        return user if user is _INACTIVE else copy.copy(user)
+
+    def set(self, user):
+        self._store(user.pk, copy.copy(user) if user.is_active else _INACTIVE)
+
+    def mark_inactive(self, user_id):
+        self._store(user_id, _INACTIVE)
+
+    def _store(self, user_id, value):
+        with self._lock:
+            if user_id not in self._entries and len(self._entries) >= self.max_size:
+                self._entries.pop(next(iter(self._entries)), None)
+            self._entries[user_id] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(ttl=settings.JWT_USER_CACHE_TTL)
+
+
+def load_user(user_id, fresh=False):
+    """
+    User по id: сначала из кэша процесса, затем из БД. fresh=True — всегда
+    из БД (изменяющие запросы); прочитанная строка обновляет кэш.
+    """
+    user = None if fresh else user_cache.get(user_id)
+    if user is _EXPIRED:
+        user = None
+    if user is _INACTIVE:
+        raise AuthenticationFailed('Пользователь неактивен', code='user_inactive')
+    if user is not None:
+        return user
+    try:
+        user = User.objects.get(pk=user_id)
+    except User.DoesNotExist:
+        raise AuthenticationFailed('Пользователь не найден', code='user_not_found')
+    user_cache.set(user)
+    if not user.is_active:
+        raise AuthenticationFailed('Пользователь неактивен', code='user_inactive')
+    return user
+
+
+class UserPrincipal:
+    """
+    Пользователь, собранный из claims токена без обращения к БД.
+
+    Атрибуты, которых нет в токене (email, profile, ...), берутся из строки
+    User, которая загружается при первом обращении через load_user.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token):
+        self.pk = self.id = token[api_settings.USER_ID_CLAIM]
+        for claim in PRINCIPAL_CLAIMS:
+            if claim in token:
+                # Аватар хранится как URL, чтобы не затенять поле User.avatar
+                setattr(self, 'avatar_url' if claim == 'avatar' else claim, token[claim])
+
+    @cached_property
+    def user(self):
+        return load_user(self.pk)
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name == 'user':
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __eq__(self, other):
+        return getattr(other, 'pk', None) == self.pk and isinstance(other, (UserPrincipal, User))
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return self.username
+
+
+class PrincipalJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация без запроса к БД на горячем пути.
+
+    Для безопасных методов (GET, HEAD, OPTIONS) request.user — это
+    пользователь из кэша процесса, если он там есть, иначе UserPrincipal из
+    claims токена; истёкшая запись кэша перечитывается из БД, чтобы заново
+    проверить is_active. Деактивация отзывает все токены пользователя
+    (users.signals), и индекс отзывов отсекает их во всех процессах, не
+    дожидаясь ttl кэша. Изменяющие запросы получают свежую строку User из БД:
+    кэш процесса мог не увидеть деактивацию или смену логина в другом
+    процессе, а запись от имени устаревшего пользователя недопустима.
+    Отозванные токены
+    отсекаются по индексу процесса (users.revocation), тоже без БД.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revocation_index.is_revoked(validated_token):
+            raise InvalidToken('Токен отозван')
+        return validated_token
+
+    def authenticate(self, request):
+        raw_token = self.get_request_token(request)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        user_id = self.get_token_user_id(validated_token)
+        if request.method not in SAFE_METHODS:
+            return load_user(user_id, fresh=True), validated_token
+        return self.get_principal(validated_token), validated_token
+
+    async def aauthenticate(self, request):
+        """
+        authenticate для асинхронных представлений (только безопасные методы):
+        отзыв проверяется через revocation_index.ais_revoked, а пользователь —
+        кэш процесса или UserPrincipal, поэтому цикл событий не ждёт БД.
+        Только истёкшая запись кэша перечитывается из БД через sync_to_async.
+        """
+        raw_token = self.get_request_token(request)
+        if raw_token is None:
+            return None
+        validated_token = super().get_validated_token(raw_token)
+        if await revocation_index.ais_revoked(validated_token):
+            raise InvalidToken('Токен отозван')
+        user_id = self.get_token_user_id(validated_token)
+        if user_cache.get(user_id) is _EXPIRED:
+            return await sync_to_async(load_user)(user_id, fresh=True), validated_token
+        return self.get_principal(validated_token), validated_token
+
+    def get_request_token(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        return self.get_raw_token(header)
+
+    def get_token_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Токен не содержит идентификатор пользователя')
+
+    def get_principal(self, validated_token):
+        """
+        Пользователь для безопасных методов: из кэша процесса или из claims;
+        по истёкшей записи кэша — из БД с проверкой is_active.
+        """
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        cached = user_cache.get(user_id)
+        if cached is _EXPIRED:
+            return load_user(user_id, fresh=True)
+        if cached is _INACTIVE:
+            raise AuthenticationFailed('Пользователь неактивен', code='user_inactive')
+        if cached is not None:
+            return cached
+        return UserPrincipal(validated_token)
@@ -0,0 +1,182 @@
+"""
+Обработка аватаров.
+
+Загрузка потоково пишется во временный файл с подсчётом SHA-256, затем
+фоновый воркер декодирует изображение и сохраняет квадратные варианты
+AVATAR_SIZES в WebP и JPEG под именами avatars/<sha256>/<size>.<ext>.
+Имя зависит только от содержимого, поэтому файлы можно кэшировать навсегда,
+а одинаковые загрузки не дублируются. В User.avatar хранится самый крупный
+JPEG-вариант; остальные URL выводятся из него (avatar_url).
+
+Пока воркер не закончил, URL вариантов отдают 404, а после — ответ с
+immutable-кэшированием, поэтому загрузка возвращает не URL, а адрес
+опроса (avatar-status): статус задачи лежит в общем кэше Django под
+avatar-status:<user_id>:<digest>, URL выдаётся только в статусе ready.
+"""
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+AVATAR_SIZES = (48, 128, 512)
+AVATAR_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+ALLOWED_SOURCE_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+# Вариант для карточек ленты: достаточно для 48–64 px на экранах с 2x плотностью
+FEED_AVATAR_SIZE = 128
+
+VARIANT_NAME = re.compile(r'^avatars/(?P<digest>[0-9a-f]{64})/(?P<size>\d+)\.(?P<ext>webp|jpg)$')
+
+AVATAR_PENDING, AVATAR_READY, AVATAR_FAILED = 'pending', 'ready', 'failed'
+AVATAR_STATUS_KEY = 'avatar-status:{user_id}:{digest}'
+
+_executor = ThreadPoolExecutor(max_workers=settings.AVATAR_WORKERS, thread_name_prefix='avatar')
+
+
+class AvatarError(Exception):
+    pass
+
+
+def variant_name(digest, size, ext='jpg'):
+    return f'avatars/{digest}/{size}.{ext}'
+
+
+def set_avatar_status(user_id, digest, status):
+    cache.set(AVATAR_STATUS_KEY.format(user_id=user_id, digest=digest), status, settings.AVATAR_STATUS_TIMEOUT)
+
+
+def get_avatar_status(user_id, digest):
+    """pending, ready, failed или None — задача неизвестна или статус истёк."""
+    return cache.get(AVATAR_STATUS_KEY.format(user_id=user_id, digest=digest))
+
+
+def avatar_url(avatar, size=None, ext='jpg'):
+    """URL нужного варианта; для старых аватаров без вариантов — исходный файл."""
+    if not avatar:
+        return None
+    match = VARIANT_NAME.match(avatar.name)
+    if match is None or size is None:
+        return avatar.url
+    return default_storage.url(variant_name(match['digest'], size, ext))
+
+
+def avatar_url_builder(size=None, ext='jpg'):
+    """
+    То же, что avatar_url, но для имён файлов из values(): префикс хранилища
+    вычисляется один раз, а не вызовом storage.url() на каждую строку.
+    Хранилища, у которых URL не сводится к префиксу (подписанные ссылки),
+    по-прежнему обслуживает storage.url().
+    """
+    probe = variant_name('0' * 64, size or max(AVATAR_SIZES), ext)
+    probe_url = default_storage.url(probe)
+    prefix = probe_url[:-len(probe)] if probe_url.endswith(probe) else None
+
+    def build(name):
+        if not name:
+            return None
+        match = VARIANT_NAME.match(name)
+        if match is None or size is None:
+            return default_storage.url(name)
+        variant = variant_name(match['digest'], size, ext)
+        if prefix is None:
+            return default_storage.url(variant)
+        return prefix + variant
+    return build
+
+
+def stage_upload(uploaded_file):
+    """
+    Копирует загрузку во временный файл по частям, считая SHA-256 и проверяя
+    размер, формат и число пикселей. Возвращает (путь, digest); файл удаляет
+    process_avatar.
+    """
+    if uploaded_file.size and uploaded_file.size > settings.AVATAR_MAX_UPLOAD_SIZE:
+        raise AvatarError('Файл слишком большой')
+    digest = hashlib.sha256()
+    written = 0
+    handle = tempfile.NamedTemporaryFile(prefix='avatar-', suffix='.upload', delete=False)
+    try:
+        with handle:
+            for chunk in uploaded_file.chunks():
+                written += len(chunk)
+                if written > settings.AVATAR_MAX_UPLOAD_SIZE:
+                    raise AvatarError('Файл слишком большой')
+                digest.update(chunk)
+                handle.write(chunk)
+        try:
+            with Image.open(handle.name) as image:
+                if image.format not in ALLOWED_SOURCE_FORMATS:
+                    raise AvatarError('Неподдерживаемый формат изображения')
+                # verify() не декодирует пиксели — размер проверяем до постановки в очередь
+                if image.width * image.height > settings.AVATAR_MAX_PIXELS:
+                    raise AvatarError('Слишком большое разрешение изображения')
+                image.verify()
+        except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError):
+            raise AvatarError('Файл не является изображением')
+    except AvatarError:
+        os.unlink(handle.name)
+        raise
+    return handle.name, digest.hexdigest()
+
+
+def render_variants(path, digest):
+    """Сохраняет отсутствующие варианты в хранилище; возвращает имя основного."""
+    with Image.open(path) as source:
+        image = ImageOps.exif_transpose(source)
+        image = ImageOps.fit(image.convert('RGB'), (max(AVATAR_SIZES),) * 2, Image.Resampling.LANCZOS)
+    for size in AVATAR_SIZES:
+        resized = image if size == image.width else image.resize((size, size), Image.Resampling.LANCZOS)
+        for ext, fmt in AVATAR_FORMATS.items():
+            name = variant_name(digest, size, ext)
+            if default_storage.exists(name):
+                continue
+            buffer = io.BytesIO()
+            resized.save(buffer, fmt, quality=85, optimize=True)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+    return variant_name(digest, max(AVATAR_SIZES))
+
+
+def process_avatar(user_id, path, digest):
+    from .models import User
+
+    try:
+        name = render_variants(path, digest)
+        user = User.objects.get(pk=user_id)
+        user.avatar.name = name
+        # save(), а не update(): сигналы сбрасывают кэши профиля и аутентификации
+        user.save(update_fields=['avatar'])
+    except Exception:
+        logger.exception('Не удалось обработать аватар пользователя %s', user_id)
+        set_avatar_status(user_id, digest, AVATAR_FAILED)
+    else:
+        set_avatar_status(user_id, digest, AVATAR_READY)
+    finally:
+        os.unlink(path)
+
+
+def submit_avatar(user_id, path, digest):
+    """Ставит обработку в фоновый пул или выполняет сразу (AVATAR_PROCESSING='inline')."""
+    set_avatar_status(user_id, digest, AVATAR_PENDING)
+    if settings.AVATAR_PROCESSING == 'inline':
+        process_avatar(user_id, path, digest)
+        return
+    _executor.submit(_run_in_worker, user_id, path, digest)
+
+
+def _run_in_worker(user_id, path, digest):
+    close_old_connections()
+    try:
+        process_avatar(user_id, path, digest)
+    finally:
+        close_old_connections()
@@ -0,0 +1,136 @@
+import bisect
+import hashlib
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+PUBLIC_PROFILE_KEY = 'public-profile:{username}'
+SKILL_CATALOGUE_VERSION_KEY = 'skill-catalogue:version'
+SKILL_CATALOGUE_KEY = 'skill-catalogue:{version}'
+
+
+def _key(username):
+    return PUBLIC_PROFILE_KEY.format(username=username)
+
+
+def make_etag(data):
+    """Сильный валидатор по содержимому представления."""
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, ensure_ascii=False)
+    return '"%s"' % hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    candidates = {value.strip() for value in header.split(',')}
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+
+def get_public_profile(username):
+    """Закэшированное представление профиля: {'etag': ..., 'data': ...} или None."""
+    return cache.get(_key(username))
+
+
+def set_public_profile(username, data):
+    entry = {'etag': make_etag(data), 'data': data}
+    cache.set(_key(username), entry, settings.PUBLIC_PROFILE_CACHE_TIMEOUT)
+    return entry
+
+
+async def aget_public_profile(username):
+    return await cache.aget(_key(username))
+
+
+async def aset_public_profile(username, data):
+    entry = {'etag': make_etag(data), 'data': data}
+    await cache.aset(_key(username), entry, settings.PUBLIC_PROFILE_CACHE_TIMEOUT)
+    return entry
+
+
+def invalidate_public_profiles(*usernames):
+    keys = [_key(username) for username in set(usernames) if username]
+    if keys:
+        cache.delete_many(keys)
+
+
+class SkillCatalogue:
+    """
+    Снимок справочника навыков одной версии: список, отсортированный по
+    названию без учёта регистра, и ключи для поиска по префиксу бисекцией.
+    """
+
+    def __init__(self, version, items, modified):
+        self.version = version
+        self.items = items
+        self.modified = modified
+        self.keys = [item['name'].lower() for item in items]
+        self.etag = f'"skills-{version}"'
+
+    def prefixed(self, prefix, limit):
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_left(self.keys, prefix + '\U0010ffff', lo=start)
+        return self.items[start:min(end, start + limit)]
+
+
+_local_catalogue = None
+_local_lock = threading.Lock()
+
+
+def skill_catalogue_version():
+    version = cache.get(SKILL_CATALOGUE_VERSION_KEY)
+    if version is None:
+        # Начинаем с метки времени, а не с 1: после вытеснения ключа версия
+        # не должна совпасть со старой и поднять из кэша устаревший снимок.
+        cache.add(SKILL_CATALOGUE_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(SKILL_CATALOGUE_VERSION_KEY)
+    return version
+
+
+def bump_skill_catalogue():
+    try:
+        cache.incr(SKILL_CATALOGUE_VERSION_KEY)
+    except ValueError:
+        cache.add(SKILL_CATALOGUE_VERSION_KEY, time.time_ns(), None)
+
+
+def get_skill_catalogue(load):
+    """
+    Справочник текущей версии: из памяти процесса, затем из общего кэша,
+    затем из БД через load() -> список {'id', 'name'}.
+    """
+    global _local_catalogue
+    version = skill_catalogue_version()
+    catalogue = _local_catalogue
+    if catalogue is not None and catalogue.version == version:
+        return catalogue
+    with _local_lock:
+        catalogue = _local_catalogue
+        if catalogue is not None and catalogue.version == version:
+            return catalogue
+        key = SKILL_CATALOGUE_KEY.format(version=version)
+        stored = cache.get(key)
+        if stored is None:
+            items = sorted(load(), key=lambda item: (item['name'].lower(), item['id']))
+            stored = {'items': items, 'modified': int(time.time())}
+            cache.set(key, stored, settings.SKILL_CATALOGUE_CACHE_TIMEOUT)
+        catalogue = _local_catalogue = SkillCatalogue(version, stored['items'], stored['modified'])
+    return catalogue
+
+
+async def aget_skill_catalogue(load):
+    """
+    get_skill_catalogue для асинхронных представлений: снимок текущей версии
+    из памяти процесса отдаётся без потока, остальное — через sync_to_async.
+    """
+    version = await cache.aget(SKILL_CATALOGUE_VERSION_KEY)
+    catalogue = _local_catalogue
+    if version is not None and catalogue is not None and catalogue.version == version:
+        return catalogue
+    return await sync_to_async(get_skill_catalogue)(load)
@@ -0,0 +1,34 @@
+"""Выгрузка профилей с навыками (core.export)."""
+from core.export import Export
+from .models import Profile
+
+ProfileSkill = Profile.skills.through
+
+
+def add_skills(rows):
+    """Дописывает к строкам пачки названия навыков — один запрос на пачку."""
+    skills = {}
+    links = (
+        ProfileSkill.objects.filter(profile_id__in=[row[0] for row in rows])
+        .order_by('skill__name')
+        .values_list('profile_id', 'skill__name')
+    )
+    for profile_id, name in links:
+        skills.setdefault(profile_id, []).append(name)
+    return [(*row, skills.get(row[0], [])) for row in rows]
+
+
+profile_export = Export('profiles', Profile.objects.all(), [
+    ('id', 'id'),
+    ('username', 'user__username'),
+    ('specialization', 'specialization'),
+    ('experience_level', 'experience_level'),
+    ('hourly_rate', 'hourly_rate'),
+    ('rating', 'rating'),
+    ('completed_projects', 'completed_projects'),
+    ('available_for_hire', 'available_for_hire'),
+    ('languages', 'languages'),
+    ('bio', 'bio'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+], extra=('skills',), prepare=add_skills)
@@ -0,0 +1,111 @@
+from django.db.models import Exists, OuterRef
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Profile, Skill
+
+SKILL_MATCH_MODES = ('any', 'all')
+
+# Разрешённые значения ?ordering= для каталога фрилансеров: ключ
+# keyset-пагинации и индексы users_profile, которые его обслуживают.
+FREELANCER_ORDERINGS = {
+    'rank': (
+        ('-rating', '-completed_projects', '-id'),
+        ('profile_rank_idx', 'profile_available_rank_idx', 'profile_level_rank_idx'),
+    ),
+    'hourly_rate': (('hourly_rate', 'id'), ('profile_available_rate_idx',)),
+    '-hourly_rate': (('-hourly_rate', '-id'), ('profile_available_rate_idx',)),
+}
+DEFAULT_FREELANCER_ORDERING = 'rank'
+
+
+def filter_skill_links(queryset, names, match, through, owner_field, resolved=None):
+    """
+    Оставляет объекты, у которых в связующей таблице through есть любой
+    (match='any') или каждый (match='all') навык из names. Каждое условие —
+    EXISTS по индексу (owner_field, skill). resolved — уже сопоставленные
+    названия (Skill.objects.aresolve), иначе они сопоставляются здесь.
+    """
+    if resolved is None:
+        resolved = Skill.objects.resolve(names)
+    if match == 'all':
+        wanted = {str(name).strip().lower() for name in names if str(name).strip()}
+        if wanted - set(resolved):
+            return queryset.none()
+        for skill_ids in resolved.values():
+            queryset = queryset.filter(Exists(
+                through.objects.filter(**{owner_field: OuterRef('pk')}, skill_id__in=skill_ids)
+            ))
+        return queryset
+
+    skill_ids = [skill_id for ids in resolved.values() for skill_id in ids]
+    if not skill_ids:
+        return queryset.none()
+    return queryset.filter(Exists(
+        through.objects.filter(**{owner_field: OuterRef('pk')}, skill_id__in=skill_ids)
+    ))
+
+
+class FreelancerFilterSerializer(serializers.Serializer):
+    rate_min = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    rate_max = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    experience_level = serializers.CharField(required=False)
+    available = serializers.BooleanField(required=False, allow_null=True, default=None)
+    ordering = serializers.ChoiceField(choices=list(FREELANCER_ORDERINGS), default=DEFAULT_FREELANCER_ORDERING)
+
+    def validate_experience_level(self, value):
+        levels = {level.strip() for level in value.split(',') if level.strip()}
+        allowed = dict(Profile.EXPERIENCE_LEVELS)
+        unknown = levels - set(allowed)
+        if unknown:
+            raise serializers.ValidationError(f'Допустимые значения: {", ".join(allowed)}')
+        return sorted(levels)
+
+    def validate(self, attrs):
+        if attrs.get('rate_min') is not None and attrs.get('rate_max') is not None:
+            if attrs['rate_min'] > attrs['rate_max']:
+                raise serializers.ValidationError({'rate_max': 'Должен быть не меньше rate_min'})
+        return attrs
+
+
+def get_freelancer_filters(request):
+    """Проверенные параметры каталога; разбираются один раз на запрос."""
+    if not hasattr(request, '_freelancer_filters'):
+        serializer = FreelancerFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        request._freelancer_filters = serializer.validated_data
+    return request._freelancer_filters
+
+
+def get_freelancer_ordering(request):
+    return FREELANCER_ORDERINGS[get_freelancer_filters(request)['ordering']][0]
+
+
+class FreelancerFilterBackend(BaseFilterBackend):
+    """?rate_min=&rate_max=&experience_level=expert,intermediate&available=true"""
+
+    def filter_queryset(self, request, queryset, view):
+        params = get_freelancer_filters(request)
+        if params.get('available') is not None:
+            queryset = queryset.filter(available_for_hire=params['available'])
+        if params.get('experience_level'):
+            queryset = queryset.filter(experience_level__in=params['experience_level'])
+        if params.get('rate_min') is not None:
+            queryset = queryset.filter(hourly_rate__gte=params['rate_min'])
+        if params.get('rate_max') is not None:
+            queryset = queryset.filter(hourly_rate__lte=params['rate_max'])
+        return queryset
+
+
+class ProfileSkillFilterBackend(BaseFilterBackend):
+    """?skills=python,django&match=any|all"""
+
+    def filter_queryset(self, request, queryset, view):
+        raw = request.query_params.get('skills')
+        if not raw:
+            return queryset
+        match = request.query_params.get('match', 'any')
+        if match not in SKILL_MATCH_MODES:
+            raise ValidationError({'match': f'Допустимые значения: {", ".join(SKILL_MATCH_MODES)}'})
+        return filter_skill_links(queryset, raw.split(','), match, Profile.skills.through, 'profile')
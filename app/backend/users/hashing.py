@@ -0,0 +1,213 @@
+"""
+Хэширование паролей в ограниченном пуле процессов.
+
+PBKDF2 занимает процессор на сотни миллисекунд, поэтому вход и регистрация
+не считают хэш в потоке запроса, а ставят задачу в HashingPool. Пул
+ограничивает длину очереди: новая задача сверх лимита отклоняется сразу
+(PoolSaturated → 429 с Retry-After), а задачи доверенных клиентов (аккаунт,
+недавно успешно вошедший с того же IP) обходят остальных в очереди и могут
+занимать зарезервированные для них места.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from core.metrics import REGISTRY
+
+HASH_SECONDS = REGISTRY.histogram(
+    'password_hash_seconds', 'Время вычисления хэша пароля в пуле', ['operation']
+)
+HASH_WAIT_SECONDS = REGISTRY.histogram(
+    'password_hash_queue_wait_seconds', 'Время ожидания задачи хэширования в очереди', ['priority']
+)
+HASH_QUEUE_DEPTH = REGISTRY.gauge(
+    'password_hash_queue_depth', 'Задачи хэширования в очереди и в работе'
+)
+HASH_REJECTED = REGISTRY.counter(
+    'password_hash_rejected_total', 'Задачи хэширования, отклонённые из-за переполнения очереди', ['priority']
+)
+
+TRUSTED, UNTRUSTED = 0, 1
+
+
+class PoolSaturated(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f'Очередь хэширования заполнена, повторите через {retry_after} с')
+        self.retry_after = retry_after
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def make_password_job(password):
+    from django.contrib.auth.hashers import make_password
+    started = time.perf_counter()
+    return make_password(password), time.perf_counter() - started
+
+
+def check_password_job(password, encoded):
+    """(совпал ли пароль, нужно ли перехэшировать с новыми параметрами), время."""
+    from django.contrib.auth.hashers import check_password, identify_hasher
+    started = time.perf_counter()
+    valid = check_password(password, encoded)
+    must_update = False
+    if valid:
+        try:
+            must_update = identify_hasher(encoded).must_update(encoded)
+        except ValueError:
+            must_update = True
+    return (valid, must_update), time.perf_counter() - started
+
+
+class HashingPool:
+    def __init__(self, workers, max_queue, reserved):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.reserved = min(reserved, max_queue)
+        self._executor = None
+        # RLock: колбэк завершения может выполниться в том же потоке под блокировкой
+        self._lock = threading.RLock()
+        self._running = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            # spawn: fork процесса с потоками ASGI/WSGI-сервера небезопасен
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings'),),
+            )
+        return self._executor
+
+    @property
+    def depth(self):
+        return self._running + len(self._waiting)
+
+    def retry_after(self):
+        """Оценка в секундах, когда очередь продвинется на одну волну."""
+        observed = HASH_SECONDS.snapshot(operation='check')
+        average = observed['sum'] / observed['count'] if observed['count'] else 0.5
+        return max(1, math.ceil(self.depth / self.workers * average))
+
+    def submit(self, operation, func, *args, trusted=False):
+        priority = TRUSTED if trusted else UNTRUSTED
+        label = 'trusted' if trusted else 'untrusted'
+        limit = self.max_queue if trusted else self.max_queue - self.reserved
+        outer = Future()
+        with self._lock:
+            if self.depth >= limit:
+                HASH_REJECTED.inc(priority=label)
+                raise PoolSaturated(self.retry_after())
+            job = (priority, next(self._sequence), time.perf_counter(), operation, func, args, outer)
+            heapq.heappush(self._waiting, job)
+            self._drain()
+            HASH_QUEUE_DEPTH.set(self.depth)
+        return outer
+
+    async def run(self, operation, func, *args, trusted=False):
+        return await asyncio.wrap_future(self.submit(operation, func, *args, trusted=trusted))
+
+    def _drain(self):
+        """Запускает ожидающие задачи, пока есть свободные процессы (под _lock)."""
+        while self._waiting and self._running < self.workers:
+            self._start(heapq.heappop(self._waiting))
+
+    def _start(self, job):
+        priority, _, queued_at, operation, func, args, outer = job
+        HASH_WAIT_SECONDS.observe(
+            time.perf_counter() - queued_at, priority='trusted' if priority == TRUSTED else 'untrusted'
+        )
+        self._running += 1
+        try:
+            executor, inner = self._submit(func, args)
+        except Exception as exc:
+            self._running -= 1
+            outer.set_exception(exc)
+            return
+        inner.add_done_callback(lambda done: self._finish(operation, outer, executor, done))
+
+    def _submit(self, func, args):
+        executor = self.executor
+        try:
+            return executor, executor.submit(func, *args)
+        except BrokenProcessPool:
+            # Пул сломался раньше, чем это заметил колбэк: пересоздаём один раз
+            self._discard(executor)
+            executor = self.executor
+            return executor, executor.submit(func, *args)
+
+    def _discard(self, executor):
+        """
+        Убирает сломанный пул (процесс-исполнитель умер): задачи в нём уже
+        завершены с BrokenProcessPool, следующая задача создаст новый пул.
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, operation, outer, executor, done):
+        try:
+            result, seconds = done.result()
+        except BrokenProcessPool as exc:
+            self._discard(executor)
+            outer.set_exception(exc)
+        except BaseException as exc:
+            outer.set_exception(exc)
+        else:
+            HASH_SECONDS.observe(seconds, operation=operation)
+            outer.set_result(result)
+        with self._lock:
+            self._running -= 1
+            self._drain()
+            HASH_QUEUE_DEPTH.set(self.depth)
+
+
+class TrustRegistry:
+    """Пары «аккаунт + IP» с недавним успешным входом (LRU в памяти процесса)."""
+
+    def __init__(self, ttl, max_size=100000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, *keys):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key in keys:
+                if not key:
+                    continue
+                self._entries[key] = expires_at
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def is_trusted(self, *keys):
+        now = time.monotonic()
+        return any(self._entries.get(key, 0) > now for key in keys if key)
+
+
+hashing_pool = HashingPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    reserved=settings.PASSWORD_HASH_RESERVED,
+)
+trusted_clients = TrustRegistry(ttl=settings.PASSWORD_HASH_TRUST_TTL)
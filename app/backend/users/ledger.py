@@ -0,0 +1,135 @@
+"""
+Денежные операции с балансами пользователей.
+
+Источник истины — журнал LedgerEntry: он только пополняется, а User.balance —
+кэш суммы проводок пользователя (расхождения ищет команда
+reconcile_balances). Каждая операция — одна транзакция: строки
+пользователей блокируются select_for_update строго по возрастанию pk,
+поэтому встречные переводы A→B и B→A ждут друг друга, а не
+взаимоблокируются, и ни одно изменение баланса не теряется.
+
+Пользователя с проводками удалить нельзя (LedgerEntry.user — PROTECT,
+иначе журнал перестанет сходиться): учётную запись закрывает
+close_account — деактивирует и обезличивает её.
+"""
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F
+
+from .authentication import user_cache
+from .cache import invalidate_public_profiles
+from .models import LedgerEntry, Profile, User
+from .revocation import revoke_user_tokens
+
+CENT = Decimal('0.01')
+
+
+class LedgerError(Exception):
+    pass
+
+
+class InsufficientFunds(LedgerError):
+    def __init__(self, user_id):
+        super().__init__(f'Недостаточно средств: пользователь {user_id}')
+        self.user_id = user_id
+
+
+def to_amount(value):
+    """Положительная сумма с точностью до копейки."""
+    try:
+        amount = Decimal(str(value))
+    except InvalidOperation:
+        raise LedgerError(f'Некорректная сумма: {value!r}') from None
+    if not amount.is_finite() or amount <= 0 or amount != amount.quantize(CENT):
+        raise LedgerError(f'Некорректная сумма: {value!r}')
+    return amount
+
+
+def post(kind, changes, memo=''):
+    """
+    Проводит операцию: changes — {user_id: изменение баланса}. Баланс ни
+    одного участника не может стать отрицательным. Возвращает id операции.
+    """
+    if not changes or any(not delta for delta in changes.values()):
+        raise LedgerError('Пустая операция')
+    operation = uuid.uuid4()
+    user_ids = sorted(changes)
+    with transaction.atomic():
+        # Единый порядок блокировок для всех операций исключает взаимоблокировки
+        accounts = {
+            pk: (username, balance)
+            for pk, username, balance in User.objects.select_for_update()
+            .filter(pk__in=user_ids).order_by('pk').values_list('pk', 'username', 'balance')
+        }
+        entries = []
+        for user_id in user_ids:
+            if user_id not in accounts:
+                raise User.DoesNotExist(f'Пользователь {user_id} не найден')
+            balance = accounts[user_id][1] + changes[user_id]
+            if balance < 0:
+                raise InsufficientFunds(user_id)
+            entries.append(LedgerEntry(
+                user_id=user_id, operation=operation, kind=kind,
+                amount=changes[user_id], balance_after=balance, memo=memo,
+            ))
+        for entry in entries:
+            User.objects.filter(pk=entry.user_id).update(balance=F('balance') + entry.amount)
+        LedgerEntry.objects.bulk_create(entries)
+
+        # update() не шлёт сигналы — кэши пользователей сбрасываем сами
+        usernames = [username for username, _ in accounts.values()]
+
+        def invalidate():
+            for user_id in user_ids:
+                user_cache.invalidate(user_id)
+            invalidate_public_profiles(*usernames)
+
+        transaction.on_commit(invalidate)
+    return operation
+
+
+def transfer(sender_id, recipient_id, amount, memo=''):
+    amount = to_amount(amount)
+    if sender_id == recipient_id:
+        raise LedgerError('Перевод самому себе')
+    return post(LedgerEntry.KIND_TRANSFER, {sender_id: -amount, recipient_id: amount}, memo)
+
+
+def deposit(user_id, amount, memo=''):
+    return post(LedgerEntry.KIND_DEPOSIT, {user_id: to_amount(amount)}, memo)
+
+
+def withdraw(user_id, amount, memo=''):
+    return post(LedgerEntry.KIND_WITHDRAWAL, {user_id: -to_amount(amount)}, memo)
+
+
+def close_account(user_id):
+    """
+    Закрывает учётную запись. Пользователь без проводок удаляется целиком;
+    с проводками — деактивируется и обезличивается: логин и почта
+    заменяются на deleted-<pk>, пароль, аватар и профиль удаляются, все
+    токены отзываются, а проводки и баланс остаются для сверки. Возвращает
+    True, если пользователь удалён.
+    """
+    with transaction.atomic():
+        # Та же блокировка, что в post: проводка не появится между проверкой и удалением
+        user = User.objects.select_for_update().get(pk=user_id)
+        if not LedgerEntry.objects.filter(user_id=user.pk).exists():
+            user.delete()
+            return True
+        # Активному токены отзовёт сигнал деактивации (users.signals)
+        was_active = user.is_active
+        user.username = f'deleted-{user.pk}'
+        user.email = f'deleted-{user.pk}@invalid'
+        user.first_name = user.last_name = ''
+        user.avatar = None
+        user.is_active = user.is_staff = user.is_superuser = False
+        user.set_unusable_password()
+        user.save()
+        Profile.objects.filter(user_id=user.pk).delete()
+        if not was_active:
+            revoke_user_tokens(user)
+    return False
+
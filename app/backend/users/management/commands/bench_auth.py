@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+from django.utils.module_loading import import_string
+
+from users.authentication import user_cache
+from users.models import Profile, User
+from users.tokens import PrincipalRefreshToken
+
+MODES = {
+    'jwt': 'rest_framework_simplejwt.authentication.JWTAuthentication',
+    'principal': 'users.authentication.PrincipalJWTAuthentication',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает запросы/сек и число SQL-запросов на запрос для стандартной '
+        'JWTAuthentication и PrincipalJWTAuthentication на чтении.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--path', default=None, help='По умолчанию — публичный профиль (кэшируется).')
+
+    def handle(self, *args, **options):
+        user, created = User.objects.get_or_create(
+            username='bench-auth', defaults={'email': 'bench-auth@example.com'}
+        )
+        if created:
+            Profile.objects.create(user=user)
+        token = str(PrincipalRefreshToken.for_user(user).access_token)
+        path = options['path'] or reverse('public-profile', args=[user.username])
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        # Классы аутентификации DRF фиксируются при импорте представления,
+        # поэтому режим переключается прямо на классе представления.
+        view_class = resolve(path).func.cls
+        original = view_class.authentication_classes
+
+        try:
+            for mode, auth_class in MODES.items():
+                view_class.authentication_classes = [import_string(auth_class)]
+                self.run_mode(mode, client, path, options['requests'])
+        finally:
+            view_class.authentication_classes = original
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def run_mode(self, mode, client, path, count):
+        user_cache.clear()
+        client.get(path)  # прогрев кэшей представления
+        queries = []
+
+        def count_queries(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            started = time.perf_counter()
+            for _ in range(count):
+                response = client.get(path)
+            elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            self.stderr.write(f'{mode}: unexpected status {response.status_code}')
+        self.stdout.write(
+            f'{mode:>10}: {count / elapsed:8.0f} req/s, {len(queries) / count:.2f} queries/request'
+        )
@@ -0,0 +1,76 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Sum
+
+from users import ledger
+from users.models import LedgerEntry, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочная проверка переводов: --threads потоков делают случайные '
+        'переводы между --accounts общими счетами. Печатает переводы/сек и '
+        'проверяет, что сумма балансов не изменилась и балансы равны журналу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--transfers', type=int, default=200, help='Переводов на поток')
+        parser.add_argument('--accounts', type=int, default=4)
+
+    def handle(self, *args, **options):
+        if not connection.features.has_select_for_update:
+            raise CommandError(f'{connection.vendor} does not support row locks, use PostgreSQL')
+
+        accounts = []
+        for index in range(options['accounts']):
+            user, _ = User.objects.get_or_create(
+                username=f'bench-ledger-{index}', defaults={'email': f'bench-ledger-{index}@example.com'}
+            )
+            ledger.deposit(user.pk, 1000, memo='bench')
+            accounts.append(user.pk)
+        total_before = self.total(accounts)
+
+        rejected = 0
+        lock = threading.Lock()
+
+        def worker(seed):
+            nonlocal rejected
+            rng = random.Random(seed)
+            try:
+                for _ in range(options['transfers']):
+                    sender, recipient = rng.sample(accounts, 2)
+                    try:
+                        ledger.transfer(sender, recipient, rng.randint(1, 100), memo='bench')
+                    except ledger.InsufficientFunds:
+                        with lock:
+                            rejected += 1
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['threads']) as pool:
+            list(pool.map(worker, range(options['threads'])))
+        elapsed = time.perf_counter() - started
+
+        count = options['threads'] * options['transfers']
+        total_after = self.total(accounts)
+        drift = [
+            pk for pk, balance in User.objects.filter(pk__in=accounts).values_list('pk', 'balance')
+            if balance != LedgerEntry.objects.filter(user_id=pk).aggregate(total=Sum('amount'))['total']
+        ]
+        self.stdout.write(
+            f'{count} transfers in {elapsed:.2f}s: {count / elapsed:.0f} transfers/s, '
+            f'rejected (insufficient funds): {rejected}'
+        )
+        if total_after != total_before or drift:
+            raise CommandError(f'lost updates: total {total_before} -> {total_after}, drifted accounts {drift}')
+        self.stdout.write(f'total preserved: {total_after}')
+
+    def total(self, accounts):
+        return User.objects.filter(pk__in=accounts).aggregate(total=Sum('balance'))['total']
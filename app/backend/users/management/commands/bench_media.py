@@ -0,0 +1,86 @@
+import hashlib
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.views.static import serve
+
+from core.media import serve_media
+
+factory = RequestFactory()
+
+# (название, настройки, заголовки запроса; None — прежний static.serve)
+SCENARIOS = (
+    ('static.serve (прежний)', {'MEDIA_SERVE_MODE': 'django'}, None),
+    ('django', {'MEDIA_SERVE_MODE': 'django'}, {}),
+    ('django, Range 1 KiB', {'MEDIA_SERVE_MODE': 'django'}, {'HTTP_RANGE': 'bytes=0-1023'}),
+    ('django, 304', {'MEDIA_SERVE_MODE': 'django'}, {'etag': True}),
+    ('x-accel', {'MEDIA_SERVE_MODE': 'x-accel'}, {}),
+    ('x-sendfile', {'MEDIA_SERVE_MODE': 'x-sendfile'}, {}),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Время воркера на запрос аватара (avatars/<sha256>/<size>.jpg) для '
+        'режимов MEDIA_SERVE_MODE и прежнего django.views.static.serve. Тело '
+        'ответа читается целиком — так выглядит раздача без sendfile. '
+        'Замеряется само представление, без middleware.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--size', type=int, default=48 * 1024, help='Размер файла, байт')
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp(prefix='bench-media-')
+        try:
+            content = os.urandom(options['size'])
+            name = f'avatars/{hashlib.sha256(content).hexdigest()}/256.jpg'
+            os.makedirs(os.path.join(media_root, os.path.dirname(name)))
+            with open(os.path.join(media_root, name), 'wb') as file:
+                file.write(content)
+            with override_settings(MEDIA_ROOT=media_root):
+                for title, overrides, headers in SCENARIOS:
+                    self.run_scenario(title, overrides, headers and dict(headers), name, options['requests'])
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def run_scenario(self, title, overrides, headers, name, count):
+        url = '/media/' + name
+        if headers is None:
+            headers = {}
+
+            def view(request):
+                return serve(request, name, document_root=settings.MEDIA_ROOT)
+        else:
+            def view(request):
+                return serve_media(request, name)
+
+        def fetch(request):
+            response = view(request)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            response.close()
+            return response, body
+
+        with override_settings(**overrides):
+            if headers.pop('etag', False):
+                headers['HTTP_IF_NONE_MATCH'] = fetch(factory.get(url))[0]['ETag']
+            response, body = fetch(factory.get(url, **headers))
+            timings = []
+            for _ in range(count):
+                # Запрос собирается вне замера: считаем только работу представления
+                request = factory.get(url, **headers)
+                started = time.perf_counter_ns()
+                fetch(request)
+                timings.append(time.perf_counter_ns() - started)
+        self.stdout.write(
+            f'{title:>24}: p50={statistics.median(timings) / 1000:7.1f}us '
+            f'status={response.status_code} body={len(body)}B'
+        )
@@ -0,0 +1,94 @@
+import statistics
+import sys
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.models import TokenRevocation, User
+from users.revocation import RevocationIndex
+
+
+class Command(BaseCommand):
+    help = (
+        'Индекс отзыва токенов на --tokens отозванных jti: время построения, '
+        'память фильтра Блума против set строк, задержка проверки '
+        'неотозванного токена и фактическая доля ложных срабатываний. С --db '
+        'отзывы пишутся в таблицу, индекс строится из БД и сравнивается с '
+        'проверкой каждого токена запросом (как в blacklist simplejwt).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=1_000_000)
+        parser.add_argument('--lookups', type=int, default=200_000)
+        parser.add_argument('--error-rate', type=float, default=0.001)
+        parser.add_argument('--db', action='store_true')
+
+    def handle(self, *args, **options):
+        count = options['tokens']
+        revoked = [uuid.uuid4().hex for _ in range(count)]
+        index = RevocationIndex(
+            capacity=count, error_rate=options['error_rate'],
+            refresh_interval=10 ** 9, rebuild_interval=10 ** 9,
+        )
+
+        started = time.perf_counter()
+        index.build((jti, 1, None) for jti in revoked)
+        self.stdout.write(f'built from memory: {count} jti in {time.perf_counter() - started:.2f}s')
+
+        if options['db']:
+            self.build_from_db(index, revoked)
+
+        bloom = index._bloom
+        exact_set = set(revoked)
+        set_bytes = sys.getsizeof(exact_set) + sum(sys.getsizeof(jti) for jti in revoked)
+        self.stdout.write(
+            f'bloom: {len(bloom.bits) / 2 ** 20:.1f} MiB, {bloom.hashes} hashes; '
+            f'set of jti strings: {set_bytes / 2 ** 20:.1f} MiB'
+        )
+
+        lookups = options['lookups']
+        tokens = [{'user_id': 2, 'iat': 0, 'jti': uuid.uuid4().hex, 'sid': uuid.uuid4().hex} for _ in range(lookups)]
+        # Ложные срабатывания считаем по фильтру: каждое стоило бы запроса к БД
+        false_positives = sum(token['jti'] in bloom for token in tokens)
+        timings = []
+        for chunk in range(0, lookups, 1000):
+            batch = [token for token in tokens[chunk:chunk + 1000] if token['jti'] not in bloom and token['sid'] not in bloom]
+            started = time.perf_counter_ns()
+            for token in batch:
+                index.is_revoked(token)
+            if batch:
+                timings.append((time.perf_counter_ns() - started) / len(batch))
+        self.stdout.write(
+            f'is_revoked (jti + sid, not revoked): p50={statistics.median(timings) / 1000:.1f}us per token, '
+            f'false positives: {false_positives}/{lookups} ({false_positives / lookups:.3%})'
+        )
+
+        if options['db']:
+            self.compare_db(revoked, options['lookups'] // 100)
+
+    def build_from_db(self, index, revoked):
+        user, _ = User.objects.get_or_create(username='bench-revocation', defaults={'email': 'bench-revocation@example.com'})
+        TokenRevocation.objects.filter(user=user).delete()
+        expires_at = timezone.now() + timedelta(days=1)
+        started = time.perf_counter()
+        for chunk in range(0, len(revoked), 10_000):
+            TokenRevocation.objects.bulk_create([
+                TokenRevocation(user=user, jti=jti, expires_at=expires_at) for jti in revoked[chunk:chunk + 10_000]
+            ])
+        self.stdout.write(f'inserted {len(revoked)} rows in {time.perf_counter() - started:.2f}s')
+        started = time.perf_counter()
+        index.rebuild()
+        self.stdout.write(f'built from DB: {len(index._bloom)} jti in {time.perf_counter() - started:.2f}s')
+
+    def compare_db(self, revoked, lookups):
+        timings = []
+        for _ in range(lookups):
+            jti = uuid.uuid4().hex
+            started = time.perf_counter_ns()
+            TokenRevocation.objects.filter(jti=jti).exists()
+            timings.append(time.perf_counter_ns() - started)
+        self.stdout.write(f'DB lookup per token: p50={statistics.median(timings) / 1000:.1f}us')
+        TokenRevocation.objects.filter(user__username='bench-revocation').delete()
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.ledger import close_account
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Закрывает учётную запись (users.ledger.close_account): без проводок '
+        'пользователь удаляется, с проводками — деактивируется и обезличивается, '
+        'потому что журнал ссылается на него (PROTECT).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+
+    def handle(self, *args, **options):
+        try:
+            user_id = User.objects.values_list('pk', flat=True).get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {options["username"]} не найден')
+        if close_account(user_id):
+            self.stdout.write(f'deleted user {user_id}')
+        else:
+            self.stdout.write(f'deactivated and anonymized user {user_id} (has ledger entries)')
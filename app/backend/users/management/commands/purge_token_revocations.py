@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.models import TokenRevocation
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет отзывы токенов, которые уже истекли сами (expires_at в '
+        'прошлом). Индексы процессов забудут их при плановом перестроении. '
+        'Рассчитана на периодический запуск (cron, systemd timer).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        total = 0
+        while True:
+            # Выборка по token_revocation_expiry_idx
+            batch = list(
+                TokenRevocation.objects.filter(expires_at__lte=now)
+                .values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            total += TokenRevocation.objects.filter(pk__in=batch).delete()[0]
+        self.stdout.write(f'purged {total} token revocations')
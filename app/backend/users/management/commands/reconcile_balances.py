@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from users.authentication import user_cache
+from users.cache import invalidate_public_profiles
+from users.models import LedgerEntry, User
+
+
+def ledger_total():
+    return Coalesce(
+        Subquery(
+            LedgerEntry.objects.filter(user=OuterRef('pk'))
+            .order_by().values('user').annotate(total=Sum('amount')).values('total')
+        ),
+        Value(0), output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет User.balance с суммой проводок журнала (users.ledger). '
+        'Без --fix только сообщает о расхождениях и завершается с ошибкой; '
+        'с --fix приводит баланс к журналу под блокировкой строки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true')
+
+    def handle(self, *args, **options):
+        mismatches = list(
+            User.objects.annotate(ledger=ledger_total())
+            .exclude(balance=F('ledger'))
+            .order_by('pk').values_list('pk', 'username', 'balance', 'ledger')
+        )
+        for user_id, username, balance, ledger in mismatches:
+            self.stdout.write(f'{username} (id={user_id}): balance={balance} ledger={ledger}')
+            if options['fix']:
+                self.fix(user_id, username)
+
+        if mismatches and not options['fix']:
+            raise CommandError(f'{len(mismatches)} balances do not match the ledger')
+        self.stdout.write(f'checked, mismatches: {len(mismatches)}' + (' (fixed)' if options['fix'] else ''))
+
+    def fix(self, user_id, username):
+        with transaction.atomic():
+            # Сумма пересчитывается под той же блокировкой, что берут переводы
+            User.objects.select_for_update().filter(pk=user_id).exists()
+            total = LedgerEntry.objects.filter(user_id=user_id).aggregate(total=Sum('amount'))['total']
+            User.objects.filter(pk=user_id).update(balance=total or 0)
+        user_cache.invalidate(user_id)
+        invalidate_public_profiles(username)
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:11
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_skill_user_avatar_profile'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='skill',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='skill_name_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-18 16:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_skill_name_lower_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['-rating', '-completed_projects', '-id'], name='profile_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(condition=models.Q(('available_for_hire', True)), fields=['-rating', '-completed_projects', '-id'], name='profile_available_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(condition=models.Q(('available_for_hire', True)), fields=['experience_level', '-rating', '-completed_projects', '-id'], name='profile_level_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(condition=models.Q(('available_for_hire', True)), fields=['hourly_rate', 'id'], name='profile_available_rate_idx'),
+        ),
+    ]
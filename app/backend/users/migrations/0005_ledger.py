@@ -0,0 +1,56 @@
+# Generated by Django 5.0.2 on 2026-10-18 17:00
+
+import itertools
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    """Входящий остаток: текущие ненулевые балансы становятся первыми проводками журнала."""
+    User = apps.get_model('users', 'User')
+    LedgerEntry = apps.get_model('users', 'LedgerEntry')
+    balances = User.objects.exclude(balance=0).values_list('pk', 'balance').order_by('pk').iterator()
+    entries = (
+        LedgerEntry(
+            user_id=user_id, operation=uuid.uuid4(), kind='opening',
+            amount=balance, balance_after=balance, memo='Остаток до ведения журнала',
+        )
+        for user_id, balance in balances
+    )
+    while batch := list(itertools.islice(entries, 1_000)):
+        LedgerEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_profile_ranking_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.UUIDField(db_index=True)),
+                ('kind', models.CharField(choices=[('opening', 'Входящий остаток'), ('deposit', 'Пополнение'), ('withdrawal', 'Вывод'), ('transfer', 'Перевод'), ('adjustment', 'Корректировка')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('memo', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'users_ledger',
+                'indexes': [models.Index(fields=['user', '-id'], name='ledger_user_id_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ledgerentry',
+            constraint=models.CheckConstraint(check=models.Q(('amount', 0), _negated=True), name='ledger_amount_nonzero'),
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
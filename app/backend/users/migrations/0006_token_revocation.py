@@ -0,0 +1,34 @@
+# Generated by Django 5.0.2 on 2026-10-18 17:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(blank=True, max_length=64)),
+                ('not_before', models.BigIntegerField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='token_revocations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'users_token_revocations',
+                'indexes': [models.Index(fields=['jti'], name='token_revocation_jti_idx'), models.Index(fields=['expires_at'], name='token_revocation_expiry_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tokenrevocation',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('jti', ''), _negated=True), ('not_before__isnull', False), _connector='OR'), name='token_revocation_target'),
+        ),
+    ]
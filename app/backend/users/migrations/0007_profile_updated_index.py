@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+INDEX = models.Index(fields=['updated_at', 'id'], name='profile_updated_id_idx')
+
+
+def create_index(apps, schema_editor):
+    model = apps.get_model('users', 'Profile')
+    if schema_editor.connection.vendor == 'postgresql':
+        # Без блокировки записи в профили
+        schema_editor.execute(INDEX.create_sql(model, schema_editor, concurrently=True))
+    else:
+        schema_editor.add_index(model, INDEX)
+
+
+def drop_index(apps, schema_editor):
+    model = apps.get_model('users', 'Profile')
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(INDEX.remove_sql(model, schema_editor, concurrently=True))
+    else:
+        schema_editor.remove_index(model, INDEX)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY нельзя выполнять в транзакции.
+    atomic = False
+
+    dependencies = [
+        ('users', '0006_token_revocation'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='profile', index=INDEX)],
+            database_operations=[migrations.RunPython(create_index, drop_index)],
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.functions import Lower
 
 class User(AbstractUser):
     email = models.EmailField(unique=True)
@@ -17,9 +18,54 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+class SkillManager(models.Manager):
+    def resolve(self, names):
+        """
+        Сопоставляет названия навыков (без учёта регистра) с id из справочника:
+        {'python': [1], ...}. Неизвестные названия пропускаются.
+        """
+        resolved = {}
+        wanted = self._wanted(names)
+        if wanted:
+            for key, skill_id in self._matching(wanted):
+                resolved.setdefault(key, []).append(skill_id)
+        return resolved
+
+    async def aresolve(self, names):
+        """resolve для асинхронных представлений."""
+        resolved = {}
+        wanted = self._wanted(names)
+        if wanted:
+            async for key, skill_id in self._matching(wanted):
+                resolved.setdefault(key, []).append(skill_id)
+        return resolved
+
+    def _wanted(self, names):
+        wanted = {}
+        for name in names:
+            name = str(name).strip()
+            if name:
+                wanted.setdefault(name.lower(), name)
+        return wanted
+
+    def _matching(self, wanted):
+        return (
+            self.annotate(name_lower=Lower('name'))
+            .filter(name_lower__in=list(wanted))
+            .values_list('name_lower', 'id')
+        )
+
+
 class Skill(models.Model):
     name = models.CharField(max_length=100)
 
+    objects = SkillManager()
+
+    class Meta:
+        indexes = [
+            models.Index(Lower('name'), name='skill_name_lower_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -51,5 +97,109 @@ class Profile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Каталог фрилансеров (FreelancerListView): ранжирование по рейтингу
+        # и числу проектов, частичные индексы — только по доступным для найма.
+        indexes = [
+            models.Index(fields=['-rating', '-completed_projects', '-id'], name='profile_rank_idx'),
+            models.Index(
+                fields=['-rating', '-completed_projects', '-id'],
+                condition=models.Q(available_for_hire=True), name='profile_available_rank_idx'
+            ),
+            models.Index(
+                fields=['experience_level', '-rating', '-completed_projects', '-id'],
+                condition=models.Q(available_for_hire=True), name='profile_level_rank_idx'
+            ),
+            models.Index(
+                fields=['hourly_rate', 'id'],
+                condition=models.Q(available_for_hire=True), name='profile_available_rate_idx'
+            ),
+            # Инкрементальная выгрузка (core.export) и синхронизация tasks.matching
+            models.Index(fields=['updated_at', 'id'], name='profile_updated_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"Profile of {self.user.username}"
+
+class LedgerEntry(models.Model):
+    """
+    Проводка по балансу пользователя (users.ledger). Журнал только
+    пополняется: исправления делаются новыми проводками, а User.balance —
+    кэш суммы проводок пользователя.
+    """
+    KIND_OPENING = 'opening'
+    KIND_DEPOSIT = 'deposit'
+    KIND_WITHDRAWAL = 'withdrawal'
+    KIND_TRANSFER = 'transfer'
+    KIND_ADJUSTMENT = 'adjustment'
+    KINDS = [
+        (KIND_OPENING, 'Входящий остаток'),
+        (KIND_DEPOSIT, 'Пополнение'),
+        (KIND_WITHDRAWAL, 'Вывод'),
+        (KIND_TRANSFER, 'Перевод'),
+        (KIND_ADJUSTMENT, 'Корректировка'),
+    ]
+
+    # Отдельный индекс по user_id не нужен: его покрывает ledger_user_id_idx.
+    # PROTECT: пользователя с проводками не удаляют, а закрывают через
+    # users.ledger.close_account (деактивация и обезличивание).
+    user = models.ForeignKey(User, on_delete=models.PROTECT, related_name='ledger_entries', db_index=False)
+    # Общий идентификатор проводок одной операции (обе стороны перевода)
+    operation = models.UUIDField(db_index=True)
+    kind = models.CharField(max_length=20, choices=KINDS)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=10, decimal_places=2)
+    memo = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'users_ledger'
+        indexes = [
+            models.Index(fields=['user', '-id'], name='ledger_user_id_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=~models.Q(amount=0), name='ledger_amount_nonzero'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Проводки журнала не изменяются')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Проводки журнала не удаляются')
+
+    def __str__(self):
+        return f'{self.kind} {self.amount} ({self.user_id})'
+
+
+class TokenRevocation(models.Model):
+    """
+    Отзыв JWT (users.revocation): либо один jti — токен или сессия (refresh
+    вместе с выпущенными из него access), либо все токены пользователя,
+    выпущенные не позже not_before. Строка нужна, пока отозванные токены
+    не истекли (expires_at), потом её удаляет purge_token_revocations.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='token_revocations')
+    jti = models.CharField(max_length=64, blank=True)
+    # Unix-время с микросекундами: токены с iat <= not_before недействительны
+    # (iat у users.tokens тоже дробный, иначе отсечка задела бы вход в ту же секунду)
+    not_before = models.FloatField(null=True, blank=True)
+    expires_at = models.DateTimeField()
+    # Курсор синхронизации индексов процессов
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'users_token_revocations'
+        indexes = [
+            models.Index(fields=['jti'], name='token_revocation_jti_idx'),
+            models.Index(fields=['expires_at'], name='token_revocation_expiry_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=~models.Q(jti='') | models.Q(not_before__isnull=False), name='token_revocation_target'
+            ),
+        ]
+
     def __str__(self):
-        return f"Profile of {self.user.username}"
\ No newline at end of file
+        return self.jti or f'{self.user_id} <= {self.not_before}'
@@ -0,0 +1,83 @@
+"""
+Изменение собственного профиля (PUT /api/auth/profile/).
+
+Поля пользователя и профиля проверяются один раз и пишутся одной
+транзакцией: UPDATE только изменившихся полей, а навыки — разницей с
+текущим набором (DELETE ушедших и INSERT новых строк связи) вместо
+skills.set(), который перечитывает и перезаписывает связи. Строки связи
+пишутся напрямую, без m2m_changed: кэш публичного профиля и updated_at
+(его читает tasks.matching) обновляет сохранение самого профиля. Ответ
+собирается из уже загруженных объектов без повторного чтения.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Profile, Skill
+
+ProfileSkill = Profile.skills.through
+
+
+def _assign(instance, data):
+    """Присваивает значения и возвращает имена действительно изменившихся полей."""
+    changed = []
+    for name, value in data.items():
+        if getattr(instance, name) != value:
+            setattr(instance, name, value)
+            changed.append(name)
+    return changed
+
+
+def _cache_skills(profile, skills):
+    # Как после prefetch_related: profile.skills.all() больше не ходит в БД
+    queryset = profile.skills.all()
+    queryset._result_cache = skills
+    queryset._prefetch_done = True
+    profile._prefetched_objects_cache = {
+        **getattr(profile, '_prefetched_objects_cache', {}),
+        Profile.skills.field.name: queryset,
+    }
+
+
+def sync_skills(profile, skill_ids):
+    """
+    Приводит навыки профиля к skill_ids разницей с текущим набором;
+    несуществующие id пропускаются. Возвращает True, если набор изменился.
+    """
+    wanted = set(skill_ids)
+    linked = ProfileSkill.objects.filter(profile_id=profile.pk)
+    # Текущие и запрошенные навыки одним запросом
+    skills = list(
+        Skill.objects.filter(Q(pk__in=wanted) | Q(pk__in=linked.values('skill_id')))
+        .annotate(linked=Exists(linked.filter(skill_id=OuterRef('pk'))))
+        .order_by('pk')
+    )
+    removed = [skill.pk for skill in skills if skill.linked and skill.pk not in wanted]
+    added = [skill.pk for skill in skills if not skill.linked and skill.pk in wanted]
+    if removed:
+        linked.filter(skill_id__in=removed).delete()
+    if added:
+        ProfileSkill.objects.bulk_create(
+            [ProfileSkill(profile_id=profile.pk, skill_id=skill_id) for skill_id in added],
+            ignore_conflicts=True,
+        )
+    _cache_skills(profile, [skill for skill in skills if skill.pk in wanted])
+    return bool(removed or added)
+
+
+def update_profile(user, user_serializer, profile_serializer):
+    """Пишет проверенные данные обоих сериализаторов одной транзакцией."""
+    profile = user.profile
+    user_data = dict(user_serializer.validated_data)
+    profile_data = dict(profile_serializer.validated_data)
+    skill_ids = profile_data.pop('skill_ids', None)
+
+    with transaction.atomic():
+        skills_changed = skill_ids is not None and sync_skills(profile, skill_ids)
+        user_fields = _assign(user, user_data)
+        if user_fields:
+            user.save(update_fields=user_fields)
+        profile_fields = _assign(profile, profile_data)
+        if profile_fields or skills_changed:
+            # auto_now при update_fields пишется, только если поле перечислено
+            profile.save(update_fields=[*profile_fields, 'updated_at'])
+    return user
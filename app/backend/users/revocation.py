@@ -0,0 +1,273 @@
+"""
+Отзыв JWT без запроса к БД на каждую проверку токена.
+
+Общее хранилище — таблица TokenRevocation. В памяти процесса её зеркалит
+RevocationIndex: фильтр Блума по отозванным jti (около 1,8 МБ на миллион
+при доле ложных срабатываний 0,1%), словарь «user_id → not_before» для
+выхода со всех устройств и небольшой точный кэш ответов для jti, на
+которых фильтр сработал. Токен, которого нет в фильтре, проверяется за
+O(1) без БД; в БД идём только при срабатывании фильтра (отозванный токен
+или редкое ложное срабатывание), и ответ запоминается.
+
+Access-токен несёт claim sid — jti refresh-токена, из которого выпущен
+(users.tokens), поэтому отзыв refresh гасит и его access-токены. Отзыв в
+своём процессе виден сразу, в остальных — не позже refresh_interval:
+индекс, как tasks.matching, подтягивает новые строки по created_at и раз
+в rebuild_interval перестраивается целиком, забывая истёкшие отзывы.
+"""
+import hashlib
+import math
+import struct
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from core.instrumentation import maintenance
+from core.metrics import REGISTRY
+from .models import TokenRevocation
+
+REVOKED_TOKENS = REGISTRY.gauge('token_revocation_entries', 'Отозванные jti в индексе процесса')
+REVOCATION_DB_CHECKS = REGISTRY.counter(
+    'token_revocation_db_checks_total', 'Проверки отзыва, дошедшие до БД (срабатывания фильтра Блума)'
+)
+
+
+class BloomFilter:
+    """
+    Фильтр Блума над bytearray. Позиции битов — 32-битные слова одного
+    дайджеста blake2b (до 64 байт), поэтому хэшей не больше 16.
+    """
+    MAX_HASHES = 16
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = min(self.MAX_HASHES, max(1, round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self._format = struct.Struct(f'<{self.hashes}I')
+
+    def _positions(self, key):
+        size = self.size
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.hashes).digest()
+        return [word % size for word in self._format.unpack(digest)]
+
+    def add(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+
+class RevocationIndex:
+    def __init__(self, capacity=1_000_000, error_rate=0.001, exact_size=10_000,
+                 refresh_interval=5, rebuild_interval=3600):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.exact_size = exact_size
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._loaded = False
+        self._built_at = self._synced_at = 0.0
+        self._watermark = None
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._cutoffs = {}
+        self._exact = {}
+
+    # ----- Построение и обновление -----
+
+    def build(self, rows, watermark=None, expected=0):
+        """Строит индекс из строк (jti, user_id, not_before)."""
+        # Запас вдвое: до перестроения фильтр ещё пополняется синхронизацией
+        bloom = BloomFilter(max(self.capacity, expected * 2), self.error_rate)
+        cutoffs = {}
+        for jti, user_id, not_before in rows:
+            if jti:
+                bloom.add(jti)
+            if not_before is not None and not_before > cutoffs.get(user_id, -1):
+                cutoffs[user_id] = not_before
+        with self._lock:
+            self._bloom, self._cutoffs, self._exact = bloom, cutoffs, {}
+            self._watermark = watermark
+            self._loaded = True
+            self._built_at = self._synced_at = time.monotonic()
+        REVOKED_TOKENS.set(len(bloom))
+
+    def rebuild(self):
+        """Полная загрузка действующих отзывов из БД."""
+        active = TokenRevocation.objects.filter(expires_at__gt=timezone.now())
+        watermark = TokenRevocation.objects.aggregate(value=Max('created_at'))['value']
+        self.build(
+            active.values_list('jti', 'user_id', 'not_before').iterator(),
+            watermark, expected=active.count(),
+        )
+
+    def reset(self):
+        """Забывает индекс; следующая проверка перестроит его из БД."""
+        with self._rebuild_lock, self._lock:
+            self._loaded = False
+            self._watermark = None
+
+    @maintenance()
+    def ensure_fresh(self):
+        if not self._loaded:
+            with self._rebuild_lock:
+                if not self._loaded:
+                    self.rebuild()
+            return
+        now = time.monotonic()
+        # Плановое перестроение делает один поток, остальные проверяют по старому индексу
+        if now - self._built_at > self.rebuild_interval and self._rebuild_lock.acquire(blocking=False):
+            try:
+                self.rebuild()
+            finally:
+                self._rebuild_lock.release()
+            return
+        if now - self._synced_at > self.refresh_interval and self._lock.acquire(blocking=False):
+            try:
+                self._pull_changes()
+            finally:
+                self._lock.release()
+
+    def _pull_changes(self):
+        """Новые отзывы из других процессов (с запасом на долгие транзакции)."""
+        queryset = TokenRevocation.objects.all()
+        if self._watermark is not None:
+            queryset = queryset.filter(created_at__gte=self._watermark - timedelta(seconds=self.refresh_interval))
+        watermark = self._watermark
+        for jti, user_id, not_before, created_at in queryset.values_list(
+            'jti', 'user_id', 'not_before', 'created_at'
+        ).iterator():
+            self._apply(jti, user_id, not_before)
+            if watermark is None or created_at > watermark:
+                watermark = created_at
+        self._watermark = watermark
+        self._synced_at = time.monotonic()
+        REVOKED_TOKENS.set(len(self._bloom))
+
+    def _apply(self, jti, user_id, not_before):
+        if jti:
+            if jti not in self._bloom:
+                self._bloom.add(jti)
+            self._remember(jti, True)
+        if not_before is not None and not_before > self._cutoffs.get(user_id, -1):
+            self._cutoffs[user_id] = not_before
+
+    def _remember(self, jti, revoked):
+        if jti not in self._exact and len(self._exact) >= self.exact_size:
+            self._exact.pop(next(iter(self._exact)), None)
+        self._exact[jti] = revoked
+
+    def add(self, jti=None, user_id=None, not_before=None):
+        """Отзыв, сделанный в этом процессе: виден сразу, не дожидаясь синхронизации."""
+        with self._lock:
+            self._apply(jti, user_id, not_before)
+
+    # ----- Проверка -----
+
+    def _jti_revoked(self, jti):
+        if jti not in self._bloom:
+            return False
+        revoked = self._exact.get(jti)
+        if revoked is None:
+            REVOCATION_DB_CHECKS.inc()
+            revoked = TokenRevocation.objects.filter(jti=jti).exists()
+            with self._lock:
+                # Синхронизация могла успеть узнать об отзыве раньше нас
+                if not self._exact.get(jti):
+                    self._remember(jti, revoked)
+        return revoked
+
+    def _cut_off(self, token):
+        not_before = self._cutoffs.get(token.get(api_settings.USER_ID_CLAIM))
+        return not_before is not None and token.get('iat', 0) <= not_before
+
+    def is_revoked(self, token):
+        self.ensure_fresh()
+        if self._cut_off(token):
+            return True
+        return any(self._jti_revoked(jti) for jti in (token.get('jti'), token.get('sid')) if jti)
+
+    async def ais_revoked(self, token):
+        """
+        is_revoked для асинхронных представлений. В поток через sync_to_async
+        уходит только то, что требует БД: загрузка или синхронизация индекса
+        и срабатывание фильтра на jti, которого нет в точном кэше.
+        """
+        now = time.monotonic()
+        if (
+            not self._loaded
+            or now - self._synced_at > self.refresh_interval
+            or now - self._built_at > self.rebuild_interval
+        ):
+            return await sync_to_async(self.is_revoked)(token)
+        if self._cut_off(token):
+            return True
+        for jti in (token.get('jti'), token.get('sid')):
+            if jti and jti in self._bloom:
+                revoked = self._exact.get(jti)
+                if revoked is None:
+                    return await sync_to_async(self.is_revoked)(token)
+                if revoked:
+                    return True
+        return False
+
+
+revocation_index = RevocationIndex(
+    capacity=settings.TOKEN_REVOCATION_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_ERROR_RATE,
+    refresh_interval=settings.TOKEN_REVOCATION_REFRESH_INTERVAL,
+    rebuild_interval=settings.TOKEN_REVOCATION_REBUILD_INTERVAL,
+)
+
+
+def _publish(jti=None, user_id=None, not_before=None):
+    transaction.on_commit(lambda: revocation_index.add(jti, user_id, not_before))
+
+
+def revoke_token(token):
+    """
+    Отзывает токен, а если он из сессии (claim sid) — всю сессию: refresh-токен
+    и все выпущенные из него access-токены.
+    """
+    expires_at = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+    jti = token.get('sid')
+    if jti:
+        # Сессия живёт, пока не истёк её refresh-токен
+        issued_at = datetime.fromtimestamp(token['iat'], tz=dt_timezone.utc)
+        expires_at = max(expires_at, issued_at + api_settings.REFRESH_TOKEN_LIFETIME)
+    else:
+        jti = token['jti']
+    TokenRevocation.objects.create(user_id=token[api_settings.USER_ID_CLAIM], jti=jti, expires_at=expires_at)
+    _publish(jti=jti)
+
+
+def revoke_user_tokens(user):
+    """Отзывает все выпущенные к этому моменту токены пользователя."""
+    # Тот же масштаб, что у iat в users.tokens: вход сразу после отзыва уже позже отсечки
+    not_before = round(time.time(), 6)
+    TokenRevocation.objects.create(
+        user=user, not_before=not_before,
+        # Позже любой токен, выпущенный до not_before, истечёт сам
+        expires_at=timezone.now() + max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME),
+    )
+    _publish(user_id=user.pk, not_before=not_before)
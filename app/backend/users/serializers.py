@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.db import transaction
+from .avatars import FEED_AVATAR_SIZE, avatar_url
 from .models import Profile, Skill
 
 User = get_user_model()
@@ -31,7 +33,8 @@ class ProfileSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         skill_ids = validated_data.pop('skill_ids', None)
         if skill_ids is not None:
-            instance.skills.set(Skill.objects.filter(id__in=skill_ids))
+            from .profiles import sync_skills
+            sync_skills(instance, skill_ids)
         return super().update(instance, validated_data)
 
 class UserSerializer(serializers.ModelSerializer):
@@ -46,9 +49,11 @@ class UserSerializer(serializers.ModelSerializer):
     def get_avatar(self, obj):
         """Формирует полный URL для аватара"""
         request = self.context.get('request')
-        if obj.avatar:
-            return request.build_absolute_uri(obj.avatar.url)
-        return None  # Если нет аватара
+        if not obj.avatar:
+            return None  # Если нет аватара
+        if request is None:
+            return obj.avatar.url  # Относительный URL, например для кэша
+        return request.build_absolute_uri(obj.avatar.url)
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
@@ -65,10 +70,41 @@ class RegisterSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('password_confirm')
-        user = User.objects.create_user(**validated_data)
-        Profile.objects.create(user=user)
+        # Хэш может быть посчитан заранее в пуле процессов (users.hashing)
+        password_hash = validated_data.pop('password_hash', None)
+        with transaction.atomic():
+            if password_hash is None:
+                user = User.objects.create_user(**validated_data)
+            else:
+                validated_data.pop('password')
+                user = User(
+                    username=User.normalize_username(validated_data.pop('username')),
+                    email=User.objects.normalize_email(validated_data.pop('email')),
+                    password=password_hash,
+                    **validated_data
+                )
+                user.save()
+            Profile.objects.create(user=user)
         return user
 
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField()
-    password = serializers.CharField(write_only=True)
\ No newline at end of file
+    password = serializers.CharField(write_only=True)
+
+
+class FreelancerSerializer(serializers.ModelSerializer):
+    """Карточка фрилансера в каталоге: профиль плюс логин и аватар."""
+    username = serializers.CharField(source='user.username', read_only=True)
+    avatar = serializers.SerializerMethodField()
+    skills = SkillSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Profile
+        fields = (
+            'id', 'username', 'avatar', 'specialization', 'experience_level',
+            'hourly_rate', 'rating', 'completed_projects', 'available_for_hire', 'skills'
+        )
+        read_only_fields = fields
+
+    def get_avatar(self, obj):
+        return avatar_url(obj.user.avatar, FEED_AVATAR_SIZE, 'webp')
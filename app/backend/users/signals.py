@@ -0,0 +1,94 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .authentication import user_cache
+from .cache import bump_skill_catalogue, invalidate_public_profiles
+from .models import Profile, Skill, User
+from .revocation import revoke_user_tokens
+
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    # Нужен, чтобы при смене логина сбросить кэш и под старым именем.
+    instance._initial_username = instance.username
+    # Через __dict__: при .only() без is_active обращение к полю ушло бы в БД
+    instance._initial_is_active = instance.__dict__.get('is_active')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_profile(sender, instance, **kwargs):
+    invalidate_public_profiles(instance.username, getattr(instance, '_initial_username', None))
+    instance._initial_username = instance.username
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_auth_cache(sender, instance, **kwargs):
+    if instance.is_active and kwargs.get('signal') is post_save:
+        user_cache.invalidate(instance.pk)
+    else:
+        # Отключённый или удалённый пользователь сразу теряет доступ в этом процессе
+        user_cache.mark_inactive(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def revoke_deactivated_user_tokens(sender, instance, created, **kwargs):
+    # Кэш других процессов о деактивации не знает — их останавливает индекс отзывов
+    if not created and getattr(instance, '_initial_is_active', None) and not instance.is_active:
+        revoke_user_tokens(instance)
+    instance._initial_is_active = instance.is_active
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile(sender, instance, **kwargs):
+    invalidate_public_profiles(instance.user.username)
+
+
+@receiver(m2m_changed, sender=Profile.skills.through)
+def invalidate_profile_skills(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_public_profiles(instance.user.username)
+    elif action == 'pre_clear':
+        # После clear() pk_set пуст — затронутые профили собираем заранее.
+        invalidate_public_profiles(*instance.profiles.values_list('user__username', flat=True))
+    elif pk_set:
+        invalidate_public_profiles(
+            *Profile.objects.filter(pk__in=pk_set).values_list('user__username', flat=True)
+        )
+
+
+@receiver(post_save, sender=Skill)
+@receiver(pre_delete, sender=Skill)
+def invalidate_skill_profiles(sender, instance, **kwargs):
+    if kwargs.get('created'):
+        return
+    invalidate_public_profiles(*instance.profiles.values_list('user__username', flat=True))
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def bump_skill_catalogue_version(sender, instance, **kwargs):
+    # После коммита: иначе параллельный запрос успеет закэшировать
+    # под новой версией ещё старое содержимое справочника.
+    transaction.on_commit(bump_skill_catalogue)
+
+
+@receiver(m2m_changed, sender=Profile.skills.through)
+def touch_profile_on_skills_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # Навыки не меняют строку профиля; updated_at сдвигаем сами, чтобы
+    # изменение увидели читатели по updated_at (tasks.matching в других процессах).
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if not reverse:
+        if action != 'pre_clear':
+            Profile.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+    elif action == 'pre_clear':
+        instance.profiles.update(updated_at=timezone.now())
+    elif action != 'post_clear' and pk_set:
+        Profile.objects.filter(pk__in=pk_set).update(updated_at=timezone.now())
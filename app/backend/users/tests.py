@@ -0,0 +1,730 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.db.models import ProtectedError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, RequestFactory, encode_multipart
+from django.urls import path, reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from core.testing import QueryCountAssertionsMixin
+from tasks.models import Task
+from . import async_views
+from .authentication import user_cache
+from .avatars import AVATAR_FORMATS, AVATAR_SIZES, process_avatar
+from .export import profile_export
+from . import ledger
+from .hashing import HashingPool, hashing_pool, make_password_job, trusted_clients
+from .models import LedgerEntry, Profile, Skill, TokenRevocation, User
+from .revocation import RevocationIndex, revocation_index
+from .tokens import PrincipalRefreshToken
+
+
+class UserTestMixin:
+    def make_user(self, username='freelancer', **profile):
+        user = User.objects.create_user(username=username, email=f'{username}@example.com', password='pass')
+        Profile.objects.create(user=user, **profile)
+        return user
+
+
+class PublicProfileCacheTests(QueryCountAssertionsMixin, UserTestMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.viewer = self.make_user('viewer')
+        self.owner = self.make_user('owner', bio='Django developer')
+        self.client.force_authenticate(self.viewer)
+        self.url = reverse('public-profile', args=['owner'])
+
+    def test_query_counts_are_pinned(self):
+        self.owner.profile.skills.add(Skill.objects.create(name='Python'), Skill.objects.create(name='Go'))
+        with self.assertViewQueries('public-profile', 2):
+            self.client.get(self.url)
+        # Пользователь без закэшированного профиля, как после аутентификации по JWT
+        self.client.force_authenticate(User.objects.get(pk=self.viewer.pk))
+        with self.assertViewQueries('profile', 2):
+            self.client.get(reverse('profile'))
+
+    def test_repeat_view_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_if_none_match_returns_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_profile_save_invalidates(self):
+        etag = self.client.get(self.url)['ETag']
+        profile = self.owner.profile
+        profile.bio = 'Python developer'
+        profile.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['profile']['bio'], 'Python developer')
+
+    def test_skill_changes_invalidate(self):
+        skill = Skill.objects.create(name='Python')
+        self.client.get(self.url)
+        self.owner.profile.skills.add(skill)
+        self.assertEqual(self.client.get(self.url).data['profile']['skills'], [{'id': skill.id, 'name': 'Python'}])
+        skill.name = 'Python 3'
+        skill.save()
+        self.assertEqual(self.client.get(self.url).data['profile']['skills'][0]['name'], 'Python 3')
+        skill.profiles.clear()
+        self.assertEqual(self.client.get(self.url).data['profile']['skills'], [])
+
+    def test_username_change_invalidates_old_name(self):
+        self.client.get(self.url)
+        self.owner.username = 'renamed'
+        self.owner.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class ProfileUpdateTests(QueryCountAssertionsMixin, UserTestMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.python, self.django, self.go = (Skill.objects.create(name=name) for name in ('Python', 'Django', 'Go'))
+        self.user = self.make_user('owner', bio='Old bio')
+        self.user.profile.skills.set([self.python, self.django])
+        self.url = reverse('profile')
+
+    def put(self, data):
+        # Свежий экземпляр, как после аутентификации по JWT
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        return self.client.put(self.url, data, format='multipart')
+
+    def test_writes_only_the_skill_diff(self):
+        self.client.force_authenticate(self.user)
+        self.client.get(reverse('public-profile', args=['owner']))
+        updated_at = self.user.profile.updated_at
+        # Профиль, проверка логина, навыки одним запросом, DELETE и INSERT
+        # связей, два UPDATE и точка сохранения транзакции
+        with self.assertViewQueries('profile', 9):
+            response = self.put({
+                'bio': 'New bio', 'username': 'renamed',
+                'skill_ids': [self.django.pk, self.go.pk, 999],
+            })
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['username'], 'renamed')
+        self.assertEqual(response.data['profile']['bio'], 'New bio')
+        expected = [{'id': self.django.pk, 'name': 'Django'}, {'id': self.go.pk, 'name': 'Go'}]
+        self.assertEqual(response.data['profile']['skills'], expected)
+        profile = Profile.objects.get(user=self.user)
+        self.assertEqual(sorted(profile.skills.values_list('pk', flat=True)), [self.django.pk, self.go.pk])
+        self.assertGreater(profile.updated_at, updated_at)
+        self.assertEqual(self.client.get(reverse('public-profile', args=['owner'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('public-profile', args=['renamed'])).data['profile']['skills'], expected)
+
+    def test_unchanged_data_writes_nothing(self):
+        with self.assertViewQueries('profile', 4):
+            response = self.put({'bio': 'Old bio', 'skill_ids': [self.python.pk, self.django.pk]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['profile']['skills']), 2)
+
+    def test_errors_of_both_serializers_are_reported(self):
+        self.make_user('taken')
+        response = self.put({'username': 'taken', 'hourly_rate': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'username', 'hourly_rate'})
+        self.assertEqual(Profile.objects.get(user=self.user).bio, 'Old bio')
+
+
+class PrincipalAuthenticationTests(UserTestMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.user = self.make_user('owner')
+        token = PrincipalRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_read_endpoint_does_not_query_users(self):
+        url = reverse('public-profile', args=['owner'])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_profile_is_loaded_lazily_from_principal(self):
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], 'owner@example.com')
+
+    def test_write_endpoint_gets_full_user(self):
+        response = self.client.post(reverse('task-list'), {
+            'title': 'Задание', 'description': 'Описание', 'budget': '10.00',
+            'deadline': '2030-01-01', 'skills': [],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['author']['username'], 'owner')
+
+    def test_write_ignores_cached_user(self):
+        # Прогреваем кэш, затем меняем строку в обход сигналов, как это
+        # выглядит из другого процесса
+        self.client.get(reverse('public-profile', args=['owner']))
+        self.client.get(reverse('profile'))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(reverse('public-profile', args=['owner'])).status_code, 200)
+        response = self.client.patch(reverse('profile'), {'bio': 'новое'}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse('public-profile', args=['owner']))
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivation_reaches_processes_without_cache(self):
+        self.addCleanup(revocation_index.reset)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        # Другой процесс: в его кэше пользователя нет, токен — из claims
+        user_cache.clear()
+        response = self.client.get(reverse('public-profile', args=['owner']))
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(TokenRevocation.objects.filter(user=self.user, not_before__isnull=False).exists())
+
+    def test_expired_cache_entry_rechecks_is_active(self):
+        url = reverse('public-profile', args=['owner'])
+        self.client.get(reverse('profile'))
+        # Деактивация в обход сигналов, как её видит другой процесс
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with mock.patch('users.authentication.time.monotonic', return_value=time.monotonic() + user_cache.ttl + 1):
+            self.assertEqual(self.client.get(url).status_code, 401)
+
+
+class TokenRevocationTests(QueryCountAssertionsMixin, UserTestMixin, APITestCase):
+    def setUp(self):
+        user_cache.clear()
+        revocation_index.reset()
+        self.user = self.make_user('owner')
+        self.refresh = PrincipalRefreshToken.for_user(self.user)
+        self.url = reverse('public-profile', args=['owner'])
+
+    def authorize(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_logout_revokes_session(self):
+        access = self.refresh.access_token
+        self.authorize(access)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        # Проверка неотозванного токена не ходит в БД
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        other_session = PrincipalRefreshToken.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True), self.assertViewQueries('logout', 2):
+            response = self.client.post(reverse('logout'), {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(TokenRevocation.objects.count(), 1)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        refreshed = self.client.post(reverse('token_refresh'), {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(refreshed.status_code, 401)
+
+        self.authorize(other_session.access_token)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        refreshed = self.client.post(reverse('token_refresh'), {'refresh': str(other_session)}, format='json')
+        self.assertEqual(refreshed.status_code, 200)
+
+    def test_logout_rejects_foreign_refresh(self):
+        self.authorize(self.refresh.access_token)
+        foreign = PrincipalRefreshToken.for_user(self.make_user('stranger'))
+        with self.assertViewQueries('logout', 1):
+            response = self.client.post(reverse('logout'), {'refresh': str(foreign)}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TokenRevocation.objects.exists())
+
+    def test_logout_all_revokes_previously_issued_tokens(self):
+        self.authorize(self.refresh.access_token)
+        with self.captureOnCommitCallbacks(execute=True), self.assertViewQueries('logout-all', 2):
+            self.assertEqual(self.client.post(reverse('logout-all')).status_code, 204)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        not_before = TokenRevocation.objects.get().not_before
+        later = {'user_id': self.user.pk, 'iat': not_before + 1, 'jti': 'later'}
+        self.assertFalse(revocation_index.is_revoked(later))
+
+    def test_login_in_the_same_second_survives_logout_all(self):
+        self.authorize(self.refresh.access_token)
+        with self.captureOnCommitCallbacks(execute=True), mock.patch('time.time', return_value=1_700_000_000.25):
+            self.client.post(reverse('logout-all'))
+        self.assertEqual(TokenRevocation.objects.get().not_before, 1_700_000_000.25)
+        # Вход в ту же секунду, но уже после отзыва
+        issued_at = datetime.fromtimestamp(1_700_000_000.75, tz=dt_timezone.utc)
+        with mock.patch('rest_framework_simplejwt.tokens.aware_utcnow', return_value=issued_at):
+            fresh = PrincipalRefreshToken.for_user(self.user)
+        self.assertFalse(revocation_index.is_revoked(fresh))
+        self.assertFalse(revocation_index.is_revoked(fresh.access_token))
+        self.assertTrue(revocation_index.is_revoked({'user_id': self.user.pk, 'iat': 1_700_000_000, 'jti': 'before'}))
+
+    def test_index_syncs_revocations_from_other_processes(self):
+        index = RevocationIndex(capacity=100, refresh_interval=0)
+        token = PrincipalRefreshToken.for_user(self.user)
+        self.assertFalse(index.is_revoked(token))
+        # Строка, записанная другим процессом
+        TokenRevocation.objects.create(
+            user=self.user, jti=token['jti'], expires_at=timezone.now() + timedelta(days=1)
+        )
+        self.assertTrue(index.is_revoked(token))
+        self.assertTrue(index.is_revoked(token.access_token))
+        # Перестроение забывает истёкшие отзывы
+        TokenRevocation.objects.update(expires_at=timezone.now())
+        index.reset()
+        self.assertFalse(index.is_revoked(token))
+
+
+class AsyncReadURLs:
+    """Те же URL, что в users.urls при ASYNC_READ_VIEWS (под core.asgi)."""
+    urlpatterns = [
+        path('api/auth/profile/', async_views.profile, name='profile'),
+        path('api/auth/profile/<str:username>/', async_views.public_profile, name='public-profile'),
+        path('api/auth/skills/', async_views.skills, name='skills'),
+    ]
+
+
+class AsyncReadViewTests(QueryCountAssertionsMixin, UserTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        revocation_index.reset()
+        self.user = self.make_user('owner', bio='Django developer')
+        self.user.profile.skills.add(Skill.objects.create(name='Python'), Skill.objects.create(name='Go'))
+        self.access = PrincipalRefreshToken.for_user(self.user).access_token
+        self.headers = {'Authorization': f'Bearer {self.access}'}
+
+    async def get_both(self, path, **headers):
+        """Ответы синхронного DRF-view и асинхронного представления на один GET."""
+        headers = {**self.headers, **headers}
+        expected = await sync_to_async(self.client.get)(path, headers=headers)
+        with override_settings(ROOT_URLCONF=AsyncReadURLs):
+            actual = await self.async_client.get(path, headers=headers)
+        return expected, actual
+
+    def assertSameResponse(self, expected, actual):
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+        for header in ('ETag', 'Last-Modified', 'Cache-Control', 'WWW-Authenticate'):
+            self.assertEqual(actual.get(header), expected.get(header), header)
+
+    async def test_responses_match_sync_views(self):
+        for path in (
+            '/api/auth/profile/', '/api/auth/profile/owner/', '/api/auth/profile/nobody/',
+            '/api/auth/skills/', '/api/auth/skills/?prefix=p&limit=1',
+        ):
+            with self.subTest(path=path):
+                self.assertSameResponse(*await self.get_both(path))
+
+    async def test_conditional_get_and_auth_errors(self):
+        expected, _ = await self.get_both('/api/auth/profile/owner/')
+        self.assertSameResponse(*await self.get_both('/api/auth/profile/owner/', **{'If-None-Match': expected['ETag']}))
+        self.assertEqual(expected.status_code, 200)
+        self.assertSameResponse(*await self.get_both('/api/auth/skills/', Authorization=''))
+        self.assertSameResponse(*await self.get_both('/api/auth/skills/', Authorization='Bearer broken'))
+
+        revocation_index.add(jti=self.access['sid'])
+        expected, actual = await self.get_both('/api/auth/skills/')
+        self.assertEqual(actual.status_code, 401)
+        self.assertSameResponse(expected, actual)
+
+    async def test_query_counts_are_pinned(self):
+        await self.get_both('/api/auth/profile/owner/')
+        with override_settings(ROOT_URLCONF=AsyncReadURLs):
+            # Проверка токена и закэшированный профиль — без БД
+            with self.assertViewQueries('public-profile', 0):
+                await self.async_client.get('/api/auth/profile/owner/', headers=self.headers)
+            # Пользователь с профилем одним запросом, навыки — prefetch
+            with self.assertViewQueries('profile', 2):
+                await self.async_client.get('/api/auth/profile/', headers=self.headers)
+
+    async def test_other_methods_go_to_sync_view(self):
+        with override_settings(ROOT_URLCONF=AsyncReadURLs):
+            response = await self.async_client.put(
+                '/api/auth/profile/', encode_multipart(BOUNDARY, {'bio': 'Updated'}),
+                content_type=MULTIPART_CONTENT, headers=self.headers
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['profile']['bio'], 'Updated')
+
+
+class AsyncLoginRegisterTests(UserTestMixin, APITestCase):
+    def test_register_then_login(self):
+        response = self.client.post(reverse('register'), {
+            'username': 'newbie', 'email': 'newbie@example.com',
+            'password': 'S3cure-pass-42', 'password_confirm': 'S3cure-pass-42',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(Profile.objects.filter(user__username='newbie').exists())
+
+        response = self.client.post(reverse('login'), {
+            'username': 'newbie', 'password': 'S3cure-pass-42'
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['user']['username'], 'newbie')
+        self.assertIn('token', response.json())
+
+    def test_wrong_password_is_unauthorized(self):
+        self.make_user('owner')
+        response = self.client.post(reverse('login'), {'username': 'owner', 'password': 'nope'}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(TRUSTED_PROXIES=['127.0.0.1'])
+    def test_client_ip_comes_from_trusted_proxy_only(self):
+        factory = RequestFactory()
+        request = factory.post('/', REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='10.0.0.1, 203.0.113.5')
+        self.assertEqual(async_views.client_ip(request), '203.0.113.5')
+        # Заголовок от клиента напрямую игнорируется
+        request = factory.post('/', REMOTE_ADDR='198.51.100.7', HTTP_X_FORWARDED_FOR='203.0.113.5')
+        self.assertEqual(async_views.client_ip(request), '198.51.100.7')
+        self.assertIsNone(async_views.client_key(factory.post('/', REMOTE_ADDR='127.0.0.1'), 'owner'))
+
+    @override_settings(TRUSTED_PROXIES=['127.0.0.1'])
+    def test_trust_needs_same_account_and_ip(self):
+        self.addCleanup(trusted_clients._entries.clear)
+        self.make_user('owner')
+        self.make_user('victim')
+
+        def login(username, ip):
+            with mock.patch.object(hashing_pool, 'run', wraps=hashing_pool.run) as run:
+                self.client.post(
+                    reverse('login'), {'username': username, 'password': 'pass'},
+                    format='json', REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR=ip,
+                )
+            return run.call_args.kwargs['trusted']
+
+        self.assertFalse(login('owner', '203.0.113.5'))
+        self.assertTrue(login('owner', '203.0.113.5'))
+        # Ни чужой аккаунт с того же адреса, ни тот же аккаунт с другого
+        self.assertFalse(login('victim', '203.0.113.5'))
+        self.assertFalse(login('owner', '198.51.100.7'))
+
+    def test_full_queue_returns_429_with_retry_after(self):
+        self.make_user('owner')
+        with mock.patch.object(hashing_pool, 'max_queue', 0), mock.patch.object(hashing_pool, 'reserved', 0):
+            response = self.client.post(reverse('login'), {'username': 'owner', 'password': 'pass'}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+
+class HashingPoolTests(SimpleTestCase):
+    def test_dead_worker_does_not_break_later_jobs(self):
+        pool = HashingPool(workers=1, max_queue=4, reserved=0)
+        self.addCleanup(lambda: pool._executor and pool._executor.shutdown())
+        dying = pool.submit('check', os._exit, 1)
+        waiting = [pool.submit('make', make_password_job, 'secret') for _ in range(2)]
+        with self.assertRaises(BrokenProcessPool):
+            dying.result(timeout=60)
+        # Ожидавшие задачи и новые после поломки выполняются в новом пуле
+        waiting.append(pool.submit('make', make_password_job, 'secret'))
+        for future in waiting:
+            self.assertTrue(future.result(timeout=60).startswith('pbkdf2_sha256$'))
+        self.assertEqual(pool.depth, 0)
+
+
+class AvatarUploadTests(UserTestMixin, APITestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        cache.clear()
+        overrides = override_settings(MEDIA_ROOT=media_root, AVATAR_PROCESSING='inline')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.media_root = media_root
+        self.user = self.make_user('owner')
+        self.client.force_authenticate(self.user)
+
+    def image_upload(self, size=(800, 600)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'PNG')
+        return SimpleUploadedFile('avatar.png', buffer.getvalue(), content_type='image/png')
+
+    def test_upload_produces_content_addressed_variants(self):
+        response = self.client.post(reverse('upload-avatar'), {'avatar': self.image_upload()}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        self.user.refresh_from_db()
+        self.assertEqual(response.data['status'], 'ready')
+        self.assertEqual(response.data['avatar'], self.user.avatar.url)
+        directory = os.path.dirname(self.user.avatar.path)
+        self.assertEqual(
+            sorted(os.listdir(directory)),
+            sorted(f'{size}.{ext}' for size in AVATAR_SIZES for ext in AVATAR_FORMATS)
+        )
+
+    @override_settings(AVATAR_PROCESSING='thread')
+    def test_pending_upload_returns_poll_location_instead_of_url(self):
+        with mock.patch('users.avatars._executor.submit') as submit:
+            response = self.client.post(reverse('upload-avatar'), {'avatar': self.image_upload()}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertNotIn('avatar', response.data)
+        self.assertEqual(response['Location'], response.data['location'])
+        pending = self.client.get(response['Location'])
+        self.assertEqual((pending.data['status'], pending['Retry-After']), ('pending', '1'))
+
+        _, user_id, path, digest = submit.call_args.args
+        process_avatar(user_id, path, digest)
+        ready = self.client.get(response['Location'])
+        self.assertEqual(ready.data['status'], 'ready')
+        self.assertEqual(self.client.get(ready.data['avatar']).status_code, 200)
+
+    def test_failed_processing_is_reported(self):
+        with mock.patch('users.avatars.render_variants', side_effect=OSError('broken')), \
+                self.assertLogs('users.avatars', 'ERROR'):
+            response = self.client.post(reverse('upload-avatar'), {'avatar': self.image_upload()}, format='multipart')
+        self.assertEqual(response.data['status'], 'failed')
+        self.assertEqual(self.client.get(response['Location']).data['status'], 'failed')
+        self.assertEqual(self.client.get(reverse('avatar-status', args=['0' * 64])).status_code, 404)
+
+    def test_feed_uses_small_variant(self):
+        self.client.post(reverse('upload-avatar'), {'avatar': self.image_upload()}, format='multipart')
+        Task.objects.create(author=self.user, title='T', description='D', budget='1.00', deadline='2030-01-01')
+        item = self.client.get(reverse('task-list')).data['results'][0]
+        self.assertTrue(item['author']['avatar'].endswith('/128.webp'))
+
+    def test_rejects_malformed_content_length(self):
+        response = self.client.post(
+            reverse('upload-avatar'), {'avatar': self.image_upload()}, format='multipart', CONTENT_LENGTH='abc'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(AVATAR_MAX_PIXELS=640 * 480)
+    def test_rejects_too_many_pixels_before_queueing(self):
+        with mock.patch('users.views.submit_avatar') as submit:
+            response = self.client.post(reverse('upload-avatar'), {'avatar': self.image_upload()}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        submit.assert_not_called()
+
+    def test_rejects_non_images(self):
+        upload = SimpleUploadedFile('avatar.jpg', b'not an image', content_type='image/jpeg')
+        response = self.client.post(reverse('upload-avatar'), {'avatar': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.avatar)
+
+
+class SkillCatalogueTests(QueryCountAssertionsMixin, UserTestMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        for name in ('Python', 'PyTorch', 'Django', 'postgres'):
+            Skill.objects.create(name=name)
+        self.client.force_authenticate(self.make_user('viewer'))
+        self.url = reverse('skills')
+
+    def test_catalogue_is_sorted_and_cached(self):
+        with self.assertViewQueries('skills', 1):
+            first = self.client.get(self.url)
+        self.assertEqual([item['name'] for item in first.data], ['Django', 'postgres', 'Python', 'PyTorch'])
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIn('Last-Modified', second)
+
+    def test_conditional_get(self):
+        first = self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304
+        )
+
+    def test_write_bumps_version(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(name='Pandas')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Pandas', [item['name'] for item in response.data])
+
+    def test_prefix_autocomplete(self):
+        response = self.client.get(self.url, {'prefix': 'py'})
+        self.assertEqual([item['name'] for item in response.data], ['Python', 'PyTorch'])
+        response = self.client.get(self.url, {'prefix': 'P', 'limit': 1})
+        self.assertEqual([item['name'] for item in response.data], ['postgres'])
+
+
+class FreelancerCatalogueTests(QueryCountAssertionsMixin, UserTestMixin, APITestCase):
+    def setUp(self):
+        self.python = Skill.objects.create(name='Python')
+        self.django = Skill.objects.create(name='Django')
+        self.url = reverse('freelancer-list')
+        self.client.force_authenticate(self.make_user('viewer', available_for_hire=False))
+
+    def make_freelancer(self, username, skills=(), **profile):
+        user = self.make_user(username, **profile)
+        user.profile.skills.set(skills)
+        return user.profile
+
+    def usernames(self, response):
+        return [item['username'] for item in response.data['results']]
+
+    def test_ranked_by_rating_then_completed_projects(self):
+        self.make_freelancer('middle', rating='4.50', completed_projects=3)
+        self.make_freelancer('top', rating='4.90', completed_projects=1)
+        self.make_freelancer('seasoned', rating='4.50', completed_projects=10)
+        response = self.client.get(self.url, {'available': 'true'})
+        self.assertEqual(self.usernames(response), ['top', 'seasoned', 'middle'])
+
+    def test_filters(self):
+        self.make_freelancer('both', [self.python, self.django], hourly_rate='40', experience_level='expert')
+        self.make_freelancer('python', [self.python], hourly_rate='20', experience_level='expert')
+        self.make_freelancer('cheap', [self.django], hourly_rate='5', experience_level='beginner')
+        self.assertEqual(
+            sorted(self.usernames(self.client.get(self.url, {'skills': 'python,django', 'match': 'all'}))),
+            ['both']
+        )
+        self.assertEqual(
+            sorted(self.usernames(self.client.get(self.url, {'rate_min': '10', 'experience_level': 'expert'}))),
+            ['both', 'python']
+        )
+        self.assertEqual(
+            self.client.get(self.url, {'experience_level': 'guru'}).status_code, 400
+        )
+
+    def test_page_costs_constant_queries(self):
+        for index in range(60):
+            self.make_freelancer(f'dev{index}', [self.python, self.django], rating='4.00')
+        with self.assertViewQueries('freelancer-list', 3):
+            response = self.client.get(self.url, {'page_size': 50, 'skills': 'python'})
+        self.assertEqual(len(response.data['results']), 50)
+        next_page = self.client.get(response.data['next'])
+        self.assertEqual(len(next_page.data['results']), 10)
+
+
+    def test_export_adds_skills_once_per_chunk(self):
+        self.make_freelancer('both', [self.python, self.django])
+        self.make_freelancer('python', [self.python])
+        self.make_freelancer('none')
+        # Четыре профиля пачками по два: курсор и по запросу навыков на пачку
+        with self.assertNumQueries(3):
+            content = b''.join(profile_export.stream('ndjson', chunk_size=2)).decode()
+        rows = {row['username']: row for row in map(json.loads, content.splitlines())}
+        self.assertEqual(rows['both']['skills'], ['Django', 'Python'])
+        self.assertEqual(rows['none']['skills'], [])
+
+        url = reverse('freelancer-export')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        User.objects.filter(username='viewer').update(is_staff=True)
+        self.client.force_authenticate(User.objects.get(username='viewer'))
+        response = self.client.get(url, {'output': 'csv'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="profiles.csv"')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 5)
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com')
+        ledger.deposit(self.alice.pk, '100.00')
+
+    def balance(self, user):
+        return User.objects.values_list('balance', flat=True).get(pk=user.pk)
+
+    def test_transfer_writes_both_legs(self):
+        operation = ledger.transfer(self.alice.pk, self.bob.pk, Decimal('30.50'), memo='task #1')
+        self.assertEqual(self.balance(self.alice), Decimal('69.50'))
+        self.assertEqual(self.balance(self.bob), Decimal('30.50'))
+        entries = LedgerEntry.objects.filter(operation=operation).order_by('amount')
+        self.assertEqual(
+            [(entry.user_id, entry.amount, entry.balance_after) for entry in entries],
+            [(self.alice.pk, Decimal('-30.50'), Decimal('69.50')), (self.bob.pk, Decimal('30.50'), Decimal('30.50'))]
+        )
+
+    def test_rejects_overdraft_and_bad_amounts(self):
+        with self.assertRaises(ledger.InsufficientFunds):
+            ledger.transfer(self.alice.pk, self.bob.pk, '100.01')
+        for amount in ('0', '-1', '0.001', 'nan', 'ten'):
+            with self.assertRaises(ledger.LedgerError):
+                ledger.transfer(self.alice.pk, self.bob.pk, amount)
+        with self.assertRaises(ledger.LedgerError):
+            ledger.transfer(self.alice.pk, self.alice.pk, '1')
+        self.assertEqual(self.balance(self.alice), Decimal('100.00'))
+        self.assertEqual(LedgerEntry.objects.count(), 1)
+
+    def test_entries_are_append_only(self):
+        entry = LedgerEntry.objects.get()
+        entry.amount = Decimal('1')
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.delete()
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        call_command('reconcile_balances', stdout=io.StringIO())
+        User.objects.filter(pk=self.bob.pk).update(balance='5.00')
+        with self.assertRaises(CommandError):
+            call_command('reconcile_balances', stdout=io.StringIO())
+        call_command('reconcile_balances', '--fix', stdout=io.StringIO())
+        self.assertEqual(self.balance(self.bob), Decimal('0.00'))
+
+    def test_close_account_keeps_ledger_consistent(self):
+        # Журнал ссылается на пользователя: удалить его напрямую нельзя
+        with self.assertRaises(ProtectedError):
+            self.alice.delete()
+        Profile.objects.create(user=self.alice, bio='Python')
+        self.addCleanup(revocation_index.reset)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertFalse(ledger.close_account(self.alice.pk))
+        alice = User.objects.get(pk=self.alice.pk)
+        self.assertEqual((alice.username, alice.email), (f'deleted-{alice.pk}', f'deleted-{alice.pk}@invalid'))
+        self.assertFalse(alice.is_active)
+        self.assertFalse(alice.has_usable_password())
+        self.assertFalse(Profile.objects.filter(user=alice).exists())
+        self.assertTrue(TokenRevocation.objects.filter(user=alice, not_before__isnull=False).exists())
+        self.assertEqual(alice.balance, Decimal('100.00'))
+        call_command('reconcile_balances', stdout=io.StringIO())
+
+        # Без проводок пользователь удаляется целиком
+        call_command('close_account', 'bob', stdout=io.StringIO())
+        self.assertFalse(User.objects.filter(pk=self.bob.pk).exists())
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class LedgerConcurrencyTests(TransactionTestCase):
+    def test_concurrent_transfers_lose_no_updates(self):
+        users = [
+            User.objects.create_user(username=f'account{index}', email=f'account{index}@example.com')
+            for index in range(3)
+        ]
+        for user in users:
+            ledger.deposit(user.pk, '1000.00')
+        errors = []
+
+        def worker(offset):
+            try:
+                # Потоки гоняют деньги по кругу в разные стороны — встречные блокировки
+                for step in range(30):
+                    sender = users[(offset + step) % 3]
+                    recipient = users[(offset + step + 1 + offset % 2) % 3]
+                    ledger.transfer(sender.pk, recipient.pk, '1.00')
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(LedgerEntry.objects.filter(kind=LedgerEntry.KIND_TRANSFER).count(), 8 * 30 * 2)
+        self.assertEqual(sum(User.objects.values_list('balance', flat=True)), Decimal('3000.00'))
+        call_command('reconcile_balances', stdout=io.StringIO())
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.conf import settings
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, Token
+from rest_framework_simplejwt.utils import datetime_to_epoch
+
+from .revocation import revocation_index
+
+
+class SubsecondIatMixin:
+    """
+    iat с точностью до микросекунды (NumericDate в JWT может быть дробным).
+    С целыми секундами вход в ту же секунду, что и «выйти со всех
+    устройств», попадал под отсечку not_before (users.revocation).
+    """
+
+    def set_iat(self, claim='iat', at_time=None):
+        if at_time is None:
+            at_time = self.current_time
+        self.payload[claim] = datetime_to_epoch(at_time) + at_time.microsecond / 1_000_000
+
+
+class PrincipalRefreshToken(SubsecondIatMixin, RefreshToken):
+    """
+    Refresh-токен с данными пользователя в claims. Access-токен наследует их,
+    поэтому PrincipalJWTAuthentication собирает пользователя без запроса к БД.
+    Claim sid (jti refresh-токена) связывает access-токены с сессией, чтобы
+    их можно было отозвать вместе с ней (users.revocation). Дробный iat
+    refresh-токена access-токены копируют вместе с остальными claims.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['username'] = user.username
+        token['avatar'] = user.avatar.url if user.avatar else None
+        token['sid'] = token['jti']
+        return token
+
+
+class PrincipalTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = PrincipalRefreshToken
+
+
+class PrincipalTokenRefreshSerializer(TokenRefreshSerializer):
+    """Обновление access-токена только по неотозванному refresh-токену."""
+
+    def validate(self, attrs):
+        if revocation_index.is_revoked(self.token_class(attrs['refresh'])):
+            raise InvalidToken('Токен отозван')
+        return super().validate(attrs)
+
+
+class StreamToken(SubsecondIatMixin, Token):
+    """
+    Короткоживущий токен только для потока заданий (tasks.async_views):
+    EventSource не умеет задавать заголовки, и токен передаётся в URL, где
+    его видят логи прокси и Referer. Полный access-токен туда не попадает;
+    sid исходного токена сохраняется, поэтому отзыв сессии гасит и этот.
+    """
+    token_type = 'stream'
+    lifetime = timedelta(seconds=settings.TASK_STREAM_TOKEN_LIFETIME)
+
+    @classmethod
+    def for_user_id(cls, user_id, access=None):
+        token = cls()
+        token[api_settings.USER_ID_CLAIM] = user_id
+        if access is not None and access.get('sid'):
+            token['sid'] = access['sid']
+        return token
+
@@ -1,11 +1,25 @@
-from django.urls import path
-from . import views
+from django.conf import settings
+from django.urls import path, re_path
+from . import async_views, views
+
+# Под core.asgi GET профиля и справочника обслуживают асинхронные представления
+if settings.ASYNC_READ_VIEWS:
+    profile_view, public_profile_view, skills_view = (
+        async_views.profile, async_views.public_profile, async_views.skills
+    )
+else:
+    profile_view, public_profile_view, skills_view = (
+        views.profile_view, views.public_profile_view, views.get_skills
+    )
 
 urlpatterns = [
-    path('register/', views.register_user, name='register'),
-    path('login/', views.login_user, name='login'),
-    path('profile/', views.profile_view, name='profile'),
-    path('profile/<str:username>/', views.public_profile_view, name='public-profile'),
-    path('skills/', views.get_skills, name='skills'),
+    path('register/', async_views.register_user, name='register'),
+    path('login/', async_views.login_user, name='login'),
+    path('logout/', views.logout_view, name='logout'),
+    path('logout-all/', views.logout_all_view, name='logout-all'),
+    path('profile/', profile_view, name='profile'),
+    path('profile/<str:username>/', public_profile_view, name='public-profile'),
+    path('skills/', skills_view, name='skills'),
     path('upload-avatar/', views.UploadAvatarView.as_view(), name='upload-avatar'),
+    re_path(r'^upload-avatar/(?P<digest>[0-9a-f]{64})/$', views.AvatarStatusView.as_view(), name='avatar-status'),
 ]
\ No newline at end of file
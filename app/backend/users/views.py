@@ -1,49 +1,32 @@
-from rest_framework import status
+from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
-from .serializers import (
-    UserSerializer, RegisterSerializer, LoginSerializer,
-    ProfileSerializer, SkillSerializer
+from django.urls import reverse
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.export import ExportNegotiation
+from core.pagination import KeysetPagination
+from .serializers import FreelancerSerializer, UserSerializer, ProfileSerializer
+from .avatars import (
+    AVATAR_FAILED, AVATAR_READY, AVATAR_SIZES, AvatarError, get_avatar_status,
+    stage_upload, submit_avatar, variant_name,
 )
-from .models import User, Skill
-
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def register_user(request):
-    serializer = RegisterSerializer(data=request.data)
-    if serializer.is_valid():
-        user = serializer.save()
-        return Response({
-            "message": "Регистрация успешна",
-            "user": UserSerializer(user).data
-        }, status=status.HTTP_201_CREATED)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def login_user(request):
-    serializer = LoginSerializer(data=request.data)
-    if serializer.is_valid():
-        user = authenticate(
-            username=serializer.validated_data['username'],
-            password=serializer.validated_data['password']
-        )
-        if user:
-            refresh = RefreshToken.for_user(user)
-            return Response({
-                'token': str(refresh.access_token),
-                'user': UserSerializer(user, context={'request': request}).data  # добавили context
-            })
-        return Response({
-            "message": "Неверные учетные данные"
-        }, status=status.HTTP_401_UNAUTHORIZED)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+from .cache import etag_matches, get_public_profile, get_skill_catalogue, set_public_profile
+from .export import profile_export
+from .filters import FreelancerFilterBackend, ProfileSkillFilterBackend, get_freelancer_ordering
+from .models import Profile, User, Skill
+from .profiles import update_profile
+from .revocation import revoke_token, revoke_user_tokens
 
 @api_view(['GET', 'PUT'])
 @permission_classes([IsAuthenticated])
@@ -56,32 +39,120 @@ def profile_view(request):
     elif request.method == 'PUT':
         user_serializer = UserSerializer(request.user, data=request.data, partial=True, context={'request': request})
         profile_serializer = ProfileSerializer(request.user.profile, data=request.data, partial=True)
-        
-        if user_serializer.is_valid() and profile_serializer.is_valid():
-            user_serializer.save()
-            profile_serializer.save()
-            return Response(user_serializer.data)
-        
+
         errors = {}
         if not user_serializer.is_valid():
             errors.update(user_serializer.errors)
         if not profile_serializer.is_valid():
             errors.update(profile_serializer.errors)
-        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
-    
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        user = update_profile(request.user, user_serializer, profile_serializer)
+        return Response(UserSerializer(user, context={'request': request}).data)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def public_profile_view(request, username):
-    user = get_object_or_404(User, username=username)
-    serializer = UserSerializer(user, context={'request': request})
-    return Response(serializer.data)
+    entry = get_public_profile(username)
+    if entry is None:
+        user = get_object_or_404(
+            User.objects.select_related('profile').prefetch_related('profile__skills'),
+            username=username
+        )
+        # Без request аватар остаётся относительным — кэш не зависит от хоста
+        entry = set_public_profile(username, UserSerializer(user).data)
+    status_code, data, headers = public_profile_payload(request, entry)
+    return Response(data, status=status_code, headers=headers)
+
+
+def public_profile_payload(request, entry):
+    """Статус, данные и заголовки ответа по записи кэша публичного профиля."""
+    headers = {'ETag': entry['etag'], 'Cache-Control': 'private, no-cache'}
+    if etag_matches(request, entry['etag']):
+        return status.HTTP_304_NOT_MODIFIED, None, headers
+
+    data = dict(entry['data'])
+    if data.get('avatar'):
+        data['avatar'] = request.build_absolute_uri(data['avatar'])
+    return status.HTTP_200_OK, data, headers
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout_view(request):
+    """
+    Выход: отзывает сессию текущего access-токена и переданный refresh-токен
+    ({"refresh": ...}, необязателен).
+    """
+    tokens = [request.auth] if request.auth is not None else []
+    if request.data.get('refresh'):
+        try:
+            refresh = RefreshToken(request.data['refresh'])
+        except TokenError as exc:
+            return Response({'refresh': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        if refresh.get(jwt_settings.USER_ID_CLAIM) != request.user.pk:
+            return Response({'refresh': ['Токен другого пользователя']}, status=status.HTTP_400_BAD_REQUEST)
+        tokens.append(refresh)
+
+    revoked = set()
+    for token in tokens:
+        jti = token.get('sid') or token['jti']
+        if jti not in revoked:
+            revoke_token(token)
+            revoked.add(jti)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout_all_view(request):
+    """Выход на всех устройствах: отзывает все выпущенные токены пользователя."""
+    revoke_user_tokens(request.user)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+SKILL_PREFIX_LIMIT = 20
+SKILL_PREFIX_MAX_LIMIT = 50
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_skills(request):
-    skills = Skill.objects.all()
-    serializer = SkillSerializer(skills, many=True)
-    return Response(serializer.data)
+    """
+    Справочник навыков, отсортированный по названию. ?prefix=py — подсказки
+    по началу названия (не больше ?limit=, по умолчанию 20).
+    """
+    catalogue = get_skill_catalogue(load_skill_catalogue)
+    status_code, data, headers = skill_catalogue_payload(request, catalogue)
+    return Response(data, status=status_code, headers=headers)
+
+
+def load_skill_catalogue():
+    return list(Skill.objects.values('id', 'name'))
+
+
+def skill_catalogue_payload(request, catalogue):
+    """Статус, данные и заголовки ответа справочника навыков."""
+    headers = {
+        'ETag': catalogue.etag,
+        'Last-Modified': http_date(catalogue.modified),
+        'Cache-Control': 'private, no-cache',
+    }
+    if request.headers.get('If-None-Match'):
+        not_modified = etag_matches(request, catalogue.etag)
+    else:
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        not_modified = since is not None and catalogue.modified <= since
+    if not_modified:
+        return status.HTTP_304_NOT_MODIFIED, None, headers
+
+    prefix = request.GET.get('prefix', '').strip()
+    if not prefix:
+        return status.HTTP_200_OK, catalogue.items, headers
+    try:
+        limit = min(max(int(request.GET.get('limit', SKILL_PREFIX_LIMIT)), 1), SKILL_PREFIX_MAX_LIMIT)
+    except ValueError:
+        limit = SKILL_PREFIX_LIMIT
+    return status.HTTP_200_OK, catalogue.prefixed(prefix, limit), headers
 
 
 class UploadAvatarView(APIView):
@@ -89,10 +160,89 @@ class UploadAvatarView(APIView):
     parser_classes = (MultiPartParser, FormParser)
 
     def post(self, request, *args, **kwargs):
-        user = request.user
-        if 'avatar' in request.FILES:
-            avatar = request.FILES['avatar']
-            user.avatar.save(f'avatars/{user.id}.jpg', avatar)
-            user.save()
-            return Response({'avatar': user.avatar.url}, status=200)
-        return Response({'error': 'Файл не загружен'}, status=400)
\ No newline at end of file
+        # Загрузка пишется на диск, а не в память, и сразу отсекается по размеру
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'error': 'Некорректный заголовок Content-Length'}, status=400)
+        if content_length > settings.AVATAR_MAX_UPLOAD_SIZE + 64 * 1024:
+            return Response({'error': 'Файл слишком большой'}, status=413)
+        request._request.upload_handlers = [TemporaryFileUploadHandler(request._request)]
+
+        if 'avatar' not in request.FILES:
+            return Response({'error': 'Файл не загружен'}, status=400)
+        try:
+            path, digest = stage_upload(request.FILES['avatar'])
+        except AvatarError as exc:
+            return Response({'error': str(exc)}, status=400)
+
+        submit_avatar(request.user.pk, path, digest)
+        response = avatar_status_response(digest, get_avatar_status(request.user.pk, digest))
+        response.status_code = 202
+        response['Location'] = response.data['location']
+        return response
+
+
+def avatar_status_response(digest, avatar_status):
+    """
+    Статус обработки аватара. URL варианта отдаётся только в ready: до этого
+    он отвечает 404, а после — кэшируется навсегда, и CDN не должна увидеть 404.
+    """
+    data = {'status': avatar_status, 'location': reverse('avatar-status', args=[digest])}
+    headers = {'Cache-Control': 'no-store'}
+    if avatar_status == AVATAR_READY:
+        data['avatar'] = default_storage.url(variant_name(digest, max(AVATAR_SIZES)))
+    elif avatar_status == AVATAR_FAILED:
+        data['error'] = 'Не удалось обработать изображение'
+    else:
+        headers['Retry-After'] = '1'
+    return Response(data, headers=headers)
+
+
+class AvatarStatusView(APIView):
+    """Опрос фоновой обработки аватара, загруженного UploadAvatarView."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, digest):
+        avatar_status = get_avatar_status(request.user.pk, digest)
+        if avatar_status is None:
+            # Статус истёк, но аватар мог быть обработан
+            if request.user.avatar.name != variant_name(digest, max(AVATAR_SIZES)):
+                return Response({'error': 'Загрузка не найдена'}, status=404)
+            avatar_status = AVATAR_READY
+        return avatar_status_response(digest, avatar_status)
+
+
+class FreelancerListView(generics.ListAPIView):
+    """
+    Каталог фрилансеров: фильтры users.filters, ранжирование по рейтингу и
+    числу выполненных проектов, keyset-пагинация. Страница любого размера —
+    три запроса: профили с пользователями, навыки одним prefetch и, при
+    ?skills=, сопоставление названий навыков.
+    """
+    serializer_class = FreelancerSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_backends = [FreelancerFilterBackend, ProfileSkillFilterBackend]
+
+    def get_queryset(self):
+        return (
+            Profile.objects.select_related('user')
+            .only(
+                'id', 'specialization', 'experience_level', 'hourly_rate', 'rating',
+                'completed_projects', 'available_for_hire', 'user__username', 'user__avatar'
+            )
+            .prefetch_related(Prefetch('skills', queryset=Skill.objects.only('id', 'name')))
+        )
+
+    def get_keyset_ordering(self):
+        return get_freelancer_ordering(self.request)
+
+
+class FreelancerExportView(APIView):
+    """Все профили с навыками потоком NDJSON или CSV (?output=, ?updated_since=), см. core.export."""
+    permission_classes = [IsAdminUser]
+    content_negotiation_class = ExportNegotiation
+
+    def get(self, request):
+        return profile_export.response(request)
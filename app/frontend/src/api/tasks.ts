@@ -37,5 +37,6 @@ export async function getTasks() {
 
   const data = await response.json();
   console.log("Полученные задачи:", data);
-  return data;
+  // Лента постраничная: { next, previous, results }
+  return data.results;
 }
\ No newline at end of file